@@ -32,6 +32,91 @@ class Config:
         self.json_config = self.load_config_json()
         self.gpu_mem = None
         self.x_pad, self.x_query, self.x_center, self.x_max = self.device_config()
+        # Number of loaded voice models kept ready in memory (0 = unlimited)
+        self.model_cache_size = int(os.environ.get("RVC_MODEL_CACHE_SIZE", 4))
+        # Memory budget for loaded voice models in MB (0 = unlimited)
+        self.model_cache_bytes = int(os.environ.get("RVC_MODEL_CACHE_MB", 0)) * 1024**2
+        # Number of FAISS indexes kept open (0 = unlimited)
+        self.index_cache_size = int(os.environ.get("RVC_INDEX_CACHE_SIZE", 8))
+        # Heap budget for open FAISS indexes in MB, memory-mapped data excluded (0 = unlimited)
+        self.index_cache_bytes = int(os.environ.get("RVC_INDEX_CACHE_MB", 0)) * 1024**2
+        # Number of content embedders kept in memory (0 = unlimited)
+        self.embedder_cache_size = int(os.environ.get("RVC_EMBEDDER_CACHE_SIZE", 3))
+        # Memory budget for content embedders in MB (0 = unlimited)
+        self.embedder_cache_bytes = (
+            int(os.environ.get("RVC_EMBEDDER_CACHE_MB", 0)) * 1024**2
+        )
+        # Embedders that are never evicted once loaded, comma separated
+        self.pinned_embedders = [
+            name.strip()
+            for name in os.environ.get("RVC_PINNED_EMBEDDERS", "contentvec").split(",")
+            if name.strip()
+        ]
+        # F0 methods loaded at startup, comma separated (e.g. "rmvpe,fcpe")
+        self.preload_f0_methods = [
+            method.strip()
+            for method in os.environ.get("RVC_PRELOAD_F0", "").split(",")
+            if method.strip()
+        ]
+        # segments of a long input converted together in one forward pass
+        self.segment_batch_size = int(os.environ.get("RVC_SEGMENT_BATCH", 1))
+        # inputs longer than this (seconds) are converted in bounded memory, 0 disables it
+        self.long_file_seconds = float(os.environ.get("RVC_LONG_FILE_SECONDS", 600))
+        # inference precision: "fp32", "bf16" or "fp16" (bf16 is used instead of fp16 on CPU)
+        self.precision = os.environ.get("RVC_PRECISION", "fp32").lower()
+        self.dtype = self.precision_dtype(self.precision)
+        # synthesizer graph compilation: "off", "trace" (TorchScript) or "compile" (torch.compile)
+        self.compile_mode = os.environ.get("RVC_COMPILE", "off").lower()
+        # directory where compiled graphs are kept between restarts
+        self.compile_cache_dir = os.environ.get(
+            "RVC_COMPILE_CACHE", os.path.join("rvc", "models", "compiled")
+        )
+        # segment lengths are padded to a multiple of this many frames (10 ms each)
+        self.compile_bucket_frames = int(os.environ.get("RVC_COMPILE_BUCKET", 500))
+        # synthesizer backend used when a request does not choose one: "torch" or "onnx"
+        self.backend = os.environ.get("RVC_BACKEND", "torch").lower()
+        # intra-op threads of the onnxruntime backend (0 = onnxruntime default)
+        self.onnx_threads = int(os.environ.get("RVC_ONNX_THREADS", 0))
+        # lowest SNR (dB) against float32 accepted for int8-quantized modules
+        self.quantize_min_snr = float(os.environ.get("RVC_QUANTIZE_MIN_SNR", 20))
+        # audio file used for that check (defaults to a synthetic voiced clip)
+        self.quantize_reference = os.environ.get("RVC_QUANTIZE_REFERENCE") or None
+        # directory of the on-disk cache of 16 kHz audio, F0 and embedder features
+        self.feature_cache_dir = os.environ.get(
+            "RVC_FEATURE_CACHE_DIR", os.path.join("rvc", "models", "features")
+        )
+        # size budget of that cache on disk in MB (0 = disabled, the default)
+        self.feature_cache_bytes = (
+            int(os.environ.get("RVC_FEATURE_CACHE_MB", 0)) * 1024**2
+        )
+        # store the embedder features in float16, halving their size
+        self.feature_cache_fp16 = os.environ.get("RVC_FEATURE_CACHE_FP16", "0") == "1"
+        # seconds without a render after which a re-render session is closed
+        self.session_ttl = float(os.environ.get("RVC_SESSION_TTL", 600))
+        # number of re-render sessions kept open (0 = unlimited)
+        self.session_max = int(os.environ.get("RVC_SESSION_MAX", 8))
+        # memory budget for the analysed clips of those sessions in MB (0 = unlimited)
+        self.session_bytes = int(os.environ.get("RVC_SESSION_MB", 0)) * 1024**2
+        # soxr quality tier used to resample the output for non-WAV exports (QQ, LQ, MQ, HQ, VHQ)
+        self.encode_quality = os.environ.get("RVC_ENCODE_QUALITY", "VHQ").upper()
+
+    def fingerprint(self):
+        """
+        Settings that change the converted audio, so that results cached under other
+        settings are not reused.
+        """
+        return {
+            "device": self.device,
+            "windows": [self.x_pad, self.x_query, self.x_center, self.x_max],
+            "precision": self.precision,
+            "compile": self.compile_mode,
+            "compile_bucket": self.compile_bucket_frames,
+            "segment_batch": self.segment_batch_size,
+            "long_file_seconds": self.long_file_seconds,
+            "feature_cache_fp16": self.feature_cache_fp16,
+            "quantize_min_snr": self.quantize_min_snr,
+            "quantize_reference": self.quantize_reference,
+        }
 
     def load_config_json(self):
         configs = {}
@@ -55,6 +140,29 @@ class Config:
 
         return x_pad, x_query, x_center, x_max
 
+    def precision_dtype(self, precision):
+        if precision not in ("fp32", "bf16", "fp16"):
+            raise ValueError(f"Unknown precision: {precision}")
+        if precision == "fp32":
+            return torch.float32
+        if self.device.startswith("cuda"):
+            if precision == "bf16" and not torch.cuda.is_bf16_supported():
+                return torch.float16
+            return torch.bfloat16 if precision == "bf16" else torch.float16
+        # half precision matmuls are only fast on CPUs with bf16 support
+        return torch.bfloat16
+
+    def autocast(self):
+        """
+        Context manager running the enclosed ops in the configured precision.
+        Does nothing in fp32.
+        """
+        return torch.autocast(
+            device_type=self.device.split(":")[0],
+            dtype=self.dtype,
+            enabled=self.dtype != torch.float32,
+        )
+
     def set_cuda_config(self):
         i_device = int(self.device.split(":")[-1])
         self.gpu_name = torch.cuda.get_device_name(i_device)
@@ -0,0 +1,32 @@
+import os
+import importlib.util
+
+# Names and sidecar files of the inference backends. This module imports neither torch
+# nor faiss, so the web API can use it without loading them.
+
+BACKENDS = ("torch", "onnx")
+
+ONNX_SUFFIX = ".onnx"
+
+VECTORS_SUFFIX = ".vectors.npy"
+
+
+def onnx_path(model_path):
+    """
+    Returns the path of the ONNX export kept next to a `.pth` checkpoint.
+    """
+    return os.path.splitext(model_path)[0] + ONNX_SUFFIX
+
+
+def onnx_available():
+    """
+    Whether onnxruntime can be imported, without importing it.
+    """
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def vectors_path(file_index):
+    """
+    Returns the path of the `.npy` sidecar holding the reconstructed vectors of an index.
+    """
+    return file_index + VECTORS_SUFFIX
@@ -0,0 +1,365 @@
+import os
+import sys
+import json
+import time
+import torch
+import argparse
+import platform
+import tempfile
+import contextlib
+import numpy as np
+from transformers import HubertConfig
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.configs.config import Config
+from rvc.infer.pipeline import Pipeline as VC
+from rvc.infer.feature_cache import feature_cache
+from rvc.infer.quantization import reference_clip
+from rvc.lib.algorithm.synthesizers import Synthesizer
+from rvc.lib.predictors.f0 import PREDICTORS, register_predictor
+from rvc.lib.timing import StageTimer
+from rvc.lib.utils import HubertModelWithFinalProj
+
+# benchmark name: (vocoder, use_f0)
+VOCODERS = {
+    "hifigan": ("HiFi-GAN", True),
+    "mrf-hifigan": ("MRF HiFi-GAN", True),
+    "refinegan": ("RefineGAN", True),
+    "hifigan-nof0": ("HiFi-GAN", False),
+}
+
+
+class SyntheticF0:
+    """
+    F0 predictor stand-in returning a voiced contour with vibrato and unvoiced gaps,
+    so the benchmark measures the other stages without predictor weights.
+    """
+
+    def __init__(self, sample_rate=16000, hop_size=160):
+        self.sample_rate = sample_rate
+        self.hop_size = hop_size
+
+    def get_f0(self, x, *args, **kwargs):
+        t = np.arange(x.shape[0] // self.hop_size + 1) * self.hop_size
+        t = t / self.sample_rate
+        f0 = 150 * 2 ** (0.5 * np.sin(2 * np.pi * 0.5 * t))
+        # unvoiced for 100 ms of every 500 ms
+        f0[(t % 0.5) >= 0.4] = 0
+        return f0
+
+
+def build_synthesizer(sample_rate, vocoder, use_f0, config):
+    """
+    Builds a synthesizer with random weights from the training config of a sample rate,
+    the same way `VoiceConverter.setup_network` builds one from a checkpoint.
+    """
+    with open(os.path.join("rvc", "configs", f"{sample_rate}.json"), "r") as f:
+        model_config = json.load(f)
+    data, model = model_config["data"], model_config["model"]
+    net_g = Synthesizer(
+        data["filter_length"] // 2 + 1,
+        model_config["train"]["segment_size"] // data["hop_length"],
+        model["inter_channels"],
+        model["hidden_channels"],
+        model["filter_channels"],
+        model["n_heads"],
+        model["n_layers"],
+        model["kernel_size"],
+        model["p_dropout"],
+        model["resblock"],
+        model["resblock_kernel_sizes"],
+        model["resblock_dilation_sizes"],
+        model["upsample_rates"],
+        model["upsample_initial_channel"],
+        model["upsample_kernel_sizes"],
+        model["spk_embed_dim"],
+        model["gin_channels"],
+        data["sample_rate"],
+        use_f0=use_f0,
+        text_enc_hidden_dim=768,
+        vocoder=vocoder,
+    )
+    del net_g.enc_q
+    return net_g.to(config.device, config.dtype).eval()
+
+
+def build_embedder(layers, config):
+    """
+    Builds a ContentVec-shaped embedder with random weights and `layers` transformer layers.
+    """
+    hubert_config = HubertConfig.from_pretrained(
+        os.path.join("rvc", "models", "embedders", "contentvec")
+    )
+    hubert_config.num_hidden_layers = layers
+    embedder = HubertModelWithFinalProj(hubert_config)
+    return embedder.to(config.device, config.dtype).eval()
+
+
+def build_index(path, size, dim=768):
+    """
+    Writes an IVF index of `size` random vectors, shaped like the ones training produces.
+    """
+    import faiss
+
+    vectors = np.random.default_rng(0).standard_normal((size, dim)).astype(np.float32)
+    n_ivf = max(1, min(int(16 * np.sqrt(size)), size // 39))
+    index = faiss.index_factory(dim, f"IVF{n_ivf},Flat")
+    faiss.extract_index_ivf(index).nprobe = 1
+    index.train(vectors)
+    index.add(vectors)
+    faiss.write_index(index, path)
+
+
+def reset_peak_rss():
+    """
+    Resets the peak resident set size of the process. Only possible on Linux.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the process in bytes, or None.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def benchmark_case(convert, audio, seconds, repeats):
+    """
+    Runs `convert` on `audio` `repeats` times and summarises the latencies and stage times.
+    """
+    per_case_rss = reset_peak_rss()
+    latencies = []
+    stages = {}
+    for _ in range(repeats):
+        timer = StageTimer()
+        start = time.perf_counter()
+        convert(audio, timer)
+        latencies.append(time.perf_counter() - start)
+        for name, elapsed in timer.stages.items():
+            stages[name] = stages.get(name, 0.0) + elapsed / repeats
+    rss = peak_rss()
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "seconds": seconds,
+        "repeats": repeats,
+        "latency": {
+            "p50": p50,
+            "p95": p95,
+            "mean": float(np.mean(latencies)),
+            "min": min(latencies),
+            "max": max(latencies),
+        },
+        # processing time per second of audio, below 1 is faster than real time
+        "rtf": p50 / seconds,
+        "peak_rss_mb": rss / 1024**2 if rss is not None else None,
+        "peak_rss_scope": "case" if per_case_rss else "process",
+        "stages": stages,
+    }
+
+
+def run_benchmark(args):
+    config = Config()
+    torch.manual_seed(args.seed)
+    # every repetition has to run the whole pipeline, not read the F0 from disk
+    feature_cache.max_bytes = 0
+    f0_method = args.f0_method
+    if f0_method == "stub":
+        # the stand-in answers for rmvpe, whose call it mimics
+        register_predictor("rmvpe", config.device, SyntheticF0())
+        f0_method = "rmvpe"
+    batch_size = args.batch_size or config.segment_batch_size
+
+    embedder = build_embedder(args.embedder_layers, config)
+    clips = {
+        seconds: reference_clip(sample_rate=16000, seconds=seconds).astype(np.float64)
+        for seconds in args.durations
+    }
+    warmup_clip = reference_clip(sample_rate=16000, seconds=1.0).astype(np.float64)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = ""
+        if args.index_size > 0:
+            index_path = os.path.join(tmp, "benchmark.index")
+            build_index(index_path, args.index_size)
+
+        for sample_rate in args.sample_rates:
+            vc = VC(sample_rate, config)
+            for name in args.vocoders:
+                vocoder, use_f0 = VOCODERS[name]
+                net_g = build_synthesizer(sample_rate, vocoder, use_f0, config)
+
+                def convert(audio, timer=None):
+                    return vc.pipeline(
+                        model=embedder,
+                        net_g=net_g,
+                        sid=0,
+                        audio=audio,
+                        pitch=0,
+                        f0_method=f0_method,
+                        file_index=index_path,
+                        index_rate=args.index_rate,
+                        pitch_guidance=use_f0,
+                        volume_envelope=1,
+                        version="v2",
+                        protect=0.5,
+                        f0_autotune=False,
+                        f0_autotune_strength=1.0,
+                        proposed_pitch=False,
+                        proposed_pitch_threshold=155.0,
+                        batch_size=batch_size,
+                        timer=timer,
+                    )
+
+                for _ in range(args.warmup):
+                    convert(warmup_clip)
+                for seconds in args.durations:
+                    print(
+                        f"Benchmarking {name} at {sample_rate} Hz on {seconds:g} s...",
+                        file=sys.stderr,
+                    )
+                    result = benchmark_case(
+                        convert, clips[seconds], seconds, args.repeats
+                    )
+                    results.append(
+                        {
+                            "sample_rate": sample_rate,
+                            "vocoder": vocoder,
+                            "f0": use_f0,
+                            **result,
+                        }
+                    )
+                del net_g, convert
+
+    return {
+        "environment": {
+            "device": config.device,
+            "gpu": config.gpu_name,
+            "precision": config.precision,
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads(),
+            "cpus": os.cpu_count(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+        },
+        "settings": {
+            "f0_method": args.f0_method,
+            "embedder_layers": args.embedder_layers,
+            "index_size": args.index_size,
+            "index_rate": args.index_rate,
+            "batch_size": batch_size,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measures the real-time factor of the conversion pipeline with random-weight models."
+    )
+    parser.add_argument(
+        "--sample-rates",
+        type=int,
+        nargs="+",
+        default=[32000, 40000, 48000],
+        choices=[32000, 40000, 48000],
+    )
+    parser.add_argument(
+        "--vocoders",
+        nargs="+",
+        default=list(VOCODERS),
+        choices=list(VOCODERS),
+    )
+    parser.add_argument(
+        "--durations",
+        type=float,
+        nargs="+",
+        default=[1, 10, 60, 300],
+        help="Input lengths in seconds.",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Untimed conversions of a 1 s clip before each model is measured.",
+    )
+    parser.add_argument(
+        "--f0-method",
+        default="stub",
+        choices=["stub"] + list(PREDICTORS),
+        help="F0 predictor, 'stub' returns a synthetic contour without running a model.",
+    )
+    parser.add_argument(
+        "--embedder-layers",
+        type=int,
+        default=12,
+        help="Transformer layers of the random embedder (ContentVec has 12).",
+    )
+    parser.add_argument(
+        "--index-size",
+        type=int,
+        default=10000,
+        help="Vectors in the random FAISS index, 0 disables retrieval.",
+    )
+    parser.add_argument("--index-rate", type=float, default=0.75)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="Segments per forward pass, 0 uses RVC_SEGMENT_BATCH.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", default=None, help="JSON report path, printed if not given."
+    )
+    args = parser.parse_args(argv)
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    if args.embedder_layers < 1:
+        parser.error("--embedder-layers must be at least 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    # keep stdout for the report, model constructors print there
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark report written to '{args.output}'", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import os
+import hashlib
+import threading
+import torch
+from torch.nn.utils import parametrize
+
+from rvc.lib.algorithm.commons import row_noise, row_noise_seeds
+
+COMPILE_MODES = ("off", "trace", "compile")
+
+
+def checkpoint_hash(path, chunk_size=1 << 20):
+    """
+    Returns the SHA-256 of a checkpoint file, used to key compiled artifacts on disk.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remove_parametrizations(module):
+    """
+    Folds weight-norm parametrizations into plain weights so the inference graph does
+    not recompute them on every call.
+    """
+    for submodule in module.modules():
+        if parametrize.is_parametrized(submodule):
+            for name in list(submodule.parametrizations.keys()):
+                parametrize.remove_parametrizations(submodule, name)
+    return module
+
+
+class InferGraph(torch.nn.Module):
+    """
+    `Synthesizer.infer` without `rate`, as a traceable forward.
+
+    The synthesizer submodules are held directly: `Synthesizer.infer` is a
+    `torch.jit.export` method, which the tracer would try to script.
+    """
+
+    def __init__(self, net_g):
+        super().__init__()
+        self.use_f0 = net_g.use_f0
+        self.emb_g = net_g.emb_g
+        self.enc_p = net_g.enc_p
+        self.flow = net_g.flow
+        self.dec = net_g.dec
+
+    def forward(self, phone, phone_lengths, sid, pitch=None, nsff0=None):
+        g = self.emb_g(sid).unsqueeze(-1)
+        m_p, logs_p, x_mask = self.enc_p(phone, pitch, phone_lengths)
+        z_p = (m_p + torch.exp(logs_p) * torch.randn_like(m_p) * 0.66666) * x_mask
+        z = self.flow(z_p, x_mask, g=g, reverse=True)
+        if self.use_f0:
+            return self.dec(z * x_mask, nsff0, g=g)
+        return self.dec(z * x_mask, g=g)
+
+
+class CompiledSynthesizer(torch.nn.Module):
+    """
+    Wraps a `Synthesizer` so `infer` runs through compiled graphs.
+
+    Inputs are zero-padded in time to a multiple of `bucket_frames` (the padded frames are
+    masked through the lengths and cut from the output), so one graph serves every segment
+    length in a bucket. Graphs are built once per (batch size, bucket) and, in "trace" mode,
+    saved as TorchScript next to other artifacts of the same checkpoint, torch version,
+    dtype and device so a restarted worker loads them instead of tracing again. In
+    "compile" mode `torch.compile` is used and its cache artifacts are persisted the same
+    way when the torch version supports it.
+
+    Calls with `rate` (streaming) run eagerly. The graphs draw their noise from the global
+    RNG, so inside `row_noise` each row runs alone with the RNG seeded from its row seed.
+
+    Args:
+        net_g (Synthesizer): Loaded synthesizer in eval mode.
+        checkpoint_path (str): Path of the checkpoint `net_g` was loaded from.
+        mode (str, optional): "trace" or "compile". Defaults to "trace".
+        cache_dir (str, optional): Directory for compiled artifacts. None disables the disk cache. Defaults to None.
+        bucket_frames (int, optional): Length granularity of the graphs, in frames. Defaults to 500.
+        variant (str, optional): Extra tag for the artifact names when the same checkpoint can be built differently (e.g. "int8"). Defaults to None.
+    """
+
+    def __init__(
+        self,
+        net_g,
+        checkpoint_path,
+        mode="trace",
+        cache_dir=None,
+        bucket_frames=500,
+        variant=None,
+    ):
+        super().__init__()
+        if mode not in COMPILE_MODES[1:]:
+            raise ValueError(f"Unknown compile mode: {mode}")
+        self.net_g = remove_parametrizations(net_g)
+        self.mode = mode
+        self.bucket_frames = bucket_frames
+        self.use_f0 = net_g.use_f0
+        self.graph = InferGraph(self.net_g)
+        self.graphs = {}
+        self.lock = threading.Lock()
+        self.cache_prefix = None
+        if cache_dir is not None:
+            parameter = next(net_g.parameters())
+            os.makedirs(cache_dir, exist_ok=True)
+            self.cache_prefix = os.path.join(
+                cache_dir,
+                "-".join(
+                    [
+                        checkpoint_hash(checkpoint_path)[:16],
+                        torch.__version__.replace("+", "_"),
+                        str(parameter.dtype).replace("torch.", ""),
+                        parameter.device.type,
+                        mode,
+                    ]
+                    + ([variant] if variant else [])
+                ),
+            )
+        if mode == "compile":
+            self.compiled = torch.compile(self.graph, dynamic=False)
+            self._load_compile_artifacts()
+
+    def infer(self, phone, phone_lengths, pitch=None, nsff0=None, sid=None, rate=None):
+        """
+        Same contract as `Synthesizer.infer`; only the first element of the returned tuple
+        is filled.
+        """
+        if rate is not None:
+            return self.net_g.infer(phone, phone_lengths, pitch, nsff0, sid, rate)
+        seeds = row_noise_seeds()
+        if seeds is not None:
+            return self._infer_rows(seeds, phone, phone_lengths, pitch, nsff0, sid)
+        return self._infer_graph(phone, phone_lengths, pitch, nsff0, sid)
+
+    def _infer_rows(self, seeds, phone, phone_lengths, pitch, nsff0, sid):
+        frames = phone.shape[1]
+        sid = sid.expand(phone.shape[0])
+        devices = [phone.device] if phone.device.type == "cuda" else []
+        outputs = []
+        for i, (seed, length) in enumerate(zip(seeds, phone_lengths.tolist())):
+            # cut to its own length, the bucket (and the noise drawn) depend only on it
+            row = slice(i, i + 1)
+            with torch.random.fork_rng(devices=devices), row_noise(None):
+                torch.manual_seed(seed & (2**63 - 1))
+                o = self._infer_graph(
+                    phone[row, :length],
+                    phone_lengths[row],
+                    pitch[row, :length] if self.use_f0 else None,
+                    nsff0[row, :length] if self.use_f0 else None,
+                    sid[row],
+                )[0]
+            upp = o.shape[-1] // length
+            outputs.append(torch.nn.functional.pad(o, (0, (frames - length) * upp)))
+        return torch.cat(outputs), None, None
+
+    def _infer_graph(self, phone, phone_lengths, pitch, nsff0, sid):
+        batch_size, frames = phone.shape[0], phone.shape[1]
+        bucket = -(-frames // self.bucket_frames) * self.bucket_frames
+        pad = bucket - frames
+        if pad:
+            phone = torch.nn.functional.pad(phone, (0, 0, 0, pad))
+            if self.use_f0:
+                pitch = torch.nn.functional.pad(pitch, (0, pad))
+                nsff0 = torch.nn.functional.pad(nsff0, (0, pad))
+        inputs = (phone, phone_lengths, sid.expand(batch_size))
+        if self.use_f0:
+            inputs += (pitch, nsff0.float())
+
+        graph = self._get_graph(inputs, (batch_size, bucket))
+        o = graph(*inputs)
+        upp = o.shape[-1] // bucket
+        return o[..., : frames * upp], None, None
+
+    def _get_graph(self, inputs, key):
+        graph = self.graphs.get(key)
+        if graph is not None:
+            return graph
+        device = inputs[0].device
+        # building runs the graph once, its noise must not move the RNG of the caller
+        with self.lock, torch.random.fork_rng(
+            devices=[device] if device.type == "cuda" else []
+        ):
+            graph = self.graphs.get(key)
+            if graph is None:
+                graph = (
+                    self._trace(inputs, key)
+                    if self.mode == "trace"
+                    else self._compile(inputs)
+                )
+                self.graphs[key] = graph
+        return graph
+
+    def _trace(self, inputs, key):
+        path = (
+            f"{self.cache_prefix}-b{key[0]}-t{key[1]}.pt" if self.cache_prefix else None
+        )
+        if path and os.path.exists(path):
+            try:
+                return torch.jit.load(path, map_location=inputs[0].device)
+            except RuntimeError as error:
+                print(f"Could not load compiled graph '{path}': {error}")
+        print(f"Tracing synthesizer graph for batch {key[0]}, {key[1]} frames...")
+        with torch.no_grad():
+            # the graph draws random noise, so traced and eager outputs cannot be compared
+            graph = torch.jit.trace(self.graph, inputs, check_trace=False)
+        graph = torch.jit.freeze(graph.eval())
+        if path:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                torch.jit.save(graph, tmp_path)
+                os.replace(tmp_path, path)
+            except (OSError, RuntimeError) as error:
+                print(f"Could not save compiled graph '{path}': {error}")
+        return graph
+
+    def _compile(self, inputs):
+        with torch.no_grad():
+            self.compiled(*inputs)
+        self._save_compile_artifacts()
+        return self.compiled
+
+    def _load_compile_artifacts(self):
+        path = f"{self.cache_prefix}.bin" if self.cache_prefix else None
+        if not path or not os.path.exists(path):
+            return
+        if not hasattr(torch.compiler, "load_cache_artifacts"):
+            return
+        with open(path, "rb") as f:
+            torch.compiler.load_cache_artifacts(f.read())
+
+    def _save_compile_artifacts(self):
+        if not self.cache_prefix or not hasattr(torch.compiler, "save_cache_artifacts"):
+            return
+        artifacts = torch.compiler.save_cache_artifacts()
+        if artifacts is not None:
+            path = f"{self.cache_prefix}.bin"
+            with open(path, "wb") as f:
+                f.write(artifacts[0])
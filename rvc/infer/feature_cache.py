@@ -0,0 +1,213 @@
+import os
+import hashlib
+import threading
+import numpy as np
+
+from rvc.configs.config import Config
+
+config = Config()
+
+
+def content_hash(path, chunk_size=1 << 20):
+    """
+    Returns the SHA-256 of a file's content, so copies of the same clip share entries.
+    `path` can also be the content itself, as bytes.
+    """
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(path).hexdigest()
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def array_hash(array):
+    """
+    Returns the SHA-256 of an array's dtype, shape and data.
+    """
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array.data)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    On-disk cache of model-independent intermediate features (16 kHz audio, raw F0,
+    embedder hidden states), so converting one clip with several models computes them once.
+
+    Entries are `.npy` files named by the hash of their key and returned memory-mapped
+    read-only. The total size on disk is bounded: when a write goes over `max_bytes`, the
+    least recently used files (by modification time, refreshed on every hit) are removed.
+    The directory can be shared by several processes.
+
+    Args:
+        root (str): Directory of the cache files.
+        max_bytes (int): Size budget on disk. 0 disables the cache.
+        fp16 (bool, optional): Whether to store embedder hidden states in float16. Defaults to False.
+    """
+
+    suffix = ".npy"
+
+    def __init__(self, root, max_bytes, fp16=False):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fp16 = fp16
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._nbytes = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(*parts):
+        """
+        Builds an entry key from hashable parts (strings, numbers, tuples).
+        """
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + self.suffix)
+
+    def get(self, key):
+        """
+        Returns the memory-mapped array stored under `key`, or None.
+        """
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            array = np.load(path, mmap_mode="r")
+            # refresh the entry for the LRU order
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return array
+
+    def put(self, key, array):
+        """
+        Stores `array` under `key` and returns it memory-mapped from disk.
+        Returns `array` itself if the cache is disabled or the write fails.
+        """
+        if not self.enabled:
+            return array
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            nbytes = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as error:
+            print(f"Could not write feature cache entry '{path}': {error}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return array
+        with self._lock:
+            if self._nbytes is not None:
+                self._nbytes += nbytes
+        self._evict()
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            # evicted by another process in the meantime
+            return array
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the array stored under `key`, computing and storing it on a miss.
+        """
+        array = self.get(key)
+        if array is None:
+            array = self.put(key, compute())
+        return array
+
+    def hidden_states(self, array):
+        """
+        Converts embedder hidden states to the dtype they are stored in.
+        """
+        return array.astype(np.float16 if self.fp16 else np.float32, copy=False)
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        for path, _, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._nbytes = 0
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the bytes held on disk.
+        """
+        with self._lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "bytes": self.nbytes if self.enabled else 0,
+            "max_bytes": self.max_bytes,
+        }
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            if self._nbytes is None:
+                self._nbytes = sum(size for _, _, size in self._entries())
+            return self._nbytes
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self):
+        if self.nbytes <= self.max_bytes:
+            return
+        with self._lock:
+            # rescan, other processes may have added or removed entries
+            entries = sorted(self._entries(), key=lambda entry: entry[1])
+            total = sum(size for _, _, size in entries)
+            for path, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+            self._nbytes = total
+
+
+feature_cache = FeatureCache(
+    config.feature_cache_dir,
+    config.feature_cache_bytes,
+    fp16=config.feature_cache_fp16,
+)
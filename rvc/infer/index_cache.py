@@ -0,0 +1,134 @@
+import os
+import faiss
+import dataclasses
+import numpy as np
+
+from rvc.configs.config import Config
+from rvc.infer.artifacts import vectors_path
+from rvc.lib.cache import LRUCache, file_key
+
+config = Config()
+
+
+@dataclasses.dataclass
+class LoadedIndex:
+    """
+    A FAISS index and its reconstructed vectors, shared read-only between calls.
+    """
+
+    index: faiss.Index
+    big_npy: np.ndarray
+    resident_bytes: int
+    mapped_bytes: int
+
+
+class IndexCache:
+    """
+    Process-wide cache of FAISS retrieval indexes keyed by path, modification time and size.
+
+    Indexes are opened with FAISS memory-mapping where the index type supports it, and the
+    vectors returned by `reconstruct_n` are stored once in a `.npy` sidecar next to the index
+    and memory-mapped read-only, so no call ever gets its own float32 copy.
+
+    Args:
+        max_entries (int, optional): Maximum number of indexes kept open. 0 disables the limit. Defaults to 0.
+        max_bytes (int, optional): Budget for the bytes held on the heap (mapped bytes are not counted). Defaults to 0.
+    """
+
+    def __init__(self, max_entries=0, max_bytes=0):
+        self.cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    def get(self, file_index):
+        """
+        Returns the index and its vectors for `file_index`, loading them on first use.
+
+        Args:
+            file_index (str): Path to the FAISS index file.
+
+        Returns:
+            tuple: (faiss.Index, read-only np.ndarray of shape (ntotal, dim)).
+        """
+        key = file_key(file_index)
+        if key is None:
+            raise FileNotFoundError(f"Index not found: {file_index}")
+        loaded = self.cache.get_or_load(key, lambda: self._load(key[0]))
+        return loaded.index, loaded.big_npy
+
+    def invalidate(self, file_index, remove_sidecar=False):
+        """
+        Drops every cached version of an index, e.g. after its file is replaced or deleted.
+
+        Args:
+            file_index (str): Path to the FAISS index file.
+            remove_sidecar (bool, optional): Whether to also delete the vectors sidecar. Defaults to False.
+        """
+        path = os.path.abspath(file_index)
+        self.cache.remove_if(lambda key: key[0] == path)
+        if remove_sidecar and os.path.exists(vectors_path(path)):
+            os.remove(vectors_path(path))
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the resident (heap) and memory-mapped bytes held.
+        """
+        stats = self.cache.stats()
+        entries = self.cache.values()
+        stats["resident_bytes"] = sum(entry.resident_bytes for entry in entries)
+        stats["mapped_bytes"] = sum(entry.mapped_bytes for entry in entries)
+        return stats
+
+    def _load(self, file_index):
+        index, index_mapped = self._read_index(file_index)
+        big_npy, vectors_mapped = self._load_vectors(file_index, index)
+        index_bytes = os.path.getsize(file_index)
+        resident_bytes = (0 if index_mapped else index_bytes) + (
+            0 if vectors_mapped else big_npy.nbytes
+        )
+        mapped_bytes = (index_bytes if index_mapped else 0) + (
+            big_npy.nbytes if vectors_mapped else 0
+        )
+        loaded = LoadedIndex(index, big_npy, resident_bytes, mapped_bytes)
+        return loaded, resident_bytes
+
+    @staticmethod
+    def _read_index(file_index):
+        try:
+            index = faiss.read_index(
+                file_index, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+            return index, True
+        except RuntimeError:
+            # Not every index type can be memory-mapped, fall back to a regular read
+            return faiss.read_index(file_index), False
+
+    @staticmethod
+    def _load_vectors(file_index, index):
+        sidecar = vectors_path(file_index)
+        if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(
+            file_index
+        ):
+            try:
+                big_npy = np.load(sidecar, mmap_mode="r")
+                if big_npy.shape == (index.ntotal, index.d):
+                    return big_npy, True
+            except (OSError, ValueError):
+                pass
+
+        big_npy = index.reconstruct_n(0, index.ntotal)
+        tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, big_npy)
+            os.replace(tmp_path, sidecar)
+            return np.load(sidecar, mmap_mode="r"), True
+        except OSError as error:
+            print(f"Could not write index vectors sidecar '{sidecar}': {error}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            big_npy.flags.writeable = False
+            return big_npy, False
+
+
+index_cache = IndexCache(
+    max_entries=config.index_cache_size, max_bytes=config.index_cache_bytes
+)
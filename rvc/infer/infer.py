@@ -1,9 +1,13 @@
+import io
 import os
 import sys
+import math
 import soxr
 import time
 import torch
-import librosa
+import inspect
+import contextlib
+import dataclasses
 import logging
 import traceback
 import numpy as np
@@ -26,8 +30,28 @@ from pedalboard import (
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
-from rvc.infer.pipeline import Pipeline as VC
-from rvc.lib.utils import load_audio_infer, load_embedding
+from rvc.infer.pipeline import Pipeline as VC, find_quiet_point
+from rvc.infer.index_cache import index_cache
+from rvc.infer.feature_cache import feature_cache, content_hash, array_hash
+from rvc.infer.compiled import CompiledSynthesizer
+from rvc.infer.artifacts import BACKENDS
+from rvc.infer.onnx_backend import load_onnx_synthesizer
+from rvc.infer.quantization import (
+    embedder_features,
+    quantize_embedder,
+    quantize_text_encoder,
+    reference_clip,
+)
+from rvc.lib.predictors.f0 import loaded_predictors
+from rvc.lib.utils import (
+    audio_peak,
+    load_audio_infer,
+    load_embedding,
+    module_nbytes,
+    stream_audio,
+)
+from rvc.lib.cache import LRUCache, file_key, tree_key
+from rvc.lib.timing import ConversionResult, StageTimer
 from rvc.lib.tools.split_audio import process_audio, merge_audio
 from rvc.lib.algorithm.synthesizers import Synthesizer
 from rvc.configs.config import Config
@@ -37,6 +61,47 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 logging.getLogger("faiss").setLevel(logging.WARNING)
 logging.getLogger("faiss.loader").setLevel(logging.WARNING)
 
+COMMON_SAMPLE_RATES = [8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000]
+
+
+@dataclasses.dataclass
+class LoadedModel:
+    """
+    A voice model ready for inference, as kept in the VoiceConverter model cache.
+    """
+
+    net_g: torch.nn.Module  # or an OnnxSynthesizer
+    vc: VC
+    tgt_sr: int
+    use_f0: int
+    version: str
+    vocoder: str
+    n_spk: int
+    text_enc_hidden_dim: int
+
+
+@contextlib.contextmanager
+def seeded_rng(seed, device):
+    """
+    Runs the block with the torch RNG seeded with `seed`, so the noise drawn by the
+    synthesizer and the sine generator is reproducible, and restores the previous RNG
+    state afterwards. Does nothing if `seed` is None.
+    """
+    if seed is None:
+        yield
+        return
+    devices = [device] if str(device).startswith("cuda") else []
+    with torch.random.fork_rng(devices=devices):
+        torch.manual_seed(seed)
+        yield
+
+
+def source_name(source):
+    """
+    Describes an audio source for log messages: its path, or its kind for in-memory audio.
+    """
+    return source if isinstance(source, str) else "in-memory audio"
+
 
 class VoiceConverter:
     """
@@ -52,6 +117,7 @@ class VoiceConverter:
             None  # Initialize the Hubert model (for embedding extraction)
         )
         self.last_embedder_model = None  # Last used embedder model
+        self.embedder_key = None  # Cache key of the loaded embedder
         self.tgt_sr = None  # Target sampling rate for the output audio
         self.net_g = None  # Generator network for voice conversion
         self.vc = None  # Voice conversion pipeline instance
@@ -60,18 +126,114 @@ class VoiceConverter:
         self.n_spk = None  # Number of speakers in the model
         self.use_f0 = None  # Whether the model uses F0
         self.loaded_model = None
+        self._reference_clip = None
+        self.model_cache = LRUCache(
+            max_entries=self.config.model_cache_size,
+            max_bytes=self.config.model_cache_bytes,
+        )
+        self.embedder_cache = LRUCache(
+            max_entries=self.config.embedder_cache_size,
+            max_bytes=self.config.embedder_cache_bytes,
+        )
 
-    def load_hubert(self, embedder_model: str, embedder_model_custom: str = None):
+    def load_hubert(
+        self,
+        embedder_model: str,
+        embedder_model_custom: str = None,
+        quantize: bool = False,
+    ):
         """
         Loads the HuBERT model for speaker embedding extraction.
 
+        Embedders are kept in an LRU cache keyed by name, so several of them can stay
+        resident at once. Embedders listed in the config as pinned are never evicted.
+
         Args:
             embedder_model (str): Path to the pre-trained HuBERT model.
             embedder_model_custom (str): Path to the custom HuBERT model.
+            quantize (bool, optional): Whether to use the int8-quantized embedder. Defaults to False.
+        """
+        self.embedder_key, self.hubert_model = self.get_embedder(
+            embedder_model, embedder_model_custom, quantize
+        )
+
+    def get_embedder(
+        self,
+        embedder_model: str,
+        embedder_model_custom: str = None,
+        quantize: bool = False,
+    ):
+        """
+        Returns an embedder from the cache, loading it if needed, without making it the
+        embedder of the next conversions. A custom embedder is keyed by the files in its
+        directory, so replacing them loads the new weights and does not reuse the cached
+        features of the old ones.
+
+        Returns:
+            tuple: The cache key of the embedder and the embedder model.
         """
-        self.hubert_model = load_embedding(embedder_model, embedder_model_custom)
-        self.hubert_model = self.hubert_model.to(self.config.device).float()
-        self.hubert_model.eval()
+        key = (
+            embedder_model,
+            (
+                (embedder_model_custom, tree_key(embedder_model_custom))
+                if embedder_model == "custom"
+                else None
+            ),
+        ) + (("int8",) if quantize else ())
+        hubert_model = self.embedder_cache.get_or_load(
+            key,
+            lambda: self.build_embedder(
+                embedder_model, embedder_model_custom, quantize
+            ),
+            pinned=embedder_model in self.config.pinned_embedders,
+        )
+        return key, hubert_model
+
+    def build_embedder(
+        self,
+        embedder_model: str,
+        embedder_model_custom: str = None,
+        quantize: bool = False,
+    ):
+        """
+        Loads an embedder and moves it to the configured device for the cache.
+
+        Returns:
+            tuple: The embedder model and its size in bytes.
+        """
+        hubert_model = load_embedding(embedder_model, embedder_model_custom)
+        hubert_model = hubert_model.to(self.config.device, self.config.dtype)
+        hubert_model.eval()
+        if quantize and self.can_quantize():
+            hubert_model, snr = quantize_embedder(
+                hubert_model, self.reference_clip(), self.config.quantize_min_snr
+            )
+            print(
+                f"Embedder '{embedder_model}' int8 SNR: {snr:.1f} dB, "
+                + (
+                    "quantized."
+                    if snr >= self.config.quantize_min_snr
+                    else "kept in float32."
+                )
+            )
+        return hubert_model, module_nbytes(hubert_model)
+
+    def can_quantize(self):
+        """
+        Dynamic int8 quantization only runs on CPU with float32 weights.
+        """
+        if self.config.device != "cpu" or self.config.dtype != torch.float32:
+            print("int8 quantization needs the CPU and fp32 precision, skipping it.")
+            return False
+        return True
+
+    def reference_clip(self):
+        """
+        Returns the clip used to check quantized modules, loaded once.
+        """
+        if self._reference_clip is None:
+            self._reference_clip = reference_clip(self.config.quantize_reference)
+        return self._reference_clip
 
     @staticmethod
     def remove_audio_noise(data, sr, reduction_strength=0.7):
@@ -93,35 +255,104 @@ class VoiceConverter:
             return None
 
     @staticmethod
-    def convert_audio_format(input_path, output_path, output_format):
+    def encode_audio(
+        audio, sample_rate, output_format="WAV", output=None, quality="VHQ"
+    ):
         """
-        Converts an audio file to a specified output format.
+        Encodes audio from the float buffer straight into the requested container, in a
+        single pass. Formats other than WAV are resampled to the nearest common sample rate
+        first, unless the audio is already at that rate.
+
+        Args:
+            audio (np.ndarray): The audio samples.
+            sample_rate (int): Sample rate of the audio.
+            output_format (str, optional): Desired audio format (e.g., "WAV", "MP3"). Defaults to "WAV".
+            output (str, optional): Path or file-like object to write to. Defaults to None, which returns the encoded bytes.
+            quality (str, optional): Quality tier of the soxr resampler: "QQ", "LQ", "MQ", "HQ" or "VHQ". Defaults to "VHQ".
+
+        Returns:
+            bytes: The encoded audio, or None if it was written to `output`.
+        """
+        if output_format != "WAV":
+            target_sr = min(COMMON_SAMPLE_RATES, key=lambda x: abs(x - sample_rate))
+            if target_sr != sample_rate:
+                audio = soxr.resample(audio, sample_rate, target_sr, quality=quality)
+                sample_rate = target_sr
+        buffer = io.BytesIO() if output is None else output
+        sf.write(buffer, audio, sample_rate, format=output_format.lower())
+        return buffer.getvalue() if output is None else None
+
+    @staticmethod
+    def convert_audio_format(input_path, output_path, output_format, quality="VHQ"):
+        """
+        Converts an audio file to a specified output format. Converted audio that is still
+        in memory should be passed to `encode_audio` instead of written and converted.
 
         Args:
             input_path (str): Path to the input audio file.
             output_path (str): Path to the output audio file.
             output_format (str): Desired audio format (e.g., "WAV", "MP3").
+            quality (str, optional): Quality tier of the resampler, see `encode_audio`. Defaults to "VHQ".
+        """
+        try:
+            if output_format != "WAV":
+                print(f"Saving audio as {output_format}...")
+                audio, sample_rate = sf.read(input_path, always_2d=True)
+                VoiceConverter.encode_audio(
+                    audio.mean(axis=1),
+                    sample_rate,
+                    output_format,
+                    output=output_path,
+                    quality=quality,
+                )
+            return output_path
+        except Exception as error:
+            print(f"An error occurred converting the audio format: {error}")
+
+    @staticmethod
+    def convert_audio_format_stream(
+        input_path, output_path, output_format, blocksize=65536, quality="VHQ"
+    ):
+        """
+        Converts a WAV file to a specified output format block by block, so memory use
+        does not depend on the duration of the file.
+
+        Args:
+            input_path (str): Path to the input WAV file.
+            output_path (str): Path to the output audio file.
+            output_format (str): Desired audio format (e.g., "WAV", "MP3").
+            blocksize (int, optional): Frames converted at a time. Defaults to 65536.
+            quality (str, optional): Quality tier of the resampler, see `encode_audio`. Defaults to "VHQ".
         """
         try:
             if output_format != "WAV":
                 print(f"Saving audio as {output_format}...")
-                audio, sample_rate = librosa.load(input_path, sr=None)
-                common_sample_rates = [
-                    8000,
-                    11025,
-                    12000,
-                    16000,
-                    22050,
-                    24000,
-                    32000,
-                    44100,
-                    48000,
-                ]
-                target_sr = min(common_sample_rates, key=lambda x: abs(x - sample_rate))
-                audio = librosa.resample(
-                    audio, orig_sr=sample_rate, target_sr=target_sr, res_type="soxr_vhq"
+                sample_rate = sf.info(input_path).samplerate
+                target_sr = min(COMMON_SAMPLE_RATES, key=lambda x: abs(x - sample_rate))
+                resampler = (
+                    soxr.ResampleStream(sample_rate, target_sr, 1, quality=quality)
+                    if target_sr != sample_rate
+                    else None
                 )
-                sf.write(output_path, audio, target_sr, format=output_format.lower())
+                with sf.SoundFile(
+                    output_path,
+                    "w",
+                    samplerate=target_sr,
+                    channels=1,
+                    format=output_format.lower(),
+                ) as output:
+                    for block in sf.blocks(
+                        input_path, blocksize=blocksize, dtype="float32"
+                    ):
+                        if resampler is not None:
+                            block = resampler.resample_chunk(block)
+                        output.write(block)
+                    if resampler is not None:
+                        output.write(
+                            resampler.resample_chunk(
+                                np.zeros(0, dtype=np.float32), last=True
+                            )
+                        )
             return output_path
         except Exception as error:
             print(f"An error occurred converting the audio format: {error}")
@@ -132,6 +363,15 @@ class VoiceConverter:
         sample_rate,
         **kwargs,
     ):
+        return VoiceConverter.build_post_process_board(**kwargs)(
+            audio_input, sample_rate
+        )
+
+    @staticmethod
+    def build_post_process_board(**kwargs):
+        """
+        Builds the chain of post-processing effects selected in `kwargs`.
+        """
         board = Pedalboard()
         if kwargs.get("reverb", False):
             reverb = Reverb(
@@ -188,7 +428,7 @@ class VoiceConverter:
                 mix=kwargs.get("delay_mix", 0.5),
             )
             board.append(delay)
-        return board(audio_input, sample_rate)
+        return board
 
     def convert_audio(
         self,
@@ -215,6 +455,12 @@ class VoiceConverter:
         sid: int = 0,
         proposed_pitch: bool = False,
         proposed_pitch_threshold: float = 155.0,
+        segment_batch_size: int = None,
+        long_file: bool = None,
+        backend: str = None,
+        quantize: bool = False,
+        progress=None,
+        seed: int = None,
         **kwargs,
     ):
         """
@@ -227,8 +473,8 @@ class VoiceConverter:
             protect (float): Protection rate for certain audio segments.
             hop_length (int): Hop length for audio processing.
             f0_method (str): Method for F0 extraction.
-            audio_input_path (str): Path to the input audio file.
-            audio_output_path (str): Path to the output audio file.
+            audio_input_path (str): Path to the input audio file. Encoded bytes, a file-like object or a `(samples, sample_rate)` tuple are converted without reading from disk.
+            audio_output_path (str): Path to the output audio file. If empty, the encoded audio is returned in `ConversionResult.data` instead of written.
             model_path (str): Path to the voice conversion model.
             index_path (str): Path to the index file.
             split_audio (bool): Whether to split the audio for processing.
@@ -241,31 +487,42 @@ class VoiceConverter:
             embedder_model_custom (str): Path to the custom embedder model.
             resample_sr (int, optional): Resample sampling rate. Default is 0.
             sid (int, optional): Speaker ID. Default is 0.
+            segment_batch_size (int, optional): Segments converted per forward pass. Default is the configured value.
+            long_file (bool, optional): Whether to convert in bounded memory, see `convert_audio_long`. Default is to use it for files longer than the configured threshold.
+            backend (str, optional): Synthesizer backend, "torch" or "onnx". Default is the configured backend.
+            quantize (bool, optional): Whether to run the embedder and the text encoder in int8. Default is False.
+            progress (callable, optional): Called with the number of segments (chunks with `split_audio`) converted and the total. Long files report an estimated total until the last segment.
+            seed (int, optional): Seed for the random noise of the synthesizer, so the same input and settings give the same output. Default is to not seed it. The ONNX backend is not seeded.
             **kwargs: Additional keyword arguments.
+
+        Returns:
+            ConversionResult: The output file and the stage timings, or None if the conversion failed.
         """
         if not model_path:
             print("No model path provided. Aborting conversion.")
             return
 
-        self.get_vc(model_path, sid)
+        timer = StageTimer()
+        with timer.stage("model_load"):
+            self.get_vc(model_path, sid, backend, quantize)
 
         try:
-            start_time = time.time()
-            print(f"Converting audio '{audio_input_path}'...")
+            print(f"Converting audio '{source_name(audio_input_path)}'...")
 
-            audio = load_audio_infer(
-                audio_input_path,
-                16000,
-                **kwargs,
-            )
-            audio_max = np.abs(audio).max() / 0.95
-
-            if audio_max > 1:
-                audio /= audio_max
+            if long_file is None:
+                long_file = self.is_long_file(audio_input_path)
+            if long_file and kwargs.get("formant_shifting", False):
+                print("Formant shifting needs the whole file, long-file mode disabled.")
+                long_file = False
+            if long_file and not (
+                isinstance(audio_input_path, str) and audio_output_path
+            ):
+                print("Long-file mode needs file paths, converting in memory.")
+                long_file = False
 
-            if not self.hubert_model or embedder_model != self.last_embedder_model:
-                self.load_hubert(embedder_model, embedder_model_custom)
-                self.last_embedder_model = embedder_model
+            with timer.stage("model_load"):
+                self.load_hubert(embedder_model, embedder_model_custom, quantize)
+            self.last_embedder_model = embedder_model
 
             file_index = (
                 index_path.strip()
@@ -279,6 +536,65 @@ class VoiceConverter:
             if self.tgt_sr != resample_sr >= 16000:
                 self.tgt_sr = resample_sr
 
+            pipeline_kwargs = dict(
+                model=self.hubert_model,
+                net_g=self.net_g,
+                sid=sid,
+                pitch=pitch,
+                f0_method=f0_method,
+                file_index=file_index,
+                index_rate=index_rate,
+                pitch_guidance=self.use_f0,
+                volume_envelope=volume_envelope,
+                version=self.version,
+                protect=protect,
+                f0_autotune=f0_autotune,
+                f0_autotune_strength=f0_autotune_strength,
+                proposed_pitch=proposed_pitch,
+                proposed_pitch_threshold=proposed_pitch_threshold,
+                batch_size=segment_batch_size or self.config.segment_batch_size,
+                embedder_key=self.embedder_key,
+                timer=timer,
+            )
+
+            if long_file:
+                with seeded_rng(seed, self.config.device):
+                    self.convert_audio_long(
+                        audio_input_path,
+                        audio_output_path,
+                        pipeline_kwargs,
+                        clean_audio=clean_audio,
+                        clean_strength=clean_strength,
+                        post_process=post_process,
+                        timer=timer,
+                        progress=progress,
+                        **kwargs,
+                    )
+                duration = sf.info(audio_output_path).duration
+                output_path_format = audio_output_path.replace(
+                    ".wav", f".{export_format.lower()}"
+                )
+                with timer.stage("encode"):
+                    audio_output_path = self.convert_audio_format_stream(
+                        audio_output_path,
+                        output_path_format,
+                        export_format,
+                        quality=self.config.encode_quality,
+                    )
+                elapsed_time = timer.elapsed
+                print(
+                    f"Conversion completed at '{audio_output_path}' in {elapsed_time:.2f} seconds."
+                )
+                return ConversionResult(
+                    audio_output_path, self.tgt_sr, duration, elapsed_time, timer
+                )
+
+            audio = self.load_input_audio(audio_input_path, timer=timer, **kwargs)
+            audio_max = np.abs(audio).max() / 0.95
+
+            if audio_max > 1:
+                audio /= audio_max
+
             if split_audio:
                 chunks, intervals = process_audio(audio, 16000)
                 print(f"Audio split into {len(chunks)} chunks for processing.")
@@ -287,28 +603,19 @@ class VoiceConverter:
                 chunks.append(audio)
 
             converted_chunks = []
-            for c in chunks:
-                audio_opt = self.vc.pipeline(
-                    model=self.hubert_model,
-                    net_g=self.net_g,
-                    sid=sid,
-                    audio=c,
-                    pitch=pitch,
-                    f0_method=f0_method,
-                    file_index=file_index,
-                    index_rate=index_rate,
-                    pitch_guidance=self.use_f0,
-                    volume_envelope=volume_envelope,
-                    version=self.version,
-                    protect=protect,
-                    f0_autotune=f0_autotune,
-                    f0_autotune_strength=f0_autotune_strength,
-                    proposed_pitch=proposed_pitch,
-                    proposed_pitch_threshold=proposed_pitch_threshold,
-                )
-                converted_chunks.append(audio_opt)
-                if split_audio:
-                    print(f"Converted audio chunk {len(converted_chunks)}")
+            with seeded_rng(seed, self.config.device):
+                for c in chunks:
+                    if split_audio:
+                        audio_opt = self.vc.pipeline(audio=c, **pipeline_kwargs)
+                    else:
+                        audio_opt = self.vc.pipeline(
+                            audio=c, progress=progress, **pipeline_kwargs
+                        )
+                    converted_chunks.append(audio_opt)
+                    if split_audio:
+                        print(f"Converted audio chunk {len(converted_chunks)}")
+                        if progress is not None:
+                            progress(len(converted_chunks), len(chunks))
 
             if split_audio:
                 audio_opt = merge_audio(
@@ -317,35 +624,511 @@ class VoiceConverter:
             else:
                 audio_opt = converted_chunks[0]
 
-            if clean_audio:
+            return self.write_output(
+                audio_opt,
+                audio_output_path,
+                timer,
+                clean_audio=clean_audio,
+                clean_strength=clean_strength,
+                post_process=post_process,
+                export_format=export_format,
+                **kwargs,
+            )
+        except Exception as error:
+            print(f"An error occurred during audio conversion: {error}")
+            print(traceback.format_exc())
+
+    def write_output(
+        self,
+        audio_opt,
+        audio_output_path,
+        timer,
+        clean_audio=False,
+        clean_strength=0.5,
+        post_process=False,
+        export_format="WAV",
+        **kwargs,
+    ):
+        """
+        Cleans, post-processes and writes converted audio, as the last steps of `convert_audio`.
+        Without `audio_output_path` the audio is encoded in memory instead.
+
+        Returns:
+            ConversionResult: The output file (or the encoded audio) and the stage timings.
+        """
+        if clean_audio:
+            with timer.stage("noise_reduction"):
                 cleaned_audio = self.remove_audio_noise(
                     audio_opt, self.tgt_sr, clean_strength
                 )
-                if cleaned_audio is not None:
-                    audio_opt = cleaned_audio
+            if cleaned_audio is not None:
+                audio_opt = cleaned_audio
 
-            if post_process:
+        if post_process:
+            with timer.stage("effects"):
                 audio_opt = self.post_process_audio(
                     audio_input=audio_opt,
                     sample_rate=self.tgt_sr,
                     **kwargs,
                 )
 
-            sf.write(audio_output_path, audio_opt, self.tgt_sr, format="WAV")
-            output_path_format = audio_output_path.replace(
-                ".wav", f".{export_format.lower()}"
+        with timer.stage("encode"):
+            if audio_output_path:
+                audio_output_path = audio_output_path.replace(
+                    ".wav", f".{export_format.lower()}"
+                )
+                if export_format != "WAV":
+                    print(f"Saving audio as {export_format}...")
+            data = self.encode_audio(
+                audio_opt,
+                self.tgt_sr,
+                export_format,
+                output=audio_output_path or None,
+                quality=self.config.encode_quality,
+            )
+
+        elapsed_time = timer.elapsed
+        print(
+            f"Conversion completed at '{source_name(audio_output_path or data)}' in {elapsed_time:.2f} seconds."
+        )
+        return ConversionResult(
+            audio_output_path,
+            self.tgt_sr,
+            len(audio_opt) / self.tgt_sr,
+            elapsed_time,
+            timer,
+            data,
+        )
+
+    # settings of `convert_audio` that requests converted together must share
+    shared_settings = (
+        "model_path",
+        "index_path",
+        "sid",
+        "index_rate",
+        "protect",
+        "embedder_model",
+        "embedder_model_custom",
+        "resample_sr",
+        "backend",
+        "quantize",
+        "seed",
+    )
+
+    def convert_audio_many(self, requests, batch_size: int = None):
+        """
+        Converts several inputs with the same model in shared forward passes: the segments
+        of all of them go through the embedder, the retrieval and the synthesizer in padded
+        batches, see `Pipeline.pipeline_many`. Loading, F0 extraction, cleaning, effects and
+        encoding still run per input.
+
+        Inputs that need the whole-file paths (`split_audio`, long files) are converted
+        one by one with `convert_audio`.
+
+        Args:
+            requests (list): Keyword arguments of `convert_audio` for each input. The settings in `shared_settings` must be the same in all of them.
+            batch_size (int, optional): Segments per forward pass. Default is the number of inputs or the configured segment batch size, whichever is larger.
+
+        Returns:
+            list: The `ConversionResult` of each request, or None for those that failed.
+        """
+        parameters = inspect.signature(self.convert_audio).parameters
+        defaults = {
+            name: parameter.default
+            for name, parameter in parameters.items()
+            if parameter.default is not parameter.empty
+        }
+        settings = [{**defaults, **request} for request in requests]
+        shared = {key: settings[0][key] for key in self.shared_settings}
+        for request in settings[1:]:
+            if any(request[key] != shared[key] for key in self.shared_settings):
+                raise ValueError(
+                    f"Requests converted together must share {', '.join(self.shared_settings)}"
+                )
+
+        results = [None] * len(requests)
+        batched = []
+        for i, request in enumerate(settings):
+            long_file = request["long_file"]
+            if long_file is None:
+                long_file = self.is_long_file(request["audio_input_path"])
+            if request["split_audio"] or long_file:
+                results[i] = self.convert_audio(**requests[i])
+            else:
+                batched.append(i)
+        if not batched or not shared["model_path"]:
+            return results
+
+        timers = {i: StageTimer() for i in batched}
+        start = time.perf_counter()
+        try:
+            self.get_vc(
+                shared["model_path"],
+                shared["sid"],
+                shared["backend"],
+                shared["quantize"],
             )
-            audio_output_path = self.convert_audio_format(
-                audio_output_path, output_path_format, export_format
+            self.load_hubert(
+                shared["embedder_model"],
+                shared["embedder_model_custom"],
+                shared["quantize"],
             )
+            self.last_embedder_model = shared["embedder_model"]
+        except Exception as error:
+            print(f"An error occurred during audio conversion: {error}")
+            print(traceback.format_exc())
+            return results
+        for timer in timers.values():
+            timer.add("model_load", time.perf_counter() - start)
+        if self.vc is None:
+            return results
+        if self.tgt_sr != shared["resample_sr"] >= 16000:
+            self.tgt_sr = shared["resample_sr"]
 
-            elapsed_time = time.time() - start_time
-            print(
-                f"Conversion completed at '{audio_output_path}' in {elapsed_time:.2f} seconds."
+        # audio loading settings and effects, passed through **kwargs of `convert_audio`
+        extra = {
+            i: {
+                key: value
+                for key, value in requests[i].items()
+                if key not in parameters
+            }
+            for i in batched
+        }
+        inputs = {}
+        for i in batched:
+            request = settings[i]
+            print(f"Converting audio '{source_name(request['audio_input_path'])}'...")
+            try:
+                audio = self.load_input_audio(
+                    request["audio_input_path"], timer=timers[i], **extra[i]
+                )
+            except Exception as error:
+                print(f"An error occurred during audio conversion: {error}")
+                continue
+            audio_max = np.abs(audio).max() / 0.95
+            if audio_max > 1:
+                audio /= audio_max
+            inputs[i] = dict(
+                audio=audio,
+                pitch=request["pitch"],
+                f0_method=request["f0_method"],
+                volume_envelope=request["volume_envelope"],
+                f0_autotune=request["f0_autotune"],
+                f0_autotune_strength=request["f0_autotune_strength"],
+                proposed_pitch=request["proposed_pitch"],
+                proposed_pitch_threshold=request["proposed_pitch_threshold"],
+                # the noise of each input is drawn from the seed on its own, so the output
+                # does not depend on the inputs converted with it
+                seed=shared["seed"],
+                timer=timers[i],
+            )
+        if not inputs:
+            return results
+
+        file_index = (
+            shared["index_path"]
+            .strip()
+            .strip('"')
+            .strip("\n")
+            .strip('"')
+            .strip()
+            .replace("trained", "added")
+        )
+        try:
+            outputs = self.vc.pipeline_many(
+                self.hubert_model,
+                self.net_g,
+                shared["sid"],
+                list(inputs.values()),
+                file_index,
+                shared["index_rate"],
+                self.use_f0,
+                self.version,
+                shared["protect"],
+                batch_size=max(
+                    batch_size or len(inputs), self.config.segment_batch_size
+                ),
+                embedder_key=self.embedder_key,
             )
         except Exception as error:
             print(f"An error occurred during audio conversion: {error}")
             print(traceback.format_exc())
+            return results
+
+        for i, audio_opt in zip(inputs, outputs):
+            request = settings[i]
+            try:
+                results[i] = self.write_output(
+                    audio_opt,
+                    request["audio_output_path"],
+                    timers[i],
+                    clean_audio=request["clean_audio"],
+                    clean_strength=request["clean_strength"],
+                    post_process=request["post_process"],
+                    export_format=request["export_format"],
+                    **extra[i],
+                )
+            except Exception as error:
+                print(f"An error occurred during audio conversion: {error}")
+                print(traceback.format_exc())
+        return results
+
+    @staticmethod
+    def load_input_audio(audio_input_path, timer=None, **kwargs):
+        """
+        Loads an input file as 16 kHz mono through the feature cache, keyed by the file
+        content and the formant settings, so a clip converted with several models is
+        decoded and resampled once.
+
+        The input can also be in memory, see `rvc.lib.utils.read_audio`. Encoded bytes share
+        cache entries with a file of the same content.
+
+        Returns:
+            np.ndarray: A writable copy of the audio.
+        """
+        timer = timer if timer is not None else StageTimer()
+        source = audio_input_path
+        if hasattr(source, "read"):
+            source = source.read()
+        if not feature_cache.enabled:
+            return load_audio_infer(source, 16000, timer=timer, **kwargs)
+        if isinstance(source, str):
+            source = source.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
+            if not os.path.isfile(source):
+                raise FileNotFoundError(f"File not found: {source}")
+        formant = (
+            (kwargs.get("formant_qfrency", 0.8), kwargs.get("formant_timbre", 0.8))
+            if kwargs.get("formant_shifting", False)
+            else None
+        )
+        with timer.stage("feature_cache"):
+            if isinstance(source, tuple):
+                digest = f"{array_hash(source[0])}@{source[1]}"
+            else:
+                digest = content_hash(source)
+            key = feature_cache.key(digest, "audio", 16000, formant)
+            audio = feature_cache.get(key)
+        if audio is None:
+            audio = feature_cache.put(
+                key, load_audio_infer(source, 16000, timer=timer, **kwargs)
+            )
+        return np.array(audio)
+
+    def is_long_file(self, audio_input_path):
+        """
+        Returns whether a file is longer than the configured long-file threshold.
+        Audio already in memory is never treated as long.
+        """
+        if not self.config.long_file_seconds or not isinstance(audio_input_path, str):
+            return False
+        try:
+            info = sf.info(
+                audio_input_path.strip(" ").strip('"').strip("\n").strip('"')
+            )
+        except RuntimeError:
+            return False
+        return info.duration > self.config.long_file_seconds
+
+    def convert_audio_long(
+        self,
+        audio_input_path: str,
+        audio_output_path: str,
+        pipeline_kwargs: dict,
+        clean_audio: bool = False,
+        clean_strength: float = 0.5,
+        post_process: bool = False,
+        timer: StageTimer = None,
+        progress=None,
+        **kwargs,
+    ):
+        """
+        Converts an audio file segment by segment with memory independent of its duration.
+
+        The input is read in blocks and resampled incrementally. Segments of up to `t_center`
+        samples are cut at the quietest point of a `t_query` search window, converted with one
+        second of real audio on each side as context, and appended to a raw float file next
+        to the output as soon as they are ready. A second pass (`write_long_output`) applies a
+        single gain to the whole output, the cleaning and the effects, so that neither the
+        level nor the noise profile jumps at the cut points.
+
+        Args:
+            audio_input_path (str): Path to the input audio file.
+            audio_output_path (str): Path to the output WAV file.
+            pipeline_kwargs (dict): Arguments passed to `Pipeline.pipeline` for every segment.
+            clean_audio (bool, optional): Whether to clean the output. Defaults to False.
+            clean_strength (float, optional): Strength of the audio cleaning. Defaults to 0.5.
+            post_process (bool, optional): Whether to apply the post-processing effects. Defaults to False.
+            timer (StageTimer, optional): Receives the time of each stage. Defaults to None.
+            progress (callable, optional): Called with the number of segments converted and an estimate of the total. Defaults to None.
+            **kwargs: Post-processing effect settings.
+        """
+        vc = self.vc
+        timer = timer if timer is not None else StageTimer()
+        context = vc.t_pad
+        search_stop = vc.t_center - 2 * context
+        search_start = max(search_stop - 2 * vc.t_query, vc.window)
+
+        with timer.stage("decode"):
+            audio_max = audio_peak(audio_input_path) / 0.95
+        scale = 1 / audio_max if audio_max > 1 else 1
+        board = self.build_post_process_board(**kwargs) if post_process else None
+        # segments are cut between search_start and search_stop samples apart
+        expected_segments = math.ceil(
+            sf.info(audio_input_path).duration
+            * 16000
+            / (search_start + search_stop)
+            * 2
+        )
+
+        buffer = np.zeros(0)
+        buffer_start = 0  # position of buffer[0] in the 16 kHz input
+        seg_start = 0
+        n_segments = 0
+        peak = 0.0
+        # the segments are kept unnormalized until the peak of the whole output is known
+        raw_path = audio_output_path + ".raw"
+
+        try:
+            with open(raw_path, "wb") as raw:
+
+                def write_segment(seg_stop):
+                    nonlocal peak
+                    start = seg_start - buffer_start
+                    stop = seg_stop - buffer_start
+                    left = min(context, start)
+                    chunk = buffer[start - left : stop + context]
+                    audio_opt = vc.pipeline(
+                        audio=chunk, normalize=False, **pipeline_kwargs
+                    )
+                    out_left = left * self.tgt_sr // 16000
+                    expected = (
+                        seg_stop * self.tgt_sr // 16000
+                        - seg_start * self.tgt_sr // 16000
+                    )
+                    audio_opt = audio_opt[out_left : out_left + expected]
+                    if len(audio_opt) < expected:
+                        audio_opt = np.pad(audio_opt, (0, expected - len(audio_opt)))
+                    peak = max(peak, float(np.abs(audio_opt).max(initial=0)))
+                    with timer.stage("encode"):
+                        raw.write(audio_opt.astype(np.float32).tobytes())
+
+                blocks = stream_audio(audio_input_path, 16000)
+                while True:
+                    # decoding and resampling happen as the blocks are read
+                    with timer.stage("decode"):
+                        block = next(blocks, None)
+                    if block is None:
+                        break
+                    buffer = np.concatenate([buffer, block * scale])
+                    while (
+                        buffer_start + len(buffer) >= seg_start + search_stop + context
+                    ):
+                        offset = seg_start - buffer_start
+                        cut = seg_start + search_start
+                        cut += find_quiet_point(
+                            buffer[
+                                offset + search_start : offset + search_stop + vc.window
+                            ],
+                            vc.window,
+                        )
+                        cut = cut // vc.window * vc.window
+                        write_segment(cut)
+                        n_segments += 1
+                        print(f"Converted segment {n_segments} ({cut / 16000:.1f} s)")
+                        if progress is not None:
+                            progress(n_segments, max(expected_segments, n_segments + 1))
+                        seg_start = cut
+                        # keep only the left context of the next segment
+                        drop = seg_start - context - buffer_start
+                        buffer = buffer[drop:]
+                        buffer_start += drop
+
+                if buffer_start + len(buffer) > seg_start:
+                    write_segment(buffer_start + len(buffer))
+                    n_segments += 1
+
+            if os.path.getsize(raw_path) > 0:
+                samples = np.memmap(raw_path, dtype=np.float32, mode="r")
+            else:
+                samples = np.zeros(0, dtype=np.float32)
+            self.write_long_output(
+                samples,
+                audio_output_path,
+                self.tgt_sr,
+                peak,
+                clean_audio=clean_audio,
+                clean_strength=clean_strength,
+                board=board,
+                timer=timer,
+            )
+            del samples
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+        if progress is not None:
+            progress(n_segments, n_segments)
+
+    @staticmethod
+    def write_long_output(
+        samples,
+        audio_output_path: str,
+        sample_rate: int,
+        peak: float,
+        clean_audio: bool = False,
+        clean_strength: float = 0.5,
+        board=None,
+        timer: StageTimer = None,
+        block_size: int = 600000,
+        padding: int = 30000,
+    ):
+        """
+        Second pass of `convert_audio_long`: scales the whole output by a single gain that
+        keeps its peak below 0.99, then cleans and post-processes it block by block into a
+        WAV file.
+
+        Each block is cleaned with `padding` samples of its neighbours on each side, the way
+        noisereduce splits a whole file in chunks, so the noise estimate carries across block
+        boundaries.
+
+        Args:
+            samples (numpy.ndarray): The unnormalized output, usually memory-mapped.
+            audio_output_path (str): Path to the output WAV file.
+            sample_rate (int): Sample rate of the output.
+            peak (float): Absolute peak of `samples`.
+            clean_audio (bool, optional): Whether to clean the audio. Defaults to False.
+            clean_strength (float, optional): Strength of the audio cleaning. Defaults to 0.5.
+            board (Pedalboard, optional): Post-processing effects, applied as a stream. Defaults to None.
+            timer (StageTimer, optional): Receives the time of each stage. Defaults to None.
+            block_size (int, optional): Samples processed at a time. Defaults to 600000.
+            padding (int, optional): Context samples on each side of a block for the noise reduction. Defaults to 30000.
+        """
+        timer = timer if timer is not None else StageTimer()
+        audio_max = peak / 0.99
+        gain = 1 / audio_max if audio_max > 1 else 1
+        with sf.SoundFile(
+            audio_output_path, "w", samplerate=sample_rate, channels=1, format="WAV"
+        ) as output:
+            for start in range(0, len(samples), block_size):
+                stop = min(start + block_size, len(samples))
+                if clean_audio:
+                    left = min(padding, start)
+                    block = samples[start - left : stop + padding] * gain
+                    with timer.stage("noise_reduction"):
+                        cleaned_audio = VoiceConverter.remove_audio_noise(
+                            block, sample_rate, clean_strength
+                        )
+                    if cleaned_audio is not None:
+                        block = cleaned_audio
+                    block = block[left : left + stop - start]
+                else:
+                    block = samples[start:stop] * gain
+                if board is not None:
+                    with timer.stage("effects"):
+                        block = board(
+                            block.astype(np.float32), sample_rate, reset=False
+                        )
+                with timer.stage("encode"):
+                    output.write(block)
 
     def convert_audio_batch(
         self,
@@ -413,28 +1196,154 @@ class VoiceConverter:
         finally:
             os.remove(os.path.join(now_dir, "assets", "infer_pid.txt"))
 
-    def get_vc(self, weight_root, sid):
+    def get_vc(self, weight_root, sid, backend=None, quantize=False):
         """
         Loads the voice conversion model and sets up the pipeline.
 
+        Models are kept in an LRU cache keyed by path, modification time, size, backend and
+        quantization, so switching between recently used models does not reload them from disk.
+
         Args:
             weight_root (str): Path to the model weights.
             sid (int): Speaker ID.
+            backend (str, optional): "torch" or "onnx". Default is the configured backend.
+            quantize (bool, optional): Whether to quantize the text encoder to int8 (torch backend only). Defaults to False.
         """
         if sid == "" or sid == []:
             self.cleanup_model()
             if torch.cuda.is_available():
                 torch.cuda.empty_cache()
 
-        if not self.loaded_model or self.loaded_model != weight_root:
-            self.load_model(weight_root)
-            if self.cpt is not None:
-                self.setup_network()
-                self.setup_vc_instance()
-                self.loaded_model = weight_root
-            else:
-                self.vc = None
-                self.loaded_model = None
+        backend = backend or self.config.backend
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        key = self.model_key(weight_root, backend, quantize)
+        model = (
+            self.model_cache.get_or_load(
+                key, lambda: self.build_model(weight_root, backend, quantize)
+            )
+            if key is not None
+            else None
+        )
+        if model is None:
+            self.vc = None
+            self.loaded_model = None
+            return
+
+        self.net_g = model.net_g
+        self.vc = model.vc
+        self.tgt_sr = model.tgt_sr
+        self.use_f0 = model.use_f0
+        self.version = model.version
+        self.vocoder = model.vocoder
+        self.n_spk = model.n_spk
+        self.text_enc_hidden_dim = model.text_enc_hidden_dim
+        self.loaded_model = weight_root
+
+    def model_key(self, weight_root, backend=None, quantize=False):
+        """
+        Returns the model cache key of a checkpoint, or None if the file does not exist.
+        """
+        key = file_key(weight_root) if os.path.isfile(weight_root) else None
+        if key is None:
+            return None
+        return key + (backend or self.config.backend, bool(quantize))
+
+    def build_model(self, weight_root, backend="torch", quantize=False):
+        """
+        Loads a checkpoint and builds a ready-to-run model for the cache.
+
+        Args:
+            weight_root (str): Path to the model weights.
+            backend (str, optional): "torch" or "onnx". Defaults to "torch".
+            quantize (bool, optional): Whether to quantize the text encoder to int8 (torch backend only). Defaults to False.
+
+        Returns:
+            tuple: The LoadedModel and its size in bytes.
+        """
+        self.load_model(weight_root)
+        self.setup_network()
+        self.setup_vc_instance()
+        # the ONNX export needs the float32 text encoder
+        quantized = (
+            self.net_g is not None
+            and quantize
+            and backend == "torch"
+            and self.quantize_text_encoder()
+        )
+        if self.net_g is not None and backend == "onnx":
+            self.net_g = load_onnx_synthesizer(
+                weight_root, self.net_g, self.config.onnx_threads
+            )
+        elif self.net_g is not None and self.config.compile_mode != "off":
+            self.net_g = CompiledSynthesizer(
+                self.net_g,
+                weight_root,
+                mode=self.config.compile_mode,
+                cache_dir=self.config.compile_cache_dir,
+                bucket_frames=self.config.compile_bucket_frames,
+                variant="int8" if quantized else None,
+            )
+        model = LoadedModel(
+            net_g=self.net_g,
+            vc=self.vc,
+            tgt_sr=self.tgt_sr,
+            use_f0=self.use_f0,
+            version=self.version,
+            vocoder=self.vocoder,
+            n_spk=self.n_spk,
+            text_enc_hidden_dim=self.text_enc_hidden_dim,
+        )
+        # The weights now live in net_g, drop the checkpoint copy
+        self.cpt = None
+        nbytes = model.net_g.nbytes if backend == "onnx" else module_nbytes(model.net_g)
+        return model, nbytes
+
+    def quantize_text_encoder(self):
+        """
+        Quantizes the text encoder of the network being built, checked against float32 on
+        the reference clip through the contentvec features.
+
+        Returns:
+            bool: Whether the quantized text encoder was kept.
+        """
+        if not self.can_quantize():
+            return False
+        # the embedder loaded for the conversions stays the current one
+        _, hubert_model = self.get_embedder("contentvec")
+        feats = embedder_features(hubert_model, self.reference_clip(), self.version)
+        kept, snr = quantize_text_encoder(
+            self.net_g, feats, self.config.quantize_min_snr
+        )
+        print(
+            f"Text encoder int8 SNR: {snr:.1f} dB, "
+            + ("quantized." if kept else "kept in float32.")
+        )
+        return kept
+
+    def invalidate_model(self, weight_root):
+        """
+        Drops every cached version of a model, e.g. after its file is replaced or deleted.
+
+        Args:
+            weight_root (str): Path to the model weights.
+        """
+        path = os.path.abspath(weight_root)
+        self.model_cache.remove_if(lambda key: key[0] == path)
+        if self.loaded_model and os.path.abspath(self.loaded_model) == path:
+            self.loaded_model = None
+
+    def cache_stats(self):
+        """
+        Returns hit/miss counters and occupancy of the inference caches.
+        """
+        return {
+            "models": self.model_cache.stats(),
+            "embedders": self.embedder_cache.stats(),
+            "indexes": index_cache.stats(),
+            "features": feature_cache.stats(),
+            "predictors": loaded_predictors(),
+        }
 
     def cleanup_model(self):
         """
@@ -447,6 +1356,9 @@ class VoiceConverter:
                 torch.cuda.empty_cache()
 
         del self.net_g, self.cpt
+        self.model_cache.clear()
+        self.embedder_cache.clear()
+        self.loaded_model = None
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         self.cpt = None
@@ -484,7 +1396,7 @@ class VoiceConverter:
             )
             del self.net_g.enc_q
             self.net_g.load_state_dict(self.cpt["weight"], strict=False)
-            self.net_g = self.net_g.to(self.config.device).float()
+            self.net_g = self.net_g.to(self.config.device, self.config.dtype)
             self.net_g.eval()
 
     def setup_vc_instance(self):
@@ -0,0 +1,132 @@
+import os
+import copy
+import torch
+import numpy as np
+
+from rvc.infer.artifacts import onnx_path
+from rvc.infer.compiled import InferGraph, remove_parametrizations
+
+
+def export_onnx(net_g, output_path, opset_version=17):
+    """
+    Exports the inference graph of a loaded `Synthesizer` to ONNX.
+
+    The batch and time axes are dynamic, so one file serves every segment length. The
+    export is done in float32 on CPU from a copy of `net_g`, which is left untouched.
+
+    Args:
+        net_g (Synthesizer): Loaded synthesizer.
+        output_path (str): Path of the `.onnx` file to write.
+        opset_version (int, optional): ONNX opset. Defaults to 17.
+
+    Returns:
+        str: `output_path`.
+    """
+    net_g = remove_parametrizations(copy.deepcopy(net_g).float().cpu().eval())
+    graph = InferGraph(net_g)
+    frames = 200
+    inputs = (
+        torch.randn(1, frames, net_g.enc_p.emb_phone.in_features),
+        torch.tensor([frames]),
+        torch.tensor([0]),
+    )
+    input_names = ["phone", "phone_lengths", "sid"]
+    dynamic_axes = {
+        "phone": {0: "batch", 1: "frames"},
+        "phone_lengths": {0: "batch"},
+        "sid": {0: "batch"},
+        "audio": {0: "batch", 2: "samples"},
+    }
+    if net_g.use_f0:
+        inputs += (
+            torch.randint(1, 255, (1, frames)),
+            torch.full((1, frames), 200.0),
+        )
+        input_names += ["pitch", "nsff0"]
+        dynamic_axes["pitch"] = {0: "batch", 1: "frames"}
+        dynamic_axes["nsff0"] = {0: "batch", 1: "frames"}
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                graph,
+                inputs,
+                tmp_path,
+                input_names=input_names,
+                output_names=["audio"],
+                dynamic_axes=dynamic_axes,
+                opset_version=opset_version,
+                dynamo=False,
+            )
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+class OnnxSynthesizer:
+    """
+    Runs an exported synthesizer through onnxruntime with the same `infer` contract as
+    `Synthesizer.infer`, so the pipeline can use it in place of the torch module.
+
+    Calls with `rate` (streaming) decode every frame and return only the requested tail,
+    since the exported graph has no partial decode.
+
+    Args:
+        path (str): Path to the `.onnx` file.
+        use_f0 (int): Whether the model takes pitch inputs.
+        threads (int, optional): Intra-op threads. 0 lets onnxruntime decide. Defaults to 0.
+    """
+
+    def __init__(self, path, use_f0, threads=0):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.path = path
+        self.use_f0 = use_f0
+        self.nbytes = os.path.getsize(path)
+
+    def infer(self, phone, phone_lengths, pitch=None, nsff0=None, sid=None, rate=None):
+        device = phone.device
+        inputs = {
+            "phone": phone.float().cpu().numpy(),
+            "phone_lengths": phone_lengths.cpu().numpy().astype(np.int64),
+            "sid": sid.expand(phone.shape[0]).cpu().numpy().astype(np.int64),
+        }
+        if self.use_f0:
+            inputs["pitch"] = pitch.cpu().numpy().astype(np.int64)
+            inputs["nsff0"] = nsff0.float().cpu().numpy()
+        o = torch.from_numpy(self.session.run(None, inputs)[0]).to(device)
+        if rate is not None:
+            frames = phone.shape[1]
+            head = int(frames * (1.0 - float(rate)))
+            o = o[..., head * (o.shape[-1] // frames) :]
+        return o, None, None
+
+
+def load_onnx_synthesizer(model_path, net_g, threads=0):
+    """
+    Returns an `OnnxSynthesizer` for a checkpoint, exporting it first if the `.onnx` file
+    next to it is missing or older than the checkpoint.
+
+    Args:
+        model_path (str): Path to the `.pth` checkpoint.
+        net_g (Synthesizer): The checkpoint loaded as a synthesizer, used for the export.
+        threads (int, optional): Intra-op threads for onnxruntime. Defaults to 0.
+    """
+    path = onnx_path(model_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(
+        model_path
+    ):
+        print(f"Exporting '{model_path}' to ONNX...")
+        export_onnx(net_g, path)
+    return OnnxSynthesizer(path, net_g.use_f0, threads)
@@ -1,10 +1,10 @@
 import os
 import gc
 import sys
+import contextlib
 import torch
 import torch.nn.functional as F
 import torchcrepe
-import faiss
 import librosa
 import numpy as np
 from scipy import signal
@@ -13,7 +13,11 @@ from torch import Tensor
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
-from rvc.lib.predictors.f0 import CREPE, FCPE, RMVPE
+from rvc.lib.predictors.f0 import get_predictor
+from rvc.lib.algorithm.commons import sequence_mask, row_noise
+from rvc.infer.index_cache import index_cache
+from rvc.infer.feature_cache import feature_cache, array_hash
+from rvc.lib.timing import StageTimer
 
 import logging
 
@@ -27,6 +31,20 @@ bh, ah = signal.butter(
 )
 
 
+def find_quiet_point(audio, window):
+    """
+    Returns the start of the `window`-sample span of `audio` whose high-passed sum is
+    closest to zero, the criterion used to place cuts between segments.
+
+    Args:
+        audio (np.ndarray): 16 kHz audio to search, at least `window` samples long.
+        window (int): Length of the moving sum in samples.
+    """
+    audio = signal.filtfilt(bh, ah, audio)
+    csum = np.concatenate(([0.0], np.cumsum(audio)))
+    return int(np.abs(csum[window:] - csum[:-window]).argmin())
+
+
 class AudioProcessor:
     """
     A class for processing audio signals, specifically for adjusting RMS levels.
@@ -147,6 +165,7 @@ class Autotune:
             987.77,  # B5
             1046.50,  # C6
         ]
+        self.notes = np.array(self.note_dict)
 
     def autotune_f0(self, f0, f0_autotune_strength):
         """
@@ -155,10 +174,19 @@ class Autotune:
         Args:
             f0: The input F0 contour as a NumPy array.
         """
+        freq = np.asarray(f0)
+        notes = self.notes.astype(freq.dtype)
+        # neighbouring notes of each frame, the lower one wins a tie
+        upper = np.clip(np.searchsorted(notes, freq), 1, len(notes) - 1)
+        lower_note = notes[upper - 1]
+        upper_note = notes[upper]
+        closest_note = np.where(
+            np.abs(upper_note - freq) < np.abs(lower_note - freq),
+            upper_note,
+            lower_note,
+        )
         autotuned_f0 = np.zeros_like(f0)
-        for i, freq in enumerate(f0):
-            closest_note = min(self.note_dict, key=lambda x: abs(x - freq))
-            autotuned_f0[i] = freq + (closest_note - freq) * f0_autotune_strength
+        autotuned_f0[:] = freq + (closest_note - freq) * f0_autotune_strength
         return autotuned_f0
 
 
@@ -195,6 +223,8 @@ class Pipeline:
         self.f0_mel_min = 1127 * np.log(1 + self.f0_min / 700)
         self.f0_mel_max = 1127 * np.log(1 + self.f0_max / 700)
         self.device = config.device
+        self.dtype = config.dtype
+        self.autocast = config.autocast
         self.autotune = Autotune()
 
     def get_f0(
@@ -207,6 +237,7 @@ class Pipeline:
         f0_autotune_strength: float = 1.0,
         proposed_pitch: bool = False,
         proposed_pitch_threshold: float = 155.0,
+        cache_key: str = None,
     ):
         """
         Estimates the fundamental frequency (F0) of a given audio signal using various methods.
@@ -219,32 +250,47 @@ class Pipeline:
             f0_autotune: Whether to apply autotune to the F0 contour.
             proposed_pitch: whether to apply proposed pitch adjustment
             proposed_pitch_threshold: target frequency, 155.0 for male, 255.0 for female
+            cache_key: Feature cache key of the raw F0 of `x`. Defaults to no caching.
         """
-        if f0_method == "crepe":
-            model = CREPE(
-                device=self.device, sample_rate=self.sample_rate, hop_size=self.window
+        if cache_key is not None:
+            f0 = feature_cache.get_or_compute(
+                cache_key, lambda: self.predict_f0(x, p_len, f0_method)
             )
-            f0 = model.get_f0(x, self.f0_min, self.f0_max, p_len, "full")
-            del model
-        elif f0_method == "crepe-tiny":
-            model = CREPE(
-                device=self.device, sample_rate=self.sample_rate, hop_size=self.window
-            )
-            f0 = model.get_f0(x, self.f0_min, self.f0_max, p_len, "tiny")
-            del model
-        elif f0_method == "rmvpe":
-            model = RMVPE(
-                device=self.device, sample_rate=self.sample_rate, hop_size=self.window
-            )
-            f0 = model.get_f0(x, filter_radius=0.03)
-            del model
-        elif f0_method == "fcpe":
-            model = FCPE(
-                device=self.device, sample_rate=self.sample_rate, hop_size=self.window
-            )
-            f0 = model.get_f0(x, p_len, filter_radius=0.006)
-            del model
+            # the adjustments below work in place on a writable copy
+            f0 = np.array(f0)
+        else:
+            f0 = self.predict_f0(x, p_len, f0_method)
+        return self.adjust_f0(
+            f0,
+            pitch,
+            f0_autotune,
+            f0_autotune_strength,
+            proposed_pitch,
+            proposed_pitch_threshold,
+        )
+
+    def adjust_f0(
+        self,
+        f0,
+        pitch: int = 0,
+        f0_autotune: bool = False,
+        f0_autotune_strength: float = 1.0,
+        proposed_pitch: bool = False,
+        proposed_pitch_threshold: float = 155.0,
+    ):
+        """
+        Applies the pitch settings to a raw F0 contour, in place, and quantizes it.
 
+        Args:
+            f0: Raw F0 contour, as returned by `predict_f0`. It is modified.
+            pitch: Key to adjust the pitch of the F0 contour.
+            f0_autotune: Whether to apply autotune to the F0 contour.
+            proposed_pitch: whether to apply proposed pitch adjustment
+            proposed_pitch_threshold: target frequency, 155.0 for male, 255.0 for female
+
+        Returns:
+            tuple: (coarse F0 in 1..255, adjusted F0 in Hz).
+        """
         # f0 adjustments
         if f0_autotune is True:
             f0 = self.autotune.autotune_f0(f0, f0_autotune_strength)
@@ -290,6 +336,52 @@ class Pipeline:
 
         return f0_coarse, f0bak
 
+    def predict_f0(self, x, p_len, f0_method: str = "rmvpe"):
+        """
+        Runs the F0 predictor on a signal, without any pitch adjustment.
+
+        Args:
+            x: The input audio signal as a NumPy array.
+            p_len: Desired length of the F0 output.
+            f0_method: Method to use for F0 estimation (e.g., "crepe").
+        """
+        model = get_predictor(
+            f0_method, self.device, sample_rate=self.sample_rate, hop_size=self.window
+        )
+        if f0_method == "crepe":
+            f0 = model.get_f0(x, self.f0_min, self.f0_max, p_len, "full")
+        elif f0_method == "crepe-tiny":
+            f0 = model.get_f0(x, self.f0_min, self.f0_max, p_len, "tiny")
+        elif f0_method == "rmvpe":
+            f0 = model.get_f0(x, filter_radius=0.03)
+        elif f0_method == "fcpe":
+            f0 = model.get_f0(x, p_len, filter_radius=0.006)
+        return f0
+
+    def hidden_states(self, model, audio0, feature_key=None):
+        """
+        Returns the last hidden state of the embedder for an audio segment, read from the
+        feature cache when `feature_key` is given and stored there on a miss.
+        """
+        if feature_key is not None:
+            cached = feature_cache.get(feature_key)
+            if cached is not None:
+                return (
+                    torch.from_numpy(np.array(cached))
+                    .unsqueeze(0)
+                    .to(self.device, self.dtype)
+                )
+        feats = torch.from_numpy(audio0).float()
+        feats = feats.mean(-1) if feats.dim() == 2 else feats
+        assert feats.dim() == 1, feats.dim()
+        feats = feats.view(1, -1).to(self.device)
+        feats = model(feats)["last_hidden_state"]
+        if feature_key is not None:
+            feature_cache.put(
+                feature_key, feature_cache.hidden_states(feats[0].float().cpu().numpy())
+            )
+        return feats
+
     def voice_conversion(
         self,
         model,
@@ -303,6 +395,9 @@ class Pipeline:
         index_rate,
         version,
         protect,
+        rate=None,
+        feature_key=None,
+        timer=None,
     ):
         """
         Performs voice conversion on a given audio segment.
@@ -319,33 +414,99 @@ class Pipeline:
             index_rate: Blending rate for speaker embedding retrieval.
             version: Model version (Keep to support old models).
             protect: Protection level for preserving the original pitch.
+            rate: Fraction of the segment, counted from its end, to synthesize. Defaults to all of it.
+            feature_key: Feature cache key of the embedder output for this segment. Defaults to no caching.
+            timer: StageTimer receiving the time of each stage. Defaults to None.
         """
-        with torch.no_grad():
-            pitch_guidance = pitch != None and pitchf != None
-            # prepare source audio
-            feats = torch.from_numpy(audio0).float()
-            feats = feats.mean(-1) if feats.dim() == 2 else feats
-            assert feats.dim() == 1, feats.dim()
-            feats = feats.view(1, -1).to(self.device)
+        timer = timer if timer is not None else StageTimer()
+        with torch.no_grad(), self.autocast():
             # extract features
-            feats = model(feats)["last_hidden_state"]
-            feats = (
-                model.final_proj(feats[0]).unsqueeze(0) if version == "v1" else feats
+            with timer.stage("embedder"):
+                feats = self.extract_features(model, audio0, version, feature_key)
+            # set by parent function, only true if index is available, loaded, and index rate > 0
+            neighbours = None
+            if index:
+                with timer.stage("retrieval"):
+                    neighbours = self.retrieve_neighbours(feats, index, big_npy)
+            audio1 = self.synthesize(
+                net_g,
+                sid,
+                audio0.shape[0],
+                feats,
+                neighbours,
+                index_rate,
+                pitch,
+                pitchf,
+                protect,
+                rate,
+                timer,
             )
-            # make a copy for pitch guidance and protection
-            feats0 = feats.clone() if pitch_guidance else None
-            if (
-                index
-            ):  # set by parent function, only true if index is available, loaded, and index rate > 0
-                feats = self._retrieve_speaker_embeddings(
-                    feats, index, big_npy, index_rate
-                )
+        return audio1
+
+    def extract_features(self, model, audio0, version, feature_key=None):
+        """
+        Returns the embedder features of an audio segment, (1, frames, dim).
+        """
+        feats = self.hidden_states(model, audio0, feature_key)
+        return model.final_proj(feats[0]).unsqueeze(0) if version == "v1" else feats
+
+    def retrieve_neighbours(self, feats, index, big_npy):
+        """
+        Returns, for every frame of `feats`, the distance-weighted mean of its 8 nearest
+        speaker embeddings in the index. Blending them in is left to `synthesize`, so the
+        search does not depend on the index rate.
+        """
+        npy = feats[0].float().cpu().numpy()
+        score, ix = index.search(npy, k=8)
+        weight = np.square(1 / score)
+        weight /= weight.sum(axis=1, keepdims=True)
+        npy = np.sum(big_npy[ix] * np.expand_dims(weight, axis=2), axis=1)
+        return torch.from_numpy(npy).unsqueeze(0).to(self.device)
+
+    def synthesize(
+        self,
+        net_g,
+        sid,
+        audio_length,
+        feats,
+        neighbours,
+        index_rate,
+        pitch,
+        pitchf,
+        protect,
+        rate=None,
+        timer=None,
+    ):
+        """
+        Synthesizes a segment from its embedder features, the stages of
+        `voice_conversion` that depend on the model and the conversion settings.
+
+        Args:
+            net_g: The generative model for synthesizing speech.
+            sid: Speaker ID for the target voice.
+            audio_length: Length of the input segment in samples.
+            feats: Embedder features, as returned by `extract_features`. Not modified.
+            neighbours: Retrieved speaker embeddings, as returned by `retrieve_neighbours`, or None.
+            index_rate: Blending rate for speaker embedding retrieval.
+            pitch: Quantized F0 contour for pitch guidance.
+            pitchf: Original F0 contour for pitch guidance.
+            protect: Protection level for preserving the original pitch.
+            rate: Fraction of the segment, counted from its end, to synthesize. Defaults to all of it.
+            timer: StageTimer receiving the synthesizer time. Defaults to None.
+        """
+        timer = timer if timer is not None else StageTimer()
+        with torch.no_grad(), self.autocast():
+            pitch_guidance = pitch != None and pitchf != None
+            # keep the original features for pitch guidance and protection
+            feats0 = feats if pitch_guidance else None
+            if neighbours is not None and index_rate > 0:
+                feats = neighbours * index_rate + (1 - index_rate) * feats
             # feature upsampling
             feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(
                 0, 2, 1
             )
             # adjust the length if the audio is short
-            p_len = min(audio0.shape[0] // self.window, feats.shape[1])
+            p_len = min(audio_length // self.window, feats.shape[1])
             if pitch_guidance:
                 feats0 = F.interpolate(feats0.permute(0, 2, 1), scale_factor=2).permute(
                     0, 2, 1
@@ -363,30 +524,304 @@ class Pipeline:
             else:
                 pitch, pitchf = None, None
             p_len = torch.tensor([p_len], device=self.device).long()
-            audio1 = (
-                (net_g.infer(feats.float(), p_len, pitch, pitchf.float(), sid)[0][0, 0])
-                .data.cpu()
-                .float()
-                .numpy()
-            )
+            if rate is not None:
+                rate = torch.tensor([rate], device=self.device)
+            with timer.stage("synthesizer"):
+                audio1 = (
+                    (
+                        net_g.infer(
+                            feats.to(self.dtype),
+                            p_len,
+                            pitch,
+                            pitchf.float() if pitch_guidance else None,
+                            sid,
+                            rate,
+                        )[0][0, 0]
+                    )
+                    .data.cpu()
+                    .float()
+                    .numpy()
+                )
             # clean up
             del feats, feats0, p_len
             if torch.cuda.is_available():
                 torch.cuda.empty_cache()
         return audio1
 
-    def _retrieve_speaker_embeddings(self, feats, index, big_npy, index_rate):
-        npy = feats[0].cpu().numpy()
+    def voice_conversion_batch(
+        self,
+        model,
+        net_g,
+        sid,
+        audios,
+        pitches,
+        pitchfs,
+        index,
+        big_npy,
+        index_rate,
+        version,
+        protect,
+        feature_keys=None,
+        timer=None,
+    ):
+        """
+        Performs voice conversion on several audio segments in a single forward pass.
+
+        Segments are zero-padded to the longest one. The convolutional feature extractor of
+        the embedder runs per segment, since its group normalization spans the whole input,
+        while the transformer encoder, the retrieval and the synthesizer run once over the
+        batch using attention and length masks.
+
+        Args:
+            model: The feature extractor model.
+            net_g: The generative model for synthesizing speech.
+            sid: Speaker ID for the target voice.
+            audios: List of input audio segments.
+            pitches: List of quantized F0 contours, one per segment, or None.
+            pitchfs: List of original F0 contours, one per segment, or None.
+            index: FAISS index for speaker embedding retrieval.
+            big_npy: Speaker embeddings stored in a NumPy array.
+            index_rate: Blending rate for speaker embedding retrieval.
+            version: Model version (Keep to support old models).
+            protect: Protection level for preserving the original pitch.
+            feature_keys: Feature cache keys of the embedder output, one per segment. Defaults to no caching.
+            timer: StageTimer receiving the time of each stage. Defaults to None.
+
+        Returns:
+            list: The converted audio of each segment.
+        """
+        timer = timer if timer is not None else StageTimer()
+        with torch.no_grad(), self.autocast():
+            pitch_guidance = pitches is not None and pitchfs is not None
+            with timer.stage("embedder"):
+                cached = (
+                    [feature_cache.get(key) for key in feature_keys]
+                    if feature_keys is not None
+                    else [None]
+                )
+                if all(states is not None for states in cached):
+                    extracted = [
+                        torch.from_numpy(np.array(states)).to(self.device, self.dtype)
+                        for states in cached
+                    ]
+                    frames = torch.tensor(
+                        [e.shape[0] for e in extracted], device=self.device
+                    )
+                    feats = torch.nn.utils.rnn.pad_sequence(extracted, batch_first=True)
+                    mask = sequence_mask(frames, feats.shape[1])
+                else:
+                    # extract convolutional features segment by segment
+                    extracted = []
+                    for audio0 in audios:
+                        feats = torch.from_numpy(audio0).float()
+                        feats = feats.mean(-1) if feats.dim() == 2 else feats
+                        assert feats.dim() == 1, feats.dim()
+                        feats = feats.view(1, -1).to(self.device)
+                        extracted.append(
+                            model.feature_extractor(feats).transpose(1, 2)[0]
+                        )
+                    frames = torch.tensor(
+                        [e.shape[0] for e in extracted], device=self.device
+                    )
+                    feats = torch.nn.utils.rnn.pad_sequence(extracted, batch_first=True)
+                    mask = sequence_mask(frames, feats.shape[1])
+                    # run the transformer encoder over the whole batch
+                    feats = model.feature_projection(feats)
+                    feats = model.encoder(feats, attention_mask=mask)[0]
+                    if feature_keys is not None:
+                        for key, states, n in zip(feature_keys, feats, frames.tolist()):
+                            feature_cache.put(
+                                key,
+                                feature_cache.hidden_states(
+                                    states[:n].float().cpu().numpy()
+                                ),
+                            )
+                feats = model.final_proj(feats) if version == "v1" else feats
+            # make a copy for pitch guidance and protection
+            feats0 = feats.clone() if pitch_guidance else None
+            if index:
+                with timer.stage("retrieval"):
+                    feats = self._retrieve_speaker_embeddings_batch(
+                        feats, mask, index, big_npy, index_rate
+                    )
+            # feature upsampling
+            feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(
+                0, 2, 1
+            )
+            # adjust the lengths if the audio is short
+            p_lens = [
+                min(audio0.shape[0] // self.window, 2 * n)
+                for audio0, n in zip(audios, frames.tolist())
+            ]
+            if pitch_guidance:
+                feats0 = F.interpolate(feats0.permute(0, 2, 1), scale_factor=2).permute(
+                    0, 2, 1
+                )
+                pitch = torch.zeros(
+                    len(audios), feats.shape[1], dtype=torch.long, device=self.device
+                )
+                pitchf = torch.zeros(
+                    len(audios), feats.shape[1], dtype=torch.float, device=self.device
+                )
+                for i, p_len in enumerate(p_lens):
+                    segment_pitch = pitches[i][0, :p_len]
+                    pitch[i, : segment_pitch.shape[0]] = segment_pitch
+                    pitchf[i, : segment_pitch.shape[0]] = pitchfs[i][0, :p_len]
+                # Pitch protection blending
+                if protect < 0.5:
+                    pitchff = pitchf.clone()
+                    pitchff[pitchf > 0] = 1
+                    pitchff[pitchf < 1] = protect
+                    feats = feats * pitchff.unsqueeze(-1) + feats0 * (
+                        1 - pitchff.unsqueeze(-1)
+                    )
+                    feats = feats.to(feats0.dtype)
+                pitchf = pitchf.float()
+            else:
+                pitch, pitchf = None, None
+            lengths = torch.tensor(p_lens, device=self.device).long()
+            sids = sid.expand(len(audios))
+            with timer.stage("synthesizer"):
+                audio1 = (
+                    net_g.infer(feats.to(self.dtype), lengths, pitch, pitchf, sids)[0][
+                        :, 0
+                    ]
+                    .data.cpu()
+                    .float()
+                    .numpy()
+                )
+            # the synthesizer upsamples every frame by the same factor
+            upp = audio1.shape[1] // feats.shape[1]
+            outputs = [audio1[i, : p_len * upp] for i, p_len in enumerate(p_lens)]
+            # clean up
+            del feats, feats0, lengths, audio1
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        return outputs
+
+    def _retrieve_speaker_embeddings_batch(
+        self, feats, mask, index, big_npy, index_rate
+    ):
+        npy = feats[mask].float().cpu().numpy()
         score, ix = index.search(npy, k=8)
         weight = np.square(1 / score)
         weight /= weight.sum(axis=1, keepdims=True)
         npy = np.sum(big_npy[ix] * np.expand_dims(weight, axis=2), axis=1)
-        feats = (
-            torch.from_numpy(npy).unsqueeze(0).to(self.device) * index_rate
-            + (1 - index_rate) * feats
+        feats = feats.clone()
+        feats[mask] = (
+            torch.from_numpy(npy).to(self.device) * index_rate
+            + (1 - index_rate) * feats[mask]
         )
         return feats
 
+    def _find_cut_points(self, audio):
+        """
+        Finds where to cut a long input: around every `t_center` samples, the position in
+        a +-`t_query` window whose moving sum over `window` samples is closest to zero.
+
+        Window sums come from a cumulative sum. Positions whose sum could, within the
+        rounding error bound of both the cumulative sum and the sequential sum used
+        historically, be the minimum are re-summed sequentially, so the cut points are
+        bit-for-bit the ones of the former per-sample loop.
+
+        Args:
+            audio (np.ndarray): High-passed 16 kHz input audio.
+
+        Returns:
+            list: Cut positions in samples, empty if the input is short enough to convert at once.
+        """
+        audio_pad = np.pad(audio, (self.window // 2, self.window // 2), mode="reflect")
+        if audio_pad.shape[0] <= self.t_max:
+            return []
+        eps = np.finfo(audio_pad.dtype).eps / 2
+        opt_ts = []
+        for t in range(self.t_center, audio.shape[0], self.t_center):
+            start = t - self.t_query
+            stop = min(t + self.t_query, audio.shape[0])
+            segment = audio_pad[start : stop + self.window - 1]
+            csum = np.concatenate(([0.0], np.cumsum(segment)))
+            asum = np.concatenate(([0.0], np.cumsum(np.abs(segment))))
+            approx = np.abs(csum[self.window :] - csum[: -self.window])
+            # bound on |approx - historical sum|, with a margin for rounding in the bound itself
+            gamma = len(segment) * eps / (1 - len(segment) * eps)
+            gamma_window = self.window * eps / (1 - self.window * eps)
+            error = 1.01 * (
+                gamma * (asum[self.window :] + asum[: -self.window])
+                + gamma_window * (asum[self.window :] - asum[: -self.window])
+                + eps * approx
+            )
+            candidates = np.flatnonzero(approx - error <= (approx + error).min())
+            exact = np.zeros(len(candidates), dtype=audio_pad.dtype)
+            for i in range(self.window):
+                exact += audio_pad[start + candidates + i]
+            opt_ts.append(start + candidates[np.abs(exact).argmin()])
+        return opt_ts
+
+    def segment_bounds(self, audio):
+        """
+        Returns the overlapping segments a high-passed input is converted in, as
+        (start, stop) sample positions in the reflect-padded input. The last segment
+        has no stop and runs to the end.
+        """
+        bounds, s = [], 0
+        for t in self._find_cut_points(audio):
+            t = t // self.window * self.window
+            bounds.append((s, t + self.t_pad2))
+            s = t
+        bounds.append((s, None))
+        return bounds
+
+    def segment_audio(self, audio_pad, bound):
+        start, stop = bound
+        # one extra window so the embedder covers the last frame
+        if stop is None:
+            return audio_pad[start:]
+        return audio_pad[start : stop + self.window]
+
+    def segment_frames(self, frames, bound):
+        start, stop = bound
+        if stop is None:
+            return frames[:, start // self.window :]
+        return frames[:, start // self.window : stop // self.window]
+
+    def f0_key(self, audio_key, f0_method):
+        """
+        Feature cache key of the raw F0 of a padded input.
+        """
+        return feature_cache.key(
+            audio_key, "f0", f0_method, self.window, self.t_pad, self.device
+        )
+
+    def feature_key(self, audio_key, embedder_key, bound):
+        """
+        Feature cache key of the embedder output for one segment of an input.
+        """
+        return feature_cache.key(
+            audio_key,
+            "embedder",
+            embedder_key,
+            self.t_pad,
+            bound,
+            self.device,
+            str(self.dtype),
+        )
+
+    def finalize_output(self, audio, audio_opt, volume_envelope, normalize=True):
+        """
+        Applies the volume envelope of the input and, if `normalize` is set, keeps the output
+        peak below 0.99.
+        """
+        if volume_envelope != 1:
+            audio_opt = AudioProcessor.change_rms(
+                audio, self.sample_rate, audio_opt, self.tgt_sr, volume_envelope
+            )
+        if not normalize:
+            return audio_opt
+        audio_max = np.abs(audio_opt).max() / 0.99
+        if audio_max > 1:
+            audio_opt /= audio_max
+        return audio_opt
+
     def pipeline(
         self,
         model,
@@ -405,6 +840,11 @@ class Pipeline:
         f0_autotune_strength,
         proposed_pitch,
         proposed_pitch_threshold,
+        batch_size: int = 1,
+        embedder_key=None,
+        timer=None,
+        progress=None,
+        normalize: bool = True,
     ):
         """
         The main pipeline function for performing voice conversion.
@@ -413,146 +853,244 @@ class Pipeline:
             model: The feature extractor model.
             net_g: The generative model for synthesizing speech.
             sid: Speaker ID for the target voice.
-            audio: The input audio signal.
-            input_audio_path: Path to the input audio file.
+            audio: The input audio signal, at 16 kHz.
             pitch: Key to adjust the pitch of the F0 contour.
             f0_method: Method to use for F0 estimation.
             file_index: Path to the FAISS index file for speaker embedding retrieval.
             index_rate: Blending rate for speaker embedding retrieval.
             pitch_guidance: Whether to use pitch guidance during voice conversion.
-            tgt_sr: Target sampling rate for the output audio.
-            resample_sr: Resampling rate for the output audio.
+            volume_envelope: Blending rate between the RMS envelope of the input and that of the output.
             version: Model version.
             protect: Protection level for preserving the original pitch.
-            hop_length: Hop length for F0 estimation methods.
             f0_autotune: Whether to apply autotune to the F0 contour.
+            f0_autotune_strength: Strength of the autotune, from 0 to 1.
+            proposed_pitch: Whether to shift the F0 towards `proposed_pitch_threshold`.
+            proposed_pitch_threshold: Target F0 in Hz of `proposed_pitch`.
+            batch_size: Number of segments of a long input converted in a single forward pass.
+            embedder_key: Identifies the embedder in the feature cache. The F0 is cached regardless, the embedder features only when it is given.
+            timer: StageTimer receiving the time of each stage, with a breakdown per segment (or per batch of segments). Defaults to None.
+            progress: Called with the number of segments converted and the total after each batch. Defaults to None.
+            normalize: Whether to keep the output peak below 0.99. Callers converting a long input piece by piece disable it and apply a single gain to the whole output. Defaults to True.
+        """
+        return self.pipeline_many(
+            model,
+            net_g,
+            sid,
+            [
+                dict(
+                    audio=audio,
+                    pitch=pitch,
+                    f0_method=f0_method,
+                    volume_envelope=volume_envelope,
+                    f0_autotune=f0_autotune,
+                    f0_autotune_strength=f0_autotune_strength,
+                    proposed_pitch=proposed_pitch,
+                    proposed_pitch_threshold=proposed_pitch_threshold,
+                    timer=timer,
+                    normalize=normalize,
+                )
+            ],
+            file_index,
+            index_rate,
+            pitch_guidance,
+            version,
+            protect,
+            batch_size=batch_size,
+            embedder_key=embedder_key,
+            progress=progress,
+        )[0]
+
+    def pipeline_many(
+        self,
+        model,
+        net_g,
+        sid,
+        inputs,
+        file_index,
+        index_rate,
+        pitch_guidance,
+        version,
+        protect,
+        batch_size: int = 1,
+        embedder_key=None,
+        progress=None,
+    ):
+        """
+        Converts several inputs with the same model, index and protection. The segments of
+        all of them go through the embedder, the retrieval and the synthesizer together, in
+        padded batches of up to `batch_size` segments.
+
+        Args:
+            model: The feature extractor model.
+            net_g: The generative model for synthesizing speech.
+            sid: Speaker ID for the target voice.
+            inputs: One dict per input with its `audio` and its own `pitch`, `f0_method`, `volume_envelope`, `f0_autotune`, `f0_autotune_strength`, `proposed_pitch`, `proposed_pitch_threshold` and optionally a `timer`, `normalize` (see `finalize_output`, defaults to True) and `seed`. The noise of the segments of an input with a seed is drawn from it row by row, so its output does not depend on the inputs it is batched with.
+            file_index: Path to the FAISS index file for speaker embedding retrieval.
+            index_rate: Blending rate for speaker embedding retrieval.
+            pitch_guidance: Whether to use pitch guidance during voice conversion.
+            version: Model version.
+            protect: Protection level for preserving the original pitch.
+            batch_size: Number of segments converted in a single forward pass.
+            embedder_key: Identifies the embedder in the feature cache. The F0 is cached regardless, the embedder features only when it is given.
+            progress: Called with the number of segments converted and the total after each batch.
+
+        Returns:
+            list: The converted audio of each input. Each timer gets the time of the batches its segments were in.
         """
         if file_index != "" and os.path.exists(file_index) and index_rate > 0:
             try:
-                index = faiss.read_index(file_index)
-                big_npy = index.reconstruct_n(0, index.ntotal)
+                index, big_npy = index_cache.get(file_index)
             except Exception as error:
                 print(f"An error occurred reading the FAISS index: {error}")
                 index = big_npy = None
         else:
             index = big_npy = None
-        audio = signal.filtfilt(bh, ah, audio)
-        audio_pad = np.pad(audio, (self.window // 2, self.window // 2), mode="reflect")
-        opt_ts = []
-        if audio_pad.shape[0] > self.t_max:
-            audio_sum = np.zeros_like(audio)
-            for i in range(self.window):
-                audio_sum += audio_pad[i : i - self.window]
-            for t in range(self.t_center, audio.shape[0], self.t_center):
-                opt_ts.append(
-                    t
-                    - self.t_query
-                    + np.where(
-                        np.abs(audio_sum[t - self.t_query : t + self.t_query])
-                        == np.abs(audio_sum[t - self.t_query : t + self.t_query]).min()
-                    )[0][0]
-                )
-        s = 0
-        audio_opt = []
-        t = None
-        audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
-        p_len = audio_pad.shape[0] // self.window
         sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
-        if pitch_guidance:
-            pitch, pitchf = self.get_f0(
-                audio_pad,
-                p_len,
-                f0_method,
-                pitch,
-                f0_autotune,
-                f0_autotune_strength,
-                proposed_pitch,
-                proposed_pitch_threshold,
-            )
-            pitch = pitch[:p_len]
-            pitchf = pitchf[:p_len]
-            if self.device == "mps":
-                pitchf = pitchf.astype(np.float32)
-            pitch = torch.tensor(pitch, device=self.device).unsqueeze(0).long()
-            pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
-        for t in opt_ts:
-            t = t // self.window * self.window
+        # (input, audio, pitch, pitchf, feature key) of every segment, input by input
+        segments = []
+        # noise seed of every segment, None if its input has no seed
+        seeds = []
+        filtered = []
+        timers = []
+        for owner, settings in enumerate(inputs):
+            timer = settings.get("timer")
+            timer = timer if timer is not None else StageTimer()
+            audio = settings["audio"]
+            audio_key = array_hash(audio) if feature_cache.enabled else None
+            with timer.stage("highpass"):
+                audio = signal.filtfilt(bh, ah, audio)
+            with timer.stage("segmentation"):
+                bounds = self.segment_bounds(audio)
+            audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
+            p_len = audio_pad.shape[0] // self.window
+            pitch = pitchf = None
             if pitch_guidance:
-                audio_opt.append(
-                    self.voice_conversion(
-                        model,
-                        net_g,
-                        sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        pitch[:, s // self.window : (t + self.t_pad2) // self.window],
-                        pitchf[:, s // self.window : (t + self.t_pad2) // self.window],
-                        index,
-                        big_npy,
-                        index_rate,
-                        version,
-                        protect,
-                    )[self.t_pad_tgt : -self.t_pad_tgt]
+                f0_method = settings["f0_method"]
+                with timer.stage("f0"):
+                    pitch, pitchf = self.get_f0(
+                        audio_pad,
+                        p_len,
+                        f0_method,
+                        settings["pitch"],
+                        settings["f0_autotune"],
+                        settings["f0_autotune_strength"],
+                        settings["proposed_pitch"],
+                        settings["proposed_pitch_threshold"],
+                        cache_key=(
+                            self.f0_key(audio_key, f0_method) if audio_key else None
+                        ),
+                    )
+                pitch = pitch[:p_len]
+                pitchf = pitchf[:p_len]
+                if self.device == "mps":
+                    pitchf = pitchf.astype(np.float32)
+                pitch = torch.tensor(pitch, device=self.device).unsqueeze(0).long()
+                pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
+            # cut the padded audio and F0 into overlapping segments
+            seed = settings.get("seed")
+            for k, bound in enumerate(bounds):
+                seeds.append(None if seed is None else hash((seed, k)))
+                segments.append(
+                    (
+                        owner,
+                        self.segment_audio(audio_pad, bound),
+                        self.segment_frames(pitch, bound) if pitch_guidance else None,
+                        self.segment_frames(pitchf, bound) if pitch_guidance else None,
+                        (
+                            self.feature_key(audio_key, embedder_key, bound)
+                            if audio_key and embedder_key is not None
+                            else None
+                        ),
+                    )
                 )
-            else:
-                audio_opt.append(
-                    self.voice_conversion(
+            filtered.append(audio)
+            timers.append(timer)
+            del pitch, pitchf
+
+        order = list(range(len(segments)))
+        if len(inputs) > 1:
+            # batch segments of similar length together so less of each batch is padding
+            order.sort(key=lambda j: len(segments[j][1]))
+        outputs = [None] * len(segments)
+        batch_size = max(batch_size, 1)
+        for i in range(0, len(order), batch_size):
+            batch = [segments[j] for j in order[i : i + batch_size]]
+            batch_seeds = [seeds[j] for j in order[i : i + batch_size]]
+            batch_timer = StageTimer()
+            noise = (
+                row_noise(batch_seeds)
+                if None not in batch_seeds
+                else contextlib.nullcontext()
+            )
+            with noise:
+                if len(batch) > 1:
+                    feature_keys = [segment[4] for segment in batch]
+                    converted = self.voice_conversion_batch(
                         model,
                         net_g,
                         sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        None,
-                        None,
+                        [segment[1] for segment in batch],
+                        [segment[2] for segment in batch] if pitch_guidance else None,
+                        [segment[3] for segment in batch] if pitch_guidance else None,
                         index,
                         big_npy,
                         index_rate,
                         version,
                         protect,
-                    )[self.t_pad_tgt : -self.t_pad_tgt]
+                        feature_keys if feature_keys[0] is not None else None,
+                        timer=batch_timer,
+                    )
+                else:
+                    _, audio0, pitch, pitchf, feature_key = batch[0]
+                    converted = [
+                        self.voice_conversion(
+                            model,
+                            net_g,
+                            sid,
+                            audio0,
+                            pitch,
+                            pitchf,
+                            index,
+                            big_npy,
+                            index_rate,
+                            version,
+                            protect,
+                            feature_key=feature_key,
+                            timer=batch_timer,
+                        )
+                    ]
+            for j, output in zip(order[i : i + batch_size], converted):
+                outputs[j] = output[self.t_pad_tgt : -self.t_pad_tgt]
+            # every input in the batch waited for the whole of it
+            for owner in dict.fromkeys(segment[0] for segment in batch):
+                own = [segment for segment in batch if segment[0] == owner]
+                segment_timer = timers[owner].segment(
+                    segments=len(own), samples=sum(len(segment[1]) for segment in own)
                 )
-            s = t
-        if pitch_guidance:
-            audio_opt.append(
-                self.voice_conversion(
-                    model,
-                    net_g,
-                    sid,
-                    audio_pad[t:],
-                    pitch[:, t // self.window :] if t is not None else pitch,
-                    pitchf[:, t // self.window :] if t is not None else pitchf,
-                    index,
-                    big_npy,
-                    index_rate,
-                    version,
-                    protect,
-                )[self.t_pad_tgt : -self.t_pad_tgt]
-            )
-        else:
-            audio_opt.append(
-                self.voice_conversion(
-                    model,
-                    net_g,
-                    sid,
-                    audio_pad[t:],
-                    None,
-                    None,
-                    index,
-                    big_npy,
-                    index_rate,
-                    version,
-                    protect,
-                )[self.t_pad_tgt : -self.t_pad_tgt]
-            )
-        audio_opt = np.concatenate(audio_opt)
-        if volume_envelope != 1:
-            audio_opt = AudioProcessor.change_rms(
-                audio, self.sample_rate, audio_opt, self.tgt_sr, volume_envelope
-            )
-        audio_max = np.abs(audio_opt).max() / 0.99
-        if audio_max > 1:
-            audio_opt /= audio_max
-        if pitch_guidance:
-            del pitch, pitchf
-        del sid
+                for name, seconds in batch_timer.stages.items():
+                    segment_timer.add(name, seconds)
+            if progress is not None:
+                progress(min(i + batch_size, len(order)), len(order))
+
+        results = []
+        for owner, settings in enumerate(inputs):
+            with timers[owner].stage("rms"):
+                audio_opt = np.concatenate(
+                    [
+                        output
+                        for segment, output in zip(segments, outputs)
+                        if segment[0] == owner
+                    ]
+                )
+                results.append(
+                    self.finalize_output(
+                        filtered[owner],
+                        audio_opt,
+                        settings["volume_envelope"],
+                        settings.get("normalize", True),
+                    )
+                )
+        del sid, segments, outputs
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
-        return audio_opt
+        return results
@@ -0,0 +1,173 @@
+import copy
+import torch
+import librosa
+import numpy as np
+import torch.nn.functional as F
+from torch.ao.quantization import quantize_dynamic
+
+
+class ConvLinear(torch.nn.Module):
+    """
+    A stride-1 `Conv1d` computed as a `Linear` over unfolded windows, so dynamic
+    quantization (which only covers `Linear`) applies to it.
+
+    Args:
+        conv (torch.nn.Conv1d): Convolution to replace. Its weights are copied.
+    """
+
+    def __init__(self, conv):
+        super().__init__()
+        out_channels, in_channels, kernel_size = conv.weight.shape
+        # same attributes as Conv1d, the modules using the convolution read them
+        self.kernel_size = conv.kernel_size
+        self.padding = conv.padding
+        self.linear = torch.nn.Linear(
+            in_channels * kernel_size, out_channels, bias=conv.bias is not None
+        )
+        with torch.no_grad():
+            self.linear.weight.copy_(conv.weight.reshape(out_channels, -1))
+            if conv.bias is not None:
+                self.linear.bias.copy_(conv.bias)
+
+    @staticmethod
+    def supports(conv):
+        return (
+            conv.stride == (1,)
+            and conv.dilation == (1,)
+            and conv.groups == 1
+            and conv.padding_mode == "zeros"
+            and not isinstance(conv.padding, str)
+        )
+
+    def forward(self, x):
+        if self.padding[0]:
+            x = F.pad(x, (self.padding[0], self.padding[0]))
+        if self.kernel_size[0] > 1:
+            # (batch, channels, frames, kernel) -> (batch, frames, channels * kernel)
+            x = x.unfold(2, self.kernel_size[0], 1).permute(0, 2, 1, 3).flatten(2)
+        else:
+            x = x.transpose(1, 2)
+        return self.linear(x).transpose(1, 2)
+
+
+def convs_to_linear(module):
+    """
+    Replaces, in place, every supported `Conv1d` inside `module` with a `ConvLinear`.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Conv1d) and ConvLinear.supports(child):
+            setattr(module, name, ConvLinear(child))
+        else:
+            convs_to_linear(child)
+    return module
+
+
+def quantize_int8(module, convs=False):
+    """
+    Returns a dynamically int8-quantized copy of `module` for CPU inference.
+
+    Args:
+        module (torch.nn.Module): Float32 module in eval mode.
+        convs (bool, optional): Whether to also quantize stride-1 `Conv1d` layers through
+            `ConvLinear`. Defaults to False.
+    """
+    module = copy.deepcopy(module)
+    if convs:
+        convs_to_linear(module)
+    return quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def snr_db(reference, estimate):
+    """
+    Signal-to-noise ratio of `estimate` against `reference`, in dB.
+    """
+    reference, estimate = reference.float(), estimate.float()
+    noise = (reference - estimate).pow(2).sum()
+    signal = reference.pow(2).sum()
+    if noise == 0:
+        return float("inf")
+    return float(10 * torch.log10(signal / noise))
+
+
+def reference_clip(path=None, sample_rate=16000, seconds=4.0):
+    """
+    Returns the clip used to check quantized modules against float32.
+
+    Args:
+        path (str, optional): Audio file to use. Defaults to a synthetic voiced clip.
+        sample_rate (int, optional): Sample rate of the returned clip. Defaults to 16000.
+        seconds (float, optional): Length of the synthetic clip. Defaults to 4.0.
+
+    Returns:
+        np.ndarray: Mono float32 audio.
+    """
+    if path:
+        audio, _ = librosa.load(path, sr=sample_rate, mono=True)
+        return audio.astype(np.float32)
+    # harmonic source with vibrato and a slow amplitude envelope, plus breath noise
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    f0 = 150 * 2 ** (
+        0.5 * np.sin(2 * np.pi * 0.5 * t) + 0.03 * np.sin(2 * np.pi * 5 * t)
+    )
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    audio = sum(np.sin(k * phase) / k for k in range(1, 20))
+    audio *= 0.5 + 0.5 * np.sin(2 * np.pi * 1.5 * t) ** 2
+    audio += 0.05 * rng.standard_normal(len(t))
+    return (0.3 * audio / np.abs(audio).max()).astype(np.float32)
+
+
+def embedder_features(embedder, audio, version="v2"):
+    """
+    Runs an embedder on 16 kHz audio the way `Pipeline.voice_conversion` does.
+    """
+    device = next(embedder.parameters()).device
+    with torch.no_grad():
+        feats = torch.from_numpy(audio).float().view(1, -1).to(device)
+        feats = embedder(feats)["last_hidden_state"]
+        if version == "v1":
+            feats = embedder.final_proj(feats[0]).unsqueeze(0)
+    return feats
+
+
+def quantize_embedder(embedder, audio, min_snr):
+    """
+    Quantizes the `Linear` layers of an embedder and keeps the result only if its
+    features on `audio` stay within `min_snr` dB of the float32 features.
+
+    Returns:
+        tuple: (embedder to use, measured SNR in dB).
+    """
+    quantized = quantize_int8(embedder)
+    snr = snr_db(
+        embedder_features(embedder, audio), embedder_features(quantized, audio)
+    )
+    return (quantized if snr >= min_snr else embedder), snr
+
+
+def quantize_text_encoder(net_g, feats, min_snr):
+    """
+    Quantizes the text encoder (phone projection, attention and FFN layers) of a
+    synthesizer in place, if its outputs on `feats` stay within `min_snr` dB of float32.
+
+    Args:
+        net_g (Synthesizer): Float32 synthesizer on CPU.
+        feats (torch.Tensor): Embedder features of the reference clip, (1, frames, dim).
+        min_snr (float): Lowest accepted SNR in dB.
+
+    Returns:
+        tuple: (whether the quantized encoder was kept, measured SNR in dB).
+    """
+    feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(0, 2, 1)
+    frames = feats.shape[1]
+    lengths = torch.tensor([frames])
+    pitch = torch.full((1, frames), 100, dtype=torch.long) if net_g.use_f0 else None
+    quantized = quantize_int8(net_g.enc_p, convs=True)
+    with torch.no_grad():
+        m_p, logs_p, _ = net_g.enc_p(feats, pitch, lengths)
+        m_q, logs_q, _ = quantized(feats, pitch, lengths)
+    snr = snr_db(torch.cat([m_p, logs_p], 1), torch.cat([m_q, logs_q], 1))
+    if snr < min_snr:
+        return False, snr
+    net_g.enc_p = quantized
+    return True, snr
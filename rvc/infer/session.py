@@ -0,0 +1,291 @@
+import os
+import sys
+import time
+import uuid
+import torch
+import numpy as np
+from scipy import signal
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.pipeline import bh, ah
+from rvc.infer.index_cache import index_cache
+from rvc.infer.feature_cache import feature_cache, array_hash
+from rvc.lib.cache import LRUCache
+from rvc.lib.timing import StageTimer
+
+
+class RenderSession:
+    """
+    A clip analysed once for one model, so it can be rendered again with other settings.
+
+    Creating the session runs every stage that does not depend on the conversion settings:
+    loading the clip, the F0 predictor, the embedder and the FAISS neighbour search.
+    `render` then only adjusts the F0 for the key, blends the neighbours with the index
+    rate and runs the synthesizer.
+
+    The model, embedder and index are taken from a `VoiceConverter` once and kept for the
+    lifetime of the session, so cache evictions elsewhere do not affect it.
+
+    Args:
+        converter (VoiceConverter): Converter used to load the model and the embedder.
+        model_path (str): Path to the voice conversion model.
+        audio_input_path (str): Path to the clip.
+        index_path (str, optional): Path to the index file. Defaults to "".
+        sid (int, optional): Speaker ID. Defaults to 0.
+        f0_method (str, optional): Method for F0 extraction. Defaults to "rmvpe".
+        embedder_model (str, optional): Embedder model. Defaults to "contentvec".
+        embedder_model_custom (str, optional): Path to the custom embedder model. Defaults to None.
+        backend (str, optional): Synthesizer backend. Defaults to the configured backend.
+        quantize (bool, optional): Whether to run the embedder and the text encoder in int8. Defaults to False.
+        **kwargs: Audio loading settings (formant shifting), as in `convert_audio`.
+    """
+
+    def __init__(
+        self,
+        converter,
+        model_path: str,
+        audio_input_path: str,
+        index_path: str = "",
+        sid: int = 0,
+        f0_method: str = "rmvpe",
+        embedder_model: str = "contentvec",
+        embedder_model_custom: str = None,
+        backend: str = None,
+        quantize: bool = False,
+        **kwargs,
+    ):
+        converter.get_vc(model_path, sid, backend, quantize)
+        if converter.vc is None:
+            raise ValueError(f"Could not load model: {model_path}")
+        converter.load_hubert(embedder_model, embedder_model_custom, quantize)
+        self.session_id = None
+        self.model_path = model_path
+        self.vc = converter.vc
+        self.net_g = converter.net_g
+        self.tgt_sr = converter.tgt_sr
+        self.use_f0 = converter.use_f0
+        self.sid = torch.tensor([sid], device=self.vc.device).long()
+        self.f0_method = f0_method
+
+        index = big_npy = None
+        file_index = index_path.strip().strip('"').replace("trained", "added")
+        if file_index and os.path.exists(file_index):
+            try:
+                index, big_npy = index_cache.get(file_index)
+            except Exception as error:
+                print(f"An error occurred reading the FAISS index: {error}")
+
+        audio = converter.load_input_audio(audio_input_path, **kwargs)
+        audio_max = np.abs(audio).max() / 0.95
+        if audio_max > 1:
+            audio /= audio_max
+        self._analyse(
+            audio,
+            converter.hubert_model,
+            converter.embedder_key,
+            converter.version,
+            index,
+            big_npy,
+        )
+        self.last_used = time.monotonic()
+        self.renders = 0
+
+    def _analyse(self, audio, hubert_model, embedder_key, version, index, big_npy):
+        vc = self.vc
+        audio_key = array_hash(audio) if feature_cache.enabled else None
+        self.audio = signal.filtfilt(bh, ah, audio)
+        audio_pad = np.pad(self.audio, (vc.t_pad, vc.t_pad), mode="reflect")
+        self.p_len = audio_pad.shape[0] // vc.window
+        self.f0 = None
+        if self.use_f0:
+            if audio_key:
+                f0 = feature_cache.get_or_compute(
+                    vc.f0_key(audio_key, self.f0_method),
+                    lambda: vc.predict_f0(audio_pad, self.p_len, self.f0_method),
+                )
+            else:
+                f0 = vc.predict_f0(audio_pad, self.p_len, self.f0_method)
+            self.f0 = np.array(f0)
+        # (bound, segment length, embedder features, retrieved neighbours) per segment
+        self.segments = []
+        with torch.no_grad(), vc.autocast():
+            for bound in vc.segment_bounds(self.audio):
+                audio0 = vc.segment_audio(audio_pad, bound)
+                feature_key = (
+                    vc.feature_key(audio_key, embedder_key, bound)
+                    if audio_key
+                    else None
+                )
+                feats = vc.extract_features(hubert_model, audio0, version, feature_key)
+                neighbours = (
+                    vc.retrieve_neighbours(feats, index, big_npy) if index else None
+                )
+                self.segments.append((bound, audio0.shape[0], feats, neighbours))
+
+    @property
+    def duration(self):
+        return len(self.audio) / self.vc.sample_rate
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the analysis, the model and the embedder excluded.
+        """
+        nbytes = self.audio.nbytes + (self.f0.nbytes if self.f0 is not None else 0)
+        for _, _, feats, neighbours in self.segments:
+            nbytes += feats.element_size() * feats.nelement()
+            if neighbours is not None:
+                nbytes += neighbours.element_size() * neighbours.nelement()
+        return nbytes
+
+    def expired(self, ttl):
+        return time.monotonic() - self.last_used > ttl
+
+    def render(
+        self,
+        pitch: int = 0,
+        index_rate: float = 0.75,
+        protect: float = 0.5,
+        volume_envelope: float = 1.0,
+        f0_autotune: bool = False,
+        f0_autotune_strength: float = 1.0,
+        proposed_pitch: bool = False,
+        proposed_pitch_threshold: float = 155.0,
+        timer: StageTimer = None,
+    ):
+        """
+        Converts the clip with the given settings.
+
+        Args:
+            timer (StageTimer, optional): Receives the time of each stage. Defaults to None.
+
+        Returns:
+            np.ndarray: The converted audio at `tgt_sr`.
+        """
+        self.last_used = time.monotonic()
+        timer = timer if timer is not None else StageTimer()
+        vc = self.vc
+        pitch_t = pitchf_t = None
+        if self.use_f0:
+            with timer.stage("f0"):
+                pitch_t, pitchf_t = vc.adjust_f0(
+                    self.f0.copy(),
+                    pitch,
+                    f0_autotune,
+                    f0_autotune_strength,
+                    proposed_pitch,
+                    proposed_pitch_threshold,
+                )
+            pitch_t, pitchf_t = pitch_t[: self.p_len], pitchf_t[: self.p_len]
+            if vc.device == "mps":
+                pitchf_t = pitchf_t.astype(np.float32)
+            pitch_t = torch.tensor(pitch_t, device=vc.device).unsqueeze(0).long()
+            pitchf_t = torch.tensor(pitchf_t, device=vc.device).unsqueeze(0).float()
+
+        audio_opt = []
+        for bound, length, feats, neighbours in self.segments:
+            audio1 = vc.synthesize(
+                self.net_g,
+                self.sid,
+                length,
+                feats,
+                neighbours,
+                index_rate,
+                vc.segment_frames(pitch_t, bound) if self.use_f0 else None,
+                vc.segment_frames(pitchf_t, bound) if self.use_f0 else None,
+                protect,
+                timer=timer.segment(segments=1, samples=length),
+            )
+            audio_opt.append(audio1[vc.t_pad_tgt : -vc.t_pad_tgt])
+        with timer.stage("rms"):
+            audio_opt = vc.finalize_output(
+                self.audio, np.concatenate(audio_opt), volume_envelope
+            )
+        self.renders += 1
+        self.last_used = time.monotonic()
+        return audio_opt
+
+
+class SessionManager:
+    """
+    Keeps render sessions by id and drops them after `ttl` seconds without a render.
+
+    Sessions are also bounded by count and memory: creating one over budget drops the
+    least recently used ones.
+
+    Args:
+        ttl (float, optional): Inactivity in seconds after which a session expires. Defaults to 600.
+        max_sessions (int, optional): Maximum number of open sessions. 0 disables the limit. Defaults to 8.
+        max_bytes (int, optional): Budget for the analysis data of the sessions. 0 disables the limit. Defaults to 0.
+    """
+
+    def __init__(self, ttl=600, max_sessions=8, max_bytes=0):
+        self.ttl = ttl
+        self.cache = LRUCache(max_entries=max_sessions, max_bytes=max_bytes)
+        self.expirations = 0
+
+    def create(
+        self, converter, model_path, audio_input_path, session_id=None, **kwargs
+    ):
+        """
+        Analyses a clip and opens a session for it. See `RenderSession` for the other arguments.
+
+        Args:
+            session_id (str, optional): Id of the session. Defaults to a random one.
+
+        Returns:
+            RenderSession: The new session, with its `session_id` set.
+        """
+        self.expire()
+        session = RenderSession(converter, model_path, audio_input_path, **kwargs)
+        session.session_id = session_id or uuid.uuid4().hex
+        self.cache.put(session.session_id, session, session.nbytes)
+        return session
+
+    def get(self, session_id):
+        """
+        Returns an open session, or None if it does not exist or has expired.
+        """
+        self.expire()
+        return self.cache.get(session_id)
+
+    def remove(self, session_id):
+        """
+        Closes a session. Returns whether it was open.
+        """
+        return self.cache.pop(session_id) is not None
+
+    def remove_model(self, model_path):
+        """
+        Closes every session of a model, e.g. after its file is replaced or deleted.
+        """
+        path = os.path.abspath(model_path)
+        stale = {
+            session.session_id
+            for session in self.cache.values()
+            if os.path.abspath(session.model_path) == path
+        }
+        return self.cache.remove_if(lambda key: key in stale)
+
+    def expire(self):
+        """
+        Closes the sessions unused for longer than the TTL. Returns how many were closed.
+        """
+        stale = {
+            session.session_id
+            for session in self.cache.values()
+            if session.expired(self.ttl)
+        }
+        if not stale:
+            return 0
+        removed = self.cache.remove_if(lambda key: key in stale)
+        self.expirations += removed
+        return removed
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats["ttl"] = self.ttl
+        stats["expirations"] = self.expirations
+        return stats
@@ -0,0 +1,286 @@
+import os
+import sys
+import time
+import soxr
+import torch
+import numpy as np
+from collections import deque
+from scipy import signal
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.pipeline import bh, ah
+from rvc.infer.index_cache import index_cache
+
+
+class StreamingVoiceConverter:
+    """
+    Converts a live stream of PCM blocks with bounded latency.
+
+    Every incoming block is appended to a rolling 16 kHz buffer laid out as
+    [context | crossfade | block | lookahead]. HuBERT and the F0 predictor see the whole
+    buffer, `Synthesizer.infer` only decodes from shortly before the crossfade region, and
+    the converted crossfade region is overlap-added with the tail held back from the
+    previous block.
+
+    The model, embedder and index are taken from a `VoiceConverter` once and kept for the
+    lifetime of the stream, so cache evictions elsewhere do not affect it.
+
+    Args:
+        converter (VoiceConverter): Converter used to load the model and the embedder.
+        model_path (str): Path to the voice conversion model.
+        index_path (str, optional): Path to the index file. Defaults to "".
+        sid (int, optional): Speaker ID. Defaults to 0.
+        pitch (int, optional): Key for F0 up-sampling. Defaults to 0.
+        f0_method (str, optional): Method for F0 extraction. Defaults to "rmvpe".
+        index_rate (float, optional): Rate for index matching. Defaults to 0.75.
+        protect (float, optional): Protection rate for certain audio segments. Defaults to 0.5.
+        embedder_model (str, optional): Embedder model. Defaults to "contentvec".
+        embedder_model_custom (str, optional): Path to the custom embedder model. Defaults to None.
+        f0_autotune (bool, optional): Whether to use F0 autotune. Defaults to False.
+        f0_autotune_strength (float, optional): Strength of the autotune. Defaults to 1.0.
+        block_ms (int, optional): Audio converted per step, in ms. Defaults to 160.
+        context_ms (int, optional): Past audio given to HuBERT and the F0 predictor, in ms. Defaults to 600.
+        crossfade_ms (int, optional): Overlap between consecutive output blocks, in ms. Defaults to 40.
+        lookahead_ms (int, optional): Future audio seen before a block is emitted, in ms. Defaults to 40.
+        input_sr (int, optional): Sample rate of the incoming blocks. Defaults to 16000.
+        output_sr (int, optional): Sample rate of the returned blocks. Defaults to the model's.
+        backend (str, optional): Synthesizer backend. Defaults to "torch", which decodes only the new frames.
+        quantize (bool, optional): Whether to run the embedder and the text encoder in int8. Defaults to False.
+    """
+
+    # frames decoded before the crossfade region so the vocoder has left context
+    decode_margin = 4
+
+    def __init__(
+        self,
+        converter,
+        model_path: str,
+        index_path: str = "",
+        sid: int = 0,
+        pitch: int = 0,
+        f0_method: str = "rmvpe",
+        index_rate: float = 0.75,
+        protect: float = 0.5,
+        embedder_model: str = "contentvec",
+        embedder_model_custom: str = None,
+        f0_autotune: bool = False,
+        f0_autotune_strength: float = 1.0,
+        block_ms: int = 160,
+        context_ms: int = 600,
+        crossfade_ms: int = 40,
+        lookahead_ms: int = 40,
+        input_sr: int = 16000,
+        output_sr: int = None,
+        backend: str = "torch",
+        quantize: bool = False,
+    ):
+        converter.get_vc(model_path, sid, backend, quantize)
+        if converter.vc is None:
+            raise ValueError(f"Could not load model: {model_path}")
+        converter.load_hubert(embedder_model, embedder_model_custom, quantize)
+        self.backend = backend
+        self.quantize = quantize
+        self.vc = converter.vc
+        self.net_g = converter.net_g
+        self.hubert_model = converter.hubert_model
+        self.tgt_sr = converter.tgt_sr
+        self.use_f0 = converter.use_f0
+        self.version = converter.version
+        self.sid = torch.tensor([sid], device=self.vc.device).long()
+        self.pitch = pitch
+        self.f0_method = f0_method
+        self.index_rate = index_rate
+        self.protect = protect
+        self.f0_autotune = f0_autotune
+        self.f0_autotune_strength = f0_autotune_strength
+        self.index = self.big_npy = None
+        file_index = index_path.strip().strip('"').replace("trained", "added")
+        if file_index and os.path.exists(file_index) and index_rate > 0:
+            try:
+                self.index, self.big_npy = index_cache.get(file_index)
+            except Exception as error:
+                print(f"An error occurred reading the FAISS index: {error}")
+
+        window = self.vc.window
+        to_samples = lambda ms: int(round(ms / 10)) * window
+        self.block = max(to_samples(block_ms), window)
+        self.crossfade = min(to_samples(crossfade_ms), self.block)
+        self.lookahead = to_samples(lookahead_ms)
+        self.context = max(to_samples(context_ms), self.decode_margin * window)
+        self.buffer_size = self.context + self.crossfade + self.block + self.lookahead
+        # reflection padding so the embedder frames cover the end of the buffer
+        self.pad = 3 * window
+        self.upp = self.tgt_sr // 100
+
+        self.input_sr = input_sr
+        self.output_sr = output_sr or self.tgt_sr
+        crossfade_tgt = self.crossfade * self.upp // window
+        fade = np.sin(0.5 * np.pi * np.linspace(0, 1, crossfade_tgt)) ** 2
+        self.fade_in = fade.astype(np.float32)
+        self.fade_out = (1 - fade).astype(np.float32)
+        self.reset()
+
+    @property
+    def algorithmic_latency(self):
+        """
+        Delay in seconds between a sample entering the stream and its converted output,
+        not counting processing time.
+        """
+        return (self.block + self.crossfade + self.lookahead) / self.vc.sample_rate
+
+    def reset(self):
+        """
+        Clears the audio history and the statistics, e.g. when the input is interrupted.
+        """
+        self.buffer = np.zeros(self.buffer_size, dtype=np.float32)
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.tail = np.zeros(len(self.fade_in), dtype=np.float32)
+        self.input_resampler = (
+            soxr.ResampleStream(self.input_sr, self.vc.sample_rate, 1, dtype="float32")
+            if self.input_sr != self.vc.sample_rate
+            else None
+        )
+        self.output_resampler = (
+            soxr.ResampleStream(self.tgt_sr, self.output_sr, 1, dtype="float32")
+            if self.output_sr != self.tgt_sr
+            else None
+        )
+        self.blocks = 0
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+        self.step_times = deque(maxlen=200)
+
+    def process(self, audio):
+        """
+        Feeds PCM audio of any length and returns the converted audio that became ready.
+
+        Args:
+            audio (np.ndarray): Mono float PCM at `input_sr`.
+
+        Returns:
+            np.ndarray: Mono float32 PCM at `output_sr`, possibly empty.
+        """
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if self.input_resampler is not None:
+            audio = self.input_resampler.resample_chunk(audio)
+        self.pending = np.concatenate([self.pending, audio])
+        outputs = []
+        while len(self.pending) >= self.block:
+            outputs.append(self._step(self.pending[: self.block]))
+            self.pending = self.pending[self.block :]
+        return self._resample_output(outputs)
+
+    def flush(self):
+        """
+        Converts the remaining input, feeding silence for the lookahead, and returns the
+        last converted audio.
+        """
+        # silence pushes the audio still held in the lookahead and crossfade regions out
+        silence = self.lookahead + self.crossfade
+        silence += -(len(self.pending) + silence) % self.block
+        self.pending = np.concatenate(
+            [self.pending, np.zeros(silence, dtype=np.float32)]
+        )
+        outputs = []
+        while len(self.pending) >= self.block:
+            outputs.append(self._step(self.pending[: self.block]))
+            self.pending = self.pending[self.block :]
+        return self._resample_output(outputs, last=True)
+
+    def stats(self):
+        """
+        Returns latency and real-time factor figures of the stream so far.
+        """
+        block_seconds = self.block / self.vc.sample_rate
+        step_times = np.array(self.step_times) if self.step_times else np.zeros(1)
+        return {
+            "blocks": self.blocks,
+            "block_ms": block_seconds * 1000,
+            "algorithmic_latency_ms": self.algorithmic_latency * 1000,
+            "last_processing_ms": float(step_times[-1]) * 1000,
+            "p95_processing_ms": float(np.percentile(step_times, 95)) * 1000,
+            "latency_ms": (self.algorithmic_latency + float(step_times[-1])) * 1000,
+            "rtf": (
+                self.processing_seconds / self.audio_seconds
+                if self.audio_seconds
+                else 0.0
+            ),
+        }
+
+    def _resample_output(self, outputs, last=False):
+        audio = np.concatenate(outputs) if outputs else np.zeros(0, dtype=np.float32)
+        if self.output_resampler is not None:
+            audio = self.output_resampler.resample_chunk(audio, last=last)
+        return audio
+
+    def _embedder_frames(self, n_samples):
+        # length of the HuBERT convolutional front-end output
+        config = self.hubert_model.config
+        for kernel, stride in zip(config.conv_kernel, config.conv_stride):
+            n_samples = (n_samples - kernel) // stride + 1
+        return n_samples
+
+    def _step(self, block):
+        start_time = time.perf_counter()
+        window = self.vc.window
+        self.buffer = np.concatenate([self.buffer[len(block) :], block])
+        audio = signal.filtfilt(bh, ah, self.buffer)
+        audio = np.pad(audio, (0, self.pad), mode="reflect")
+        # frames seen by voice_conversion, counted from the start of the buffer
+        p_len = min(len(audio) // window, 2 * self._embedder_frames(len(audio)))
+
+        pitch = pitchf = None
+        if self.use_f0:
+            pitch, pitchf = self.vc.get_f0(
+                audio,
+                p_len,
+                self.f0_method,
+                self.pitch,
+                self.f0_autotune,
+                self.f0_autotune_strength,
+            )
+            pitch = np.pad(pitch[:p_len], (0, max(p_len - len(pitch), 0)), mode="edge")
+            pitchf = np.pad(
+                pitchf[:p_len], (0, max(p_len - len(pitchf), 0)), mode="edge"
+            )
+            pitch = torch.tensor(pitch, device=self.vc.device).unsqueeze(0).long()
+            pitchf = torch.tensor(pitchf, device=self.vc.device).unsqueeze(0).float()
+
+        decode_from = self.context // window - self.decode_margin
+        audio_opt = self.vc.voice_conversion(
+            self.hubert_model,
+            self.net_g,
+            self.sid,
+            audio,
+            pitch,
+            pitchf,
+            self.index,
+            self.big_npy,
+            self.index_rate,
+            self.version,
+            self.protect,
+            rate=(p_len - decode_from) / p_len,
+        )
+        # the decoded audio ends at frame p_len, locate the crossfade region in it
+        first_frame = p_len - len(audio_opt) // self.upp
+        start = (self.context // window - first_frame) * self.upp
+        crossfade = len(self.fade_in)
+        block_tgt = self.block * self.upp // window
+        region = audio_opt[start : start + block_tgt + crossfade]
+        if len(region) < block_tgt + crossfade:
+            region = np.pad(region, (0, block_tgt + crossfade - len(region)))
+
+        output = region[:block_tgt].copy()
+        output[:crossfade] = (
+            self.tail * self.fade_out + output[:crossfade] * self.fade_in
+        )
+        self.tail = region[block_tgt:]
+
+        elapsed = time.perf_counter() - start_time
+        self.blocks += 1
+        self.audio_seconds += len(block) / self.vc.sample_rate
+        self.processing_seconds += elapsed
+        self.step_times.append(elapsed)
+        return output.astype(np.float32)
@@ -1,6 +1,12 @@
 import torch
+import itertools
+import threading
+from contextlib import contextmanager
 from typing import Optional
 
+# seeds of the batch rows while `row_noise` is active, per thread
+_row_noise = threading.local()
+
 
 def init_weights(m, mean=0.0, std=0.01):
     """
@@ -136,3 +142,74 @@ def grad_norm(parameters, norm_type: float = 2.0):
     return torch.linalg.vector_norm(
         torch.stack([p.grad.norm(norm_type) for p in parameters]), ord=norm_type
     ).item()
+
+
+@contextmanager
+def row_noise(seeds):
+    """
+    Draws the noise of the models per batch row inside the block, each row from its own
+    seed, so a row gets the same noise whatever it is batched with and however much it
+    is padded.
+
+    Args:
+        seeds: One integer seed per row of the batches run inside the block, or None to draw from the global RNG again.
+    """
+    previous = getattr(_row_noise, "state", None)
+    _row_noise.state = (list(seeds), itertools.count()) if seeds is not None else None
+    try:
+        yield
+    finally:
+        _row_noise.state = previous
+
+
+def row_noise_seeds():
+    """
+    The row seeds of the enclosing `row_noise` block of the calling thread, or None.
+    """
+    state = getattr(_row_noise, "state", None)
+    return state[0] if state is not None else None
+
+
+def _draw_rows(draw, shape, dtype, device, time_dim):
+    seeds, calls = _row_noise.state
+    if shape[0] != len(seeds):
+        raise ValueError(f"Noise for {shape[0]} rows drawn with {len(seeds)} seeds")
+    # every draw has its own generator, so it does not depend on the size of the others
+    call = next(calls)
+    row_shape = list(shape[1:])
+    if time_dim is not None:
+        # time first: the leading values of a row do not depend on its padding
+        row_shape.insert(0, row_shape.pop(time_dim - 1))
+    rows = []
+    for seed in seeds:
+        generator = torch.Generator().manual_seed(hash((seed, call)) & (2**63 - 1))
+        row = draw(row_shape, generator=generator)
+        rows.append(row.movedim(0, time_dim - 1) if time_dim is not None else row)
+    return torch.stack(rows).to(device=device, dtype=dtype)
+
+
+def randn_like(x: torch.Tensor, time_dim: Optional[int] = None):
+    """
+    `torch.randn_like`, drawn per row inside `row_noise`.
+
+    Args:
+        x: Tensor whose shape, dtype and device the noise takes; its first dimension is the batch.
+        time_dim: Time dimension of `x`, if any.
+    """
+    if row_noise_seeds() is None:
+        return torch.randn_like(x)
+    return _draw_rows(torch.randn, x.shape, x.dtype, x.device, time_dim)
+
+
+def rand(*size: int, device=None, time_dim: Optional[int] = None):
+    """
+    `torch.rand`, drawn per row inside `row_noise`.
+
+    Args:
+        size: Shape of the noise; its first dimension is the batch.
+        device: Device of the noise.
+        time_dim: Time dimension of the noise, if any.
+    """
+    if row_noise_seeds() is None:
+        return torch.rand(*size, device=device)
+    return _draw_rows(torch.rand, size, torch.float32, device, time_dim)
@@ -5,7 +5,7 @@ from torch.nn.utils.parametrizations import weight_norm
 from typing import Optional
 
 from rvc.lib.algorithm.residuals import LRELU_SLOPE, ResBlock
-from rvc.lib.algorithm.commons import init_weights
+from rvc.lib.algorithm.commons import init_weights, rand, randn_like
 
 
 class HiFiGANGenerator(torch.nn.Module):
@@ -186,7 +186,7 @@ class SineGenerator(torch.nn.Module):
         phase_increments *= harmonic_scale
 
         # Add random phase offset (except for the fundamental)
-        random_phase = torch.rand(1, 1, self.waveform_dim, device=f0.device)
+        random_phase = rand(batch_size, 1, self.waveform_dim, device=f0.device)
         random_phase[..., 0] = 0  # Fundamental frequency has no random offset
         phase_increments += random_phase
 
@@ -220,7 +220,7 @@ class SineGenerator(torch.nn.Module):
             )
 
             # Add Gaussian noise
-            noise = noise_amplitude * torch.randn_like(sine_waves)
+            noise = noise_amplitude * randn_like(sine_waves, 1)
 
             # Combine sine waves and noise
             sine_waveforms = sine_waves * voiced_mask + noise
@@ -7,6 +7,8 @@ from torch.nn.utils import remove_weight_norm
 from torch.nn.utils.parametrizations import weight_norm
 from torch.utils.checkpoint import checkpoint
 
+from rvc.lib.algorithm.commons import rand, randn_like
+
 LRELU_SLOPE = 0.1
 
 
@@ -140,9 +142,7 @@ class SineGenerator(torch.nn.Module):
         rad_values = (f0_values / self.sampling_rate) % 1
 
         # initial phase noise (no noise for fundamental component)
-        rand_ini = torch.rand(
-            f0_values.shape[0], f0_values.shape[2], device=f0_values.device
-        )
+        rand_ini = rand(f0_values.shape[0], f0_values.shape[2], device=f0_values.device)
         rand_ini[:, 0] = 0
         rad_values[:, 0, :] = rad_values[:, 0, :] + rand_ini
 
@@ -169,7 +169,7 @@ class SineGenerator(torch.nn.Module):
             uv = self._f02uv(f0)
 
             noise_amp = uv * self.noise_std + (1 - uv) * self.sine_amp / 3
-            noise = noise_amp * torch.randn_like(sine_waves)
+            noise = noise_amp * randn_like(sine_waves, 1)
 
             sine_waves = sine_waves * uv + noise
         return sine_waves, uv, noise
@@ -7,7 +7,7 @@ from torch.nn.utils.parametrizations import weight_norm
 from torch.nn.utils import remove_weight_norm
 from torch.utils.checkpoint import checkpoint
 
-from rvc.lib.algorithm.commons import init_weights, get_padding
+from rvc.lib.algorithm.commons import init_weights, get_padding, rand, randn_like
 
 
 class ResBlock(nn.Module):
@@ -110,7 +110,7 @@ class AdaIN(nn.Module):
         self.activation = nn.LeakyReLU(leaky_relu_slope)
 
     def forward(self, x: torch.Tensor):
-        gaussian = torch.randn_like(x) * self.weight[None, :, None]
+        gaussian = randn_like(x, 2) * self.weight[None, :, None]
 
         return self.activation(x + gaussian)
 
@@ -228,9 +228,7 @@ class SineGenerator(nn.Module):
         rad_values = (f0_values / self.sampling_rate) % 1
 
         # initial phase noise (no noise for fundamental component)
-        rand_ini = torch.rand(
-            f0_values.shape[0], f0_values.shape[2], device=f0_values.device
-        )
+        rand_ini = rand(f0_values.shape[0], f0_values.shape[2], device=f0_values.device)
         rand_ini[:, 0] = 0
         rad_values[:, 0, :] = rad_values[:, 0, :] + rand_ini
 
@@ -257,7 +255,7 @@ class SineGenerator(nn.Module):
             uv = self._f02uv(f0)
 
             noise_amp = uv * self.noise_std + (1 - uv) * self.sine_amp / 3
-            noise = noise_amp * torch.randn_like(sine_waves)
+            noise = noise_amp * randn_like(sine_waves, 1)
 
             sine_waves = sine_waves * uv + noise
 
@@ -341,6 +339,28 @@ class RefineGANGenerator(nn.Module):
             )
             channels = new_channels
 
+        # anti-aliasing kernels only depend on the size ratio, so they are built once
+        # instead of on every forward (this also keeps the graph exportable)
+        self.resample_widths = []
+        for i, (old_size, new_size) in enumerate(self.df0):
+            resampler = torchaudio.transforms.Resample(
+                old_size,
+                new_size,
+                lowpass_filter_width=64,
+                rolloff=0.9475937167399596,
+                resampling_method="sinc_interp_kaiser",
+                beta=14.769656459379492,
+                dtype=torch.float32,
+            )
+            self.df0[i] = [
+                int(old_size) // resampler.gcd,
+                int(new_size) // resampler.gcd,
+            ]
+            self.resample_widths.append(resampler.width)
+            self.register_buffer(
+                f"resample_kernel_{i}", resampler.kernel, persistent=False
+            )
+
         # mel handling
         channels = upsample_initial_channel
 
@@ -384,6 +404,19 @@ class RefineGANGenerator(nn.Module):
         )
         self.conv_post.apply(init_weights)
 
+    def resample(self, x: torch.Tensor, index: int):
+        """
+        Same as `torchaudio.functional.resample` with the precomputed kernel `index`.
+        """
+        old_size, new_size = self.df0[index]
+        width = self.resample_widths[index]
+        kernel = getattr(self, f"resample_kernel_{index}")
+        batch, channels, length = x.shape
+        x = F.pad(x.reshape(batch * channels, 1, length), (width, width + old_size))
+        x = F.conv1d(x, kernel.to(x.dtype), stride=old_size)
+        x = x.transpose(1, 2).reshape(batch, channels, -1)
+        return x[..., : -(-new_size * length // old_size)]
+
     def forward(self, mel: torch.Tensor, f0: torch.Tensor, g: torch.Tensor = None):
         f0_size = mel.shape[-1]
         # change f0 helper to full size
@@ -394,19 +427,11 @@ class RefineGANGenerator(nn.Module):
         x = self.pre_conv(har_source)
         # downsampled/upchanneled versions for each upscale
         downs = []
-        for block, (old_size, new_size) in zip(self.downsample_blocks, self.df0):
+        for i, block in enumerate(self.downsample_blocks):
             x = F.leaky_relu(x, self.leaky_relu_slope)
             downs.append(x)
             # attempt to cancel spectral aliasing
-            x = torchaudio.functional.resample(
-                x.contiguous(),
-                orig_freq=int(f0_size * old_size),
-                new_freq=int(f0_size * new_size),
-                lowpass_filter_width=64,
-                rolloff=0.9475937167399596,
-                resampling_method="sinc_interp_kaiser",
-                beta=14.769656459379492,
-            )
+            x = self.resample(x, i)
             x = block(x)
 
         # expanding spectrogram from 192 to 256 channels
@@ -0,0 +1,240 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+def file_key(path):
+    """
+    Builds a cache key that changes whenever the file at `path` is replaced or modified.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        tuple: (absolute path, mtime in ns, size in bytes), or None if the file does not exist.
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def tree_key(path):
+    """
+    Like `file_key`, for a path that can also be a directory (a `from_pretrained` model):
+    the key changes whenever any file directly inside it is replaced or modified.
+
+    Args:
+        path (str): Path to the file or directory.
+
+    Returns:
+        tuple: The `file_key` of the file, or of every file in the directory sorted by name.
+    """
+    if not os.path.isdir(path):
+        return file_key(path)
+    return tuple(
+        file_key(os.path.join(path, name))
+        for name in sorted(os.listdir(path))
+        if os.path.isfile(os.path.join(path, name))
+    )
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by entry count and/or total size.
+
+    Entries loaded through `get_or_load` are loaded only once even if several threads
+    request the same missing key at the same time.
+
+    Args:
+        max_entries (int, optional): Maximum number of entries. 0 disables the limit. Defaults to 0.
+        max_bytes (int, optional): Maximum total size of the entries in bytes. 0 disables the limit. Defaults to 0.
+        on_evict (callable, optional): Called with (key, value) when an entry leaves the cache. Defaults to None.
+    """
+
+    def __init__(self, max_entries=0, max_bytes=0, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._pinned = set()
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._entries.values())
+
+    def values(self):
+        """
+        Returns a snapshot of the cached values, least recently used first.
+        """
+        with self._lock:
+            return [value for value, _ in self._entries.values()]
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for `key` and marks it as most recently used.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, nbytes=0, pinned=False):
+        """
+        Inserts or replaces an entry, evicting least recently used entries if over budget.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            nbytes (int, optional): Size accounted for the entry. Defaults to 0.
+            pinned (bool, optional): Whether the entry is exempt from eviction. Defaults to False.
+        """
+        with self._lock:
+            replaced = self._entries.pop(key, None)
+            self._entries[key] = (value, nbytes)
+            if pinned:
+                self._pinned.add(key)
+            evicted = self._evict(keep=key)
+        if replaced is not None and replaced[0] is not value:
+            evicted.insert(0, (key, replaced[0]))
+        self._notify(evicted)
+
+    def get_or_load(self, key, loader, pinned=False):
+        """
+        Returns the cached value for `key`, calling `loader` to build it on a miss.
+
+        Args:
+            key: Cache key.
+            loader (callable): Returns a (value, nbytes) tuple for the missing entry.
+            pinned (bool, optional): Whether a newly loaded entry is exempt from eviction. Defaults to False.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+            try:
+                value, nbytes = loader()
+                self.put(key, value, nbytes, pinned=pinned)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return value
+
+    def pop(self, key, default=None):
+        """
+        Removes an entry and returns its value.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            self._pinned.discard(key)
+        if entry is None:
+            return default
+        self._notify([(key, entry[0])])
+        return entry[0]
+
+    def remove_if(self, predicate):
+        """
+        Removes every entry whose key satisfies `predicate`, pinned or not.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            removed = [(key, self._entries.pop(key)[0]) for key in keys]
+            self._pinned.difference_update(keys)
+        self._notify(removed)
+        return len(removed)
+
+    def pin(self, key):
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key):
+        with self._lock:
+            self._pinned.discard(key)
+            evicted = self._evict()
+        self._notify(evicted)
+
+    def clear(self):
+        with self._lock:
+            removed = [(key, value) for key, (value, _) in self._entries.items()]
+            self._entries.clear()
+            self._pinned.clear()
+        self._notify(removed)
+
+    def stats(self):
+        """
+        Returns hit/miss counters and current occupancy.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "bytes": sum(nbytes for _, nbytes in self._entries.values()),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _over_budget(self):
+        if self.max_entries and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes:
+            return sum(nbytes for _, nbytes in self._entries.values()) > self.max_bytes
+        return False
+
+    def _evict(self, keep=None):
+        # Must be called with the lock held. The entry being inserted is never evicted,
+        # so a single oversized entry still stays usable until something replaces it.
+        evicted = []
+        while self._over_budget():
+            victim = next(
+                (
+                    key
+                    for key in self._entries
+                    if key not in self._pinned and key != keep
+                ),
+                None,
+            )
+            if victim is None:
+                break
+            evicted.append((victim, self._entries.pop(victim)[0]))
+            self.evictions += 1
+        return evicted
+
+    def _notify(self, removed):
+        if self.on_evict is None:
+            return
+        for key, value in removed:
+            self.on_evict(key, value)
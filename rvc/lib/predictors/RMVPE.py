@@ -424,9 +424,10 @@ class RMVPE0Predictor:
     Args:
         model_path (str): Path to the RMVPE0 model file.
         device (str, optional): Device to use for computation. Defaults to None, which uses CUDA if available.
+        dtype (torch.dtype, optional): Precision the network runs in. Defaults to torch.float32.
     """
 
-    def __init__(self, model_path, device=None):
+    def __init__(self, model_path, device=None, dtype=torch.float32):
         self.resample_kernel = {}
         model = E2E(4, 1, (2, 2))
         ckpt = torch.load(model_path, map_location="cpu", weights_only=True)
@@ -439,6 +440,7 @@ class RMVPE0Predictor:
             N_MELS, 16000, 1024, 160, None, 30, 8000
         ).to(device)
         self.model = self.model.to(device)
+        self.dtype = dtype
         cents_mapping = 20 * np.arange(N_CLASS) + 1997.3794084376191
         self.cents_mapping = np.pad(cents_mapping, (4, 4))
 
@@ -471,7 +473,13 @@ class RMVPE0Predictor:
                 # mel_chunk = F.pad(mel_chunk, (320, 320), mode="reflect")
                 # print(' after padding', mel_chunk.shape)
 
-                out_chunk = self.model(mel_chunk)
+                # the network may run in reduced precision, the decode stays in fp32
+                with torch.autocast(
+                    device_type=str(self.device).split(":")[0],
+                    dtype=self.dtype,
+                    enabled=self.dtype != torch.float32,
+                ):
+                    out_chunk = self.model(mel_chunk).float()
                 # print(' result chunk', out_chunk.shape)
                 # out_chunk = out_chunk[:, 320:-320, :]
                 # print(' trimmed chunk', out_chunk.shape)
@@ -523,15 +531,10 @@ class RMVPE0Predictor:
         center = np.argmax(salience, axis=1)
         salience = np.pad(salience, ((0, 0), (4, 4)))
         center += 4
-        todo_salience = []
-        todo_cents_mapping = []
-        starts = center - 4
-        ends = center + 5
-        for idx in range(salience.shape[0]):
-            todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
-            todo_cents_mapping.append(self.cents_mapping[starts[idx] : ends[idx]])
-        todo_salience = np.array(todo_salience)
-        todo_cents_mapping = np.array(todo_cents_mapping)
+        # gather the 9 bins around each frame's peak in one indexing operation
+        windows = center[:, None] + np.arange(-4, 5)
+        todo_salience = np.take_along_axis(salience, windows, axis=1)
+        todo_cents_mapping = self.cents_mapping[windows]
         product_sum = np.sum(todo_salience * todo_cents_mapping, 1)
         weight_sum = np.sum(todo_salience, 1)
         devided = product_sum / weight_sum
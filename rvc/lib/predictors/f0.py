@@ -1,6 +1,8 @@
 import os
 import torch
+import threading
 
+from rvc.configs.config import Config
 from rvc.lib.predictors.RMVPE import RMVPE0Predictor
 from torchfcpe import spawn_infer_model_from_pt
 import torchcrepe
@@ -15,6 +17,7 @@ class RMVPE:
         self.model = RMVPE0Predictor(
             os.path.join("rvc", "models", "predictors", model_name),
             device=self.device,
+            dtype=Config().dtype,
         )
 
     def get_f0(self, x, filter_radius=0.03):
@@ -87,3 +90,90 @@ class FCPE:
         )
 
         return f0
+
+
+PREDICTORS = {
+    "crepe": CREPE,
+    "crepe-tiny": CREPE,
+    "rmvpe": RMVPE,
+    "fcpe": FCPE,
+}
+
+_predictors = {}
+_predictors_lock = threading.Lock()
+
+
+def get_predictor(f0_method, device, sample_rate=16000, hop_size=160):
+    """
+    Returns the resident F0 predictor for a method and device, loading it on first use.
+
+    Predictors are kept for the lifetime of the process, so the model weights are read
+    from disk and moved to the device only once.
+
+    Args:
+        f0_method (str): F0 method ("crepe", "crepe-tiny", "rmvpe" or "fcpe").
+        device (str): Device the predictor runs on.
+        sample_rate (int, optional): Sample rate of the input audio. Defaults to 16000.
+        hop_size (int, optional): Hop size in samples. Defaults to 160.
+    """
+    if f0_method not in PREDICTORS:
+        raise ValueError(f"Unknown F0 method: {f0_method}")
+    key = (f0_method, str(device), sample_rate, hop_size)
+    with _predictors_lock:
+        predictor = _predictors.get(key)
+        if predictor is None:
+            predictor = PREDICTORS[f0_method](
+                device=device, sample_rate=sample_rate, hop_size=hop_size
+            )
+            _predictors[key] = predictor
+    return predictor
+
+
+def register_predictor(f0_method, device, predictor, sample_rate=16000, hop_size=160):
+    """
+    Makes `predictor` the resident predictor of an F0 method and device, e.g. a
+    stand-in without model weights for benchmarks.
+
+    Args:
+        f0_method (str): F0 method the predictor answers for.
+        device (str): Device the predictor runs on.
+        predictor: Object with the `get_f0` signature of that method.
+        sample_rate (int, optional): Sample rate of the input audio. Defaults to 16000.
+        hop_size (int, optional): Hop size in samples. Defaults to 160.
+    """
+    if f0_method not in PREDICTORS:
+        raise ValueError(f"Unknown F0 method: {f0_method}")
+    with _predictors_lock:
+        _predictors[(f0_method, str(device), sample_rate, hop_size)] = predictor
+
+
+def preload_predictors(f0_methods, device, sample_rate=16000, hop_size=160):
+    """
+    Loads the given F0 predictors and runs them once on silence so the first request
+    does not pay for loading or lazy initialisation.
+
+    Args:
+        f0_methods (list): F0 methods to preload.
+        device (str): Device the predictors run on.
+        sample_rate (int, optional): Sample rate of the input audio. Defaults to 16000.
+        hop_size (int, optional): Hop size in samples. Defaults to 160.
+    """
+    silence = np.zeros(sample_rate, dtype=np.float32)
+    for f0_method in f0_methods:
+        predictor = get_predictor(f0_method, device, sample_rate, hop_size)
+        if f0_method == "crepe-tiny":
+            predictor.get_f0(silence, model="tiny")
+        else:
+            predictor.get_f0(silence)
+        print(f"Preloaded {f0_method} F0 predictor on {device}")
+
+
+def loaded_predictors():
+    """
+    Returns the (method, device) pairs of the resident F0 predictors.
+    """
+    with _predictors_lock:
+        return [
+            {"f0_method": f0_method, "device": device}
+            for f0_method, device, _, _ in _predictors
+        ]
@@ -0,0 +1,95 @@
+import time
+import contextlib
+import dataclasses
+from collections import OrderedDict
+
+
+class StageTimer:
+    """
+    Wall-clock time spent in each named stage of a conversion.
+
+    Stages can be entered several times (e.g. once per segment), their durations add up.
+    `segment` returns a child timer for the stages of one segment: its times are kept
+    separately for the per-segment breakdown and also added to this timer's totals.
+
+    Args:
+        parent (StageTimer, optional): Timer the stage times are also added to. Defaults to None.
+        **info: Extra fields reported with the breakdown (e.g. the segment length).
+    """
+
+    def __init__(self, parent=None, **info):
+        self.parent = parent
+        self.info = info
+        self.stages = OrderedDict()
+        self.segments = []
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager timing the enclosed block as `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.parent is not None:
+            self.parent.add(name, seconds)
+
+    def segment(self, **info):
+        """
+        Returns the timer of the next segment.
+        """
+        child = StageTimer(parent=self, index=len(self.segments), **info)
+        self.segments.append(child)
+        return child
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """
+        Returns the stage totals and the per-segment breakdown, in seconds.
+        """
+        timings = dict(self.info)
+        timings["stages"] = dict(self.stages)
+        if self.segments:
+            timings["segments"] = [segment.as_dict() for segment in self.segments]
+        return timings
+
+    def server_timing(self, total=None):
+        """
+        Formats the stage totals as a `Server-Timing` header value (durations in ms).
+
+        Args:
+            total (float, optional): Seconds reported as the "total" metric. Defaults to the time since the timer was created.
+        """
+        total = self.elapsed if total is None else total
+        metrics = [
+            f"{name.replace(' ', '_')};dur={seconds * 1000:.1f}"
+            for name, seconds in self.stages.items()
+        ]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+@dataclasses.dataclass
+class ConversionResult:
+    """
+    Output of `VoiceConverter.convert_audio` and the time spent in each stage.
+
+    It lives here, with no torch import, because the web API unpickles it from the
+    inference workers.
+    """
+
+    output_path: str  # None when the audio was returned in memory
+    sample_rate: int
+    duration: float  # seconds of converted audio
+    elapsed: float  # seconds
+    timings: StageTimer
+    data: bytes = None  # the encoded audio, when no output path was given
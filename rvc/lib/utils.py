@@ -1,3 +1,4 @@
+import io
 import os
 import sys
 import soxr
@@ -24,6 +25,8 @@ logging.getLogger("torch").setLevel(logging.ERROR)
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
+from rvc.lib.timing import StageTimer
+
 base_path = os.path.join(now_dir, "rvc", "models", "formant", "stftpitchshift")
 stft = base_path + ".exe" if sys.platform == "win32" else base_path
 
@@ -60,41 +63,118 @@ def load_audio(file, sample_rate):
     return audio.flatten()
 
 
+def read_audio(source):
+    """
+    Decodes an audio source: a file path, the encoded bytes of a file, a file-like object
+    or a `(samples, sample_rate)` tuple of decoded audio.
+
+    Returns:
+        tuple: The samples, frames first, and the sample rate.
+    """
+    if isinstance(source, tuple):
+        audio, sr = source
+        return np.asarray(audio, dtype=np.float64), sr
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source, str):
+        source = source.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
+        if not os.path.isfile(source):
+            raise FileNotFoundError(f"File not found: {source}")
+    return sf.read(source)
+
+
 def load_audio_infer(
     file,
     sample_rate,
+    timer=None,
     **kwargs,
 ):
     formant_shifting = kwargs.get("formant_shifting", False)
+    timer = timer if timer is not None else StageTimer()
     try:
-        file = file.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
-        if not os.path.isfile(file):
-            raise FileNotFoundError(f"File not found: {file}")
-        audio, sr = sf.read(file)
-        if len(audio.shape) > 1:
-            audio = librosa.to_mono(audio.T)
+        with timer.stage("decode"):
+            audio, sr = read_audio(file)
+            if len(audio.shape) > 1:
+                audio = librosa.to_mono(audio.T)
         if sr != sample_rate:
-            audio = librosa.resample(
-                audio, orig_sr=sr, target_sr=sample_rate, res_type="soxr_vhq"
-            )
+            with timer.stage("resample"):
+                audio = librosa.resample(
+                    audio, orig_sr=sr, target_sr=sample_rate, res_type="soxr_vhq"
+                )
         if formant_shifting:
             formant_qfrency = kwargs.get("formant_qfrency", 0.8)
             formant_timbre = kwargs.get("formant_timbre", 0.8)
 
             from stftpitchshift import StftPitchShift
 
-            pitchshifter = StftPitchShift(1024, 32, sample_rate)
-            audio = pitchshifter.shiftpitch(
-                audio,
-                factors=1,
-                quefrency=formant_qfrency * 1e-3,
-                distortion=formant_timbre,
-            )
+            with timer.stage("formant"):
+                pitchshifter = StftPitchShift(1024, 32, sample_rate)
+                audio = pitchshifter.shiftpitch(
+                    audio,
+                    factors=1,
+                    quefrency=formant_qfrency * 1e-3,
+                    distortion=formant_timbre,
+                )
     except Exception as error:
         raise RuntimeError(f"An error occurred loading the audio: {error}")
     return np.array(audio).flatten()
 
 
+def audio_peak(file, blocksize=65536):
+    """
+    Returns the peak absolute amplitude of the mono mix of an audio file, reading it in blocks.
+    """
+    file = file.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
+    peak = 0.0
+    for block in sf.blocks(file, blocksize=blocksize, always_2d=True):
+        if block.size:
+            peak = max(peak, float(np.abs(block.mean(axis=1)).max()))
+    return peak
+
+
+def stream_audio(file, sample_rate, blocksize=65536):
+    """
+    Reads an audio file in blocks, mixing it down to mono and resampling it incrementally.
+
+    Args:
+        file (str): Path to the audio file.
+        sample_rate (int): Sample rate of the yielded audio.
+        blocksize (int, optional): Frames read from the file at a time. Defaults to 65536.
+
+    Yields:
+        np.ndarray: Consecutive float64 blocks of mono audio at `sample_rate`.
+    """
+    file = file.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
+    if not os.path.isfile(file):
+        raise FileNotFoundError(f"File not found: {file}")
+    sr = sf.info(file).samplerate
+    resampler = (
+        soxr.ResampleStream(sr, sample_rate, 1, dtype="float64", quality="VHQ")
+        if sr != sample_rate
+        else None
+    )
+    for block in sf.blocks(file, blocksize=blocksize, always_2d=True):
+        block = block.mean(axis=1)
+        if resampler is not None:
+            block = resampler.resample_chunk(block)
+        if block.size:
+            yield block
+    if resampler is not None:
+        block = resampler.resample_chunk(np.zeros(0), last=True)
+        if block.size:
+            yield block
+
+
+def module_nbytes(module):
+    """
+    Returns the memory held by the parameters and buffers of a torch module, in bytes.
+    """
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for tensor in list(module.parameters()) + list(module.buffers())
+    )
+
+
 def format_title(title):
     formatted_title = unicodedata.normalize("NFC", title)
     formatted_title = re.sub(r"[\u2500-\u257F]+", "", formatted_title)
@@ -0,0 +1,96 @@
+import asyncio
+
+class BatchScheduler:
+    """
+    Agrupa las conversiones que llegan casi a la vez para el mismo modelo y las ejecuta
+    juntas, de forma que sus segmentos compartan las pasadas del embedder, la búsqueda en el
+    índice y el sintetizador en lugar de ejecutarse uno detrás de otro.
+
+    La primera petición de un modelo abre una ventana de `window_ms` milisegundos; las que
+    llegan durante la ventana se añaden al mismo lote, que se ejecuta al cerrarse la ventana
+    o en cuanto reúne `max_batch` peticiones.
+
+    Args:
+        run: Corrutina que recibe la lista de argumentos de un lote y devuelve la lista de resultados, en el mismo orden.
+        window_ms (float, optional): Espera máxima de una petición para formar lote. 0 desactiva el agrupamiento.
+        max_batch (int, optional): Peticiones máximas por lote. 1 desactiva el agrupamiento.
+    """
+
+    def __init__(self, run, window_ms=0, max_batch=8):
+        self.run = run
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        # batch key -> (requests and their futures, handle of the window timer)
+        self.open_batches = {}
+        self.tasks = set()
+        self.batches = 0
+        self.requests = 0
+        self.largest = 0
+
+    @property
+    def enabled(self):
+        return self.window > 0 and self.max_batch > 1
+
+    async def submit(self, key, kwargs):
+        """
+        Añade una petición al lote abierto de `key` y espera su resultado.
+
+        Args:
+            key: Identifica las peticiones que se pueden ejecutar juntas (modelo, índice, backend...).
+            kwargs (dict): Argumentos de la petición.
+        """
+        if not self.enabled:
+            self._count(1)
+            return (await self.run([kwargs]))[0]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.open_batches.get(key)
+        if batch is None:
+            batch = ([], loop.call_later(self.window, self._flush, key))
+            self.open_batches[key] = batch
+        batch[0].append((kwargs, future))
+        if len(batch[0]) >= self.max_batch:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        batch = self.open_batches.pop(key, None)
+        if batch is None:
+            return
+        requests, handle = batch
+        handle.cancel()
+        task = asyncio.create_task(self._run(requests))
+        # Keep a reference until the batch finishes, the event loop only holds weak ones
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, requests):
+        self._count(len(requests))
+        try:
+            results = await self.run([kwargs for kwargs, _ in requests])
+        except Exception as error:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(requests, results):
+            # The request may have been cancelled (client disconnected) while waiting
+            if not future.done():
+                future.set_result(result)
+
+    def _count(self, size):
+        self.batches += 1
+        self.requests += size
+        self.largest = max(self.largest, size)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch": self.requests / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest,
+            "open": len(self.open_batches)
+        }
@@ -0,0 +1,137 @@
+import os
+import time
+
+class Janitor:
+    """
+    Borra periódicamente los audios de `audio_dir` que ya no se usan y los archivos de
+    `upload_dir` que no pertenecen a ningún modelo.
+
+    En `audio_dir` se borran los audios sin acceder desde hace más de `ttl` segundos y,
+    mientras los restantes ocupen más de `max_bytes`, los accedidos hace más tiempo. Cada
+    acceso actualiza la fecha de modificación del archivo (ver `touch`), porque la fecha de
+    acceso no es fiable en sistemas montados con noatime.
+
+    En `upload_dir` se borran los archivos que nadie referencia: restos de una subida o de
+    una actualización de modelo interrumpidas.
+
+    Nunca se borran los archivos devueltos por `referenced`, los que empiezan por alguno de
+    los prefijos de `exclude` (los gestiona otra caché) ni los escritos hace menos de `GRACE`
+    segundos, que pueden pertenecer a una petición en curso.
+
+    Args:
+        audio_dir (Path): Carpeta de los audios generados.
+        upload_dir (Path): Carpeta de los archivos de los modelos.
+        referenced: Función sin argumentos que devuelve las rutas que siguen en uso (modelos, trabajos...).
+        max_bytes (int, optional): Presupuesto en disco de `audio_dir`. 0 = sin límite.
+        ttl (float, optional): Segundos sin acceder tras los que se borra un audio. 0 = sin caducidad.
+        exclude (tuple, optional): Prefijos de los archivos de `audio_dir` que no se tocan.
+    """
+
+    GRACE = 300
+
+    def __init__(self, audio_dir, upload_dir, referenced, max_bytes=0, ttl=0, exclude=()):
+        self.audio_dir = audio_dir
+        self.upload_dir = upload_dir
+        self.referenced = referenced
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.exclude = tuple(exclude)
+        self.runs = 0
+        self.files = 0
+        self.bytes = 0
+        self.expired = 0
+        self.evicted = 0
+        self.orphans = 0
+        self.freed = 0
+
+    @staticmethod
+    def touch(path):
+        """
+        Marca un audio como usado ahora.
+        """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def run(self):
+        """
+        Hace una pasada de limpieza. Bloquea, se ejecuta en un hilo.
+        """
+        now = time.time()
+        referenced = {os.path.abspath(path) for path in self.referenced()}
+        self._collect_outputs(now, referenced)
+        self._collect_uploads(now, referenced)
+        self.runs += 1
+
+    def _collect_outputs(self, now, referenced):
+        entries = []
+        for entry in os.scandir(self.audio_dir):
+            if entry.name.startswith(self.exclude) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, os.path.abspath(entry.path)))
+        # Least recently used first
+        entries.sort()
+        files = len(entries)
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            expired = self.ttl > 0 and now - mtime > self.ttl
+            over_budget = self.max_bytes > 0 and total > self.max_bytes
+            if not expired and not over_budget:
+                break
+            if path in referenced or now - mtime < self.GRACE:
+                continue
+            if not self._remove(path):
+                continue
+            files -= 1
+            total -= size
+            self.freed += size
+            if expired:
+                self.expired += 1
+            else:
+                self.evicted += 1
+        self.files = files
+        self.bytes = total
+
+    def _collect_uploads(self, now, referenced):
+        for entry in os.scandir(self.upload_dir):
+            if not entry.is_file():
+                continue
+            path = os.path.abspath(entry.path)
+            if path in referenced:
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime < self.GRACE:
+                continue
+            if self._remove(path):
+                print(f"Removed orphaned upload {entry.name}")
+                self.orphans += 1
+                self.freed += stat.st_size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "files": self.files,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "orphaned_uploads": self.orphans,
+            "freed_bytes": self.freed
+        }
@@ -0,0 +1,133 @@
+import json
+import time
+import asyncio
+import traceback
+from datetime import datetime
+from simple_app.database import SessionLocal
+from simple_app import models
+
+class JobRunner:
+    """
+    Ejecuta en segundo plano los trabajos de conversión guardados en la tabla `jobs`.
+
+    Los trabajos se atienden por orden de llegada con `concurrency` tareas a la vez. El
+    estado y el progreso se guardan en la base de datos, así que al arrancar se vuelven a
+    encolar los trabajos pendientes y los que quedaron a medias por un reinicio de la API.
+
+    Args:
+        execute: Corrutina `execute(job, progress)` que realiza el trabajo y devuelve un dict con
+            los campos a guardar del resultado; `progress(done, total)` actualiza el progreso.
+        concurrency (int, optional): Trabajos ejecutados a la vez.
+    """
+
+    # Seconds between two writes of the progress of a job
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, execute, concurrency=1):
+        self.execute = execute
+        self.concurrency = max(concurrency, 1)
+        self.queue = None
+        self.tasks = []
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        with SessionLocal() as db:
+            interrupted = db.query(models.Job).filter(models.Job.status == "running").all()
+            for job in interrupted:
+                job.status = "queued"
+                job.started_at = None
+                job.progress_done = 0
+                job.progress_total = 0
+            db.commit()
+            queued = (
+                db.query(models.Job)
+                .filter(models.Job.status == "queued")
+                .order_by(models.Job.created_at)
+                .all()
+            )
+            for job in queued:
+                self.queue.put_nowait(job.id)
+        if queued:
+            print(f"Resuming {len(queued)} conversion jobs ({len(interrupted)} interrupted)")
+        self.tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, job_id):
+        """
+        Encola un trabajo ya guardado en la base de datos con estado "queued".
+        """
+        self.queue.put_nowait(job_id)
+
+    def pending(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def _consume(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id):
+        with SessionLocal() as db:
+            job = db.get(models.Job, job_id)
+            if job is None or job.status != "queued":
+                return
+            job.status = "running"
+            job.started_at = datetime.now()
+            db.commit()
+
+            last_write = 0.0
+            writing = None
+
+            def progress(done, total):
+                # Called on the event loop: the database is written from a thread, at most
+                # once per PROGRESS_INTERVAL, and the final values with the result
+                nonlocal last_write, writing
+                job.progress_done = done
+                job.progress_total = total
+                now = time.monotonic()
+                if now - last_write < self.PROGRESS_INTERVAL or (writing is not None and not writing.done()):
+                    return
+                last_write = now
+                writing = asyncio.ensure_future(asyncio.to_thread(self._save_progress, job_id, done, total))
+
+            try:
+                try:
+                    result = await self.execute(job, progress)
+                finally:
+                    # An older progress must not land after the final state
+                    if writing is not None:
+                        await asyncio.shield(writing)
+            except asyncio.CancelledError:
+                # The API is shutting down, the job is requeued on the next start
+                raise
+            except Exception as error:
+                print(f"Conversion job {job_id} failed: {error}")
+                traceback.print_exc()
+                job.status = "failed"
+                job.error = str(error)
+            else:
+                job.status = "done"
+                job.output_file = result.get("output_file")
+                job.timings = json.dumps(result.get("timings"))
+                job.progress_done = max(job.progress_done, job.progress_total)
+            job.finished_at = datetime.now()
+            db.commit()
+
+    @staticmethod
+    def _save_progress(job_id, done, total):
+        try:
+            with SessionLocal() as db:
+                db.query(models.Job).filter(models.Job.id == job_id).update(
+                    {"progress_done": done, "progress_total": total}
+                )
+                db.commit()
+        except Exception as error:
+            print(f"Could not save the progress of job {job_id}: {error}")
@@ -1,15 +1,27 @@
-from fastapi import FastAPI, Request, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, Depends, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import json
+import math
+import time
+import uuid
 import shutil
+import hashlib
+import numpy as np
 
-from simple_app.database import engine, Base, get_db
+from simple_app.database import engine, Base, get_db, add_missing_columns, SessionLocal
 from simple_app import models, schemas
+from simple_app.workers import WorkerPool
+from simple_app.batching import BatchScheduler
+from simple_app.jobs import JobRunner
+from simple_app.results import ResultCache
+from simple_app.janitor import Janitor
 import edge_tts
 import asyncio
 import sys
@@ -17,13 +29,28 @@ import sys
 # Ensure the root directory is in sys.path to import rvc
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from rvc.infer.infer import VoiceConverter
+# Only torch-free modules here, torch and faiss are loaded by the inference workers
+from rvc.infer.artifacts import BACKENDS, onnx_available, onnx_path, vectors_path
+from simple_app.settings import settings
 
-# Initialize VoiceConverter
-infer_pipeline = VoiceConverter()
+# Inference runs in worker processes (or in a thread of this process with RVC_WORKERS=0),
+# each with its own VoiceConverter, re-render sessions and live streams
+inference = WorkerPool(
+    workers=settings.workers,
+    threads=settings.worker_threads,
+    affinity=settings.worker_affinity
+)
+
+# Test conversions of the same model that arrive within RVC_BATCH_WINDOW_MS run as one batch
+scheduler = BatchScheduler(
+    lambda requests: inference.call("convert_audio_many", requests),
+    window_ms=settings.batch_window_ms,
+    max_batch=settings.batch_max
+)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns()
 
 # Create uploads directory
 UPLOAD_DIR = Path("uploads")
@@ -33,18 +60,129 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 AUDIO_DIR = Path("audio_outputs")
 AUDIO_DIR.mkdir(exist_ok=True)
 
+# Converted test results by content, shared by identical requests
+results = ResultCache(AUDIO_DIR, max_bytes=settings.result_cache_bytes)
+
+# Seed of the synthesizer noise, so a cached result is what a new conversion would give
+SEED = settings.seed if settings.seed >= 0 else None
+
+# Input audio of each open re-render session, by session id
+session_inputs = {}
+
+def forget_session(session_id):
+    """
+    Olvida una sesión cerrada o caducada: su worker y su audio de entrada.
+    """
+    inference.release(f"session:{session_id}")
+    session_inputs.pop(session_id, None)
+
+def referenced_files():
+    """
+    Archivos que el janitor no puede borrar: los de los modelos (con su exportación ONNX y
+    los vectores del índice), los de los trabajos sin terminar o terminados hace menos de
+    RVC_OUTPUTS_TTL segundos y los de las sesiones de re-renderizado abiertas (su entrada y
+    los audios renderizados).
+    """
+    paths = set()
+    open_sessions = dict(session_inputs)
+    paths.update(AUDIO_DIR / name for name in open_sessions.values())
+    if open_sessions:
+        for entry in os.scandir(AUDIO_DIR):
+            # rvc_session_<session id>_<timestamp>.wav
+            if entry.name.startswith("rvc_session_") and entry.name[len("rvc_session_"):].split("_")[0] in open_sessions:
+                paths.add(AUDIO_DIR / entry.name)
+    with SessionLocal() as db:
+        for pth_file, index_file in db.query(models.Model.pth_file, models.Model.index_file):
+            paths.update((pth_file, onnx_path(pth_file), index_file, vectors_path(index_file)))
+        finished_since = datetime.now() - timedelta(seconds=settings.outputs_ttl)
+        recent_jobs = db.query(models.Job.input_file, models.Job.output_file).filter(
+            models.Job.finished_at.is_(None) | (models.Job.finished_at > finished_since)
+        )
+        for input_file, output_file in recent_jobs:
+            paths.update(AUDIO_DIR / name for name in (input_file, output_file) if name)
+    return paths
+
+# Expired or least recently used audios and orphaned uploads are removed in the background
+janitor = Janitor(
+    AUDIO_DIR,
+    UPLOAD_DIR,
+    referenced_files,
+    max_bytes=settings.outputs_bytes,
+    ttl=settings.outputs_ttl,
+    exclude=(ResultCache.PREFIX,)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the inference workers, they load the configured F0 predictors before serving
+    await inference.start()
+    # Cached results are only reused under the same inference settings
+    results.fingerprint = await inference.call("config_fingerprint")
+
+    # Close the re-render sessions that were not used within their TTL
+    async def expire_sessions():
+        while True:
+            await asyncio.sleep(60)
+            # Only sessions created before the broadcast can be missing from its answer
+            known = set(session_inputs)
+            open_sessions = await inference.broadcast("expire_sessions")
+            open_ids = {session_id for ids in open_sessions for session_id in ids}
+            inference.retain("session:", open_ids)
+            for session_id in known - open_ids:
+                session_inputs.pop(session_id, None)
+
+    expire_task = asyncio.create_task(expire_sessions())
+    # Resume the conversion jobs left queued or interrupted by the last shutdown
+    await jobs.start()
+
+    # Clean up audio_outputs and uploads, starting with what the last run left behind
+    async def collect_garbage():
+        while True:
+            try:
+                await asyncio.to_thread(janitor.run)
+            except Exception as e:
+                print(f"Error limpiando archivos: {str(e)}")
+            await asyncio.sleep(settings.janitor_interval)
+
+    janitor_task = asyncio.create_task(collect_garbage()) if settings.janitor_interval > 0 else None
+    yield
+    if janitor_task is not None:
+        janitor_task.cancel()
+    await jobs.stop()
+    expire_task.cancel()
+    await inference.stop()
+
 app = FastAPI(
     title="Voice Models API",
     description="API para gestionar modelos de voz RVC",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Mount static files for audio
 app.mount("/audio", StaticFiles(directory=str(AUDIO_DIR)), name="audio")
 
+@app.middleware("http")
+async def touch_served_audio(request: Request, call_next):
+    response = await call_next(request)
+    # Serving an audio counts as a use, the janitor removes the least recently used first
+    if request.url.path.startswith("/audio/") and response.status_code in (200, 206):
+        janitor.touch(AUDIO_DIR / request.url.path[len("/audio/"):])
+    return response
+
 # Templates
 templates = Jinja2Templates(directory="simple_app/templates")
 
+def check_backend(backend):
+    """
+    Rechaza los backends desconocidos y `onnx` si onnxruntime no está instalado, para que
+    el error llegue al crear el modelo y no en la primera conversión.
+    """
+    if backend not in BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Backend inválido. Use uno de: {', '.join(BACKENDS)}")
+    if backend == "onnx" and not onnx_available():
+        raise HTTPException(status_code=400, detail="El backend onnx requiere onnxruntime, que no está instalado en el servidor")
+
 # API Endpoints
 @app.get("/api/model", response_model=schemas.PaginatedModels)
 def list_models(
@@ -81,6 +219,8 @@ async def create_model(
     technology: str = Form("RVMPE"),
     epochs: int = Form(...),
     language: str = Form(...),
+    backend: str = Form("torch"),
+    quantize: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     # Validate file extensions
@@ -88,6 +228,7 @@ async def create_model(
         raise HTTPException(status_code=400, detail="El archivo PTH debe tener extensión .pth")
     if not index_file.filename.endswith('.index'):
         raise HTTPException(status_code=400, detail="El archivo INDEX debe tener extensión .index")
+    check_backend(backend)
     
     # Parse datetime
     try:
@@ -114,7 +255,9 @@ async def create_model(
         index_file=str(index_path),
         technology=technology,
         epochs=epochs,
-        language=language
+        language=language,
+        backend=backend,
+        quantize=quantize
     )
     
     db.add(db_model)
@@ -141,11 +284,15 @@ async def update_model(
     technology: str = Form(None),
     epochs: int = Form(None),
     language: str = Form(None),
+    backend: str = Form(None),
+    quantize: bool = Form(None),
     db: Session = Depends(get_db)
 ):
     model = db.query(models.Model).filter(models.Model.id == model_id).first()
     if not model:
         raise HTTPException(status_code=404, detail="Modelo no encontrado")
+    if backend:
+        check_backend(backend)
     
     if created_at:
         try:
@@ -163,51 +310,62 @@ async def update_model(
         model.epochs = epochs
     if language:
         model.language = language
+    if backend:
+        model.backend = backend
+    if quantize is not None:
+        model.quantize = quantize
+    
+    if pth_file and not pth_file.filename.endswith('.pth'):
+        raise HTTPException(status_code=400, detail="El archivo PTH debe tener extensión .pth")
+    if index_file and not index_file.filename.endswith('.index'):
+        raise HTTPException(status_code=400, detail="El archivo INDEX debe tener extensión .index")
     
+    # The new files are saved and the model points to them before the old ones are removed,
+    # so a crash in between leaves unreferenced uploads for the janitor, never a broken model
+    old_pth_file = old_index_file = None
     if pth_file:
-        if not pth_file.filename.endswith('.pth'):
-            raise HTTPException(status_code=400, detail="El archivo PTH debe tener extensión .pth")
-        
-        # Delete old file
-        if os.path.exists(model.pth_file):
-            os.remove(model.pth_file)
-        
-        # Save new file
         pth_path = UPLOAD_DIR / f"{datetime.now().timestamp()}_{pth_file.filename}"
         with open(pth_path, "wb") as buffer:
             shutil.copyfileobj(pth_file.file, buffer)
+        old_pth_file = model.pth_file
         model.pth_file = str(pth_path)
     
     if index_file:
-        if not index_file.filename.endswith('.index'):
-            raise HTTPException(status_code=400, detail="El archivo INDEX debe tener extensión .index")
-        
-        # Delete old file
-        if os.path.exists(model.index_file):
-            os.remove(model.index_file)
-        
-        # Save new file
         index_path = UPLOAD_DIR / f"{datetime.now().timestamp()}_{index_file.filename}"
         with open(index_path, "wb") as buffer:
             shutil.copyfileobj(index_file.file, buffer)
+        old_index_file = model.index_file
         model.index_file = str(index_path)
     
     db.commit()
     db.refresh(model)
     
+    # Delete the replaced files, with the ONNX export and the vectors sidecar
+    if old_pth_file:
+        await inference.broadcast("invalidate_model", old_pth_file)
+        for path in (old_pth_file, onnx_path(old_pth_file)):
+            if os.path.exists(path):
+                os.remove(path)
+    if old_index_file:
+        await inference.broadcast("invalidate_index", old_index_file)
+        for path in (old_index_file, vectors_path(old_index_file)):
+            if os.path.exists(path):
+                os.remove(path)
+    
     return schemas.Model.model_validate(model)
 
 @app.delete("/api/model/{model_id}", status_code=204)
-def delete_model(model_id: int, db: Session = Depends(get_db)):
+async def delete_model(model_id: int, db: Session = Depends(get_db)):
     model = db.query(models.Model).filter(models.Model.id == model_id).first()
     if not model:
         raise HTTPException(status_code=404, detail="Modelo no encontrado")
     
     # Delete files
-    if os.path.exists(model.pth_file):
-        os.remove(model.pth_file)
-    if os.path.exists(model.index_file):
-        os.remove(model.index_file)
+    await inference.broadcast("invalidate_model", model.pth_file)
+    await inference.broadcast("invalidate_index", model.index_file)
+    for path in (model.pth_file, onnx_path(model.pth_file), model.index_file, vectors_path(model.index_file)):
+        if os.path.exists(path):
+            os.remove(path)
     
     db.delete(model)
     db.commit()
@@ -238,6 +396,23 @@ def download_file(model_id: int, file_type: str, db: Session = Depends(get_db)):
         media_type="application/octet-stream"
     )
 
+@app.get("/api/cache")
+async def get_cache_stats():
+    """
+    Estadísticas de las cachés de inferencia (aciertos, fallos y ocupación).
+    Con procesos worker se devuelven las de cada worker.
+    """
+    stats = await inference.broadcast("cache_stats")
+    if inference.workers == 0:
+        return {**stats[0], "batching": scheduler.stats(), "results": results.stats(), "janitor": janitor.stats()}
+    return {
+        "pool": inference.stats(),
+        "batching": scheduler.stats(),
+        "results": results.stats(),
+        "janitor": janitor.stats(),
+        "workers": stats
+    }
+
 @app.get("/api/tts-voices")
 async def get_tts_voices():
     """
@@ -255,6 +430,52 @@ async def get_tts_voices():
     
     return sorted(filtered_voices, key=lambda x: x['ShortName'])
 
+async def synthesize_tts(text, tts_voice):
+    """
+    Genera el audio TTS con Edge-TTS y devuelve sus bytes (MP3) sin escribirlo en disco.
+    """
+    communicate = edge_tts.Communicate(text, tts_voice)
+    chunks = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            chunks.append(chunk["data"])
+    return b"".join(chunks)
+
+def deterministic(backend):
+    """
+    Si una conversión de prueba da siempre el mismo audio: con semilla y con el backend
+    torch, porque el ruido del grafo ONNX no se puede fijar. Solo entonces se guarda en la
+    caché de resultados.
+    """
+    return SEED is not None and backend != "onnx"
+
+async def convert_test(group, request):
+    """
+    Convierte una petición de prueba, agrupada con las del mismo modelo que lleguen a la
+    vez. Con semilla, el ruido de cada petición del lote sale solo de ella y el resultado
+    es el mismo que si se hubiera convertido sola.
+    """
+    return await scheduler.submit(group, request)
+
+async def cached_audio_response(key, convert):
+    """
+    Devuelve el audio convertido en el cuerpo de la respuesta, desde la caché de resultados
+    o calculándolo con `convert` (una sola vez para peticiones idénticas simultáneas). Sin
+    clave (conversión no determinista) siempre se calcula.
+    La cabecera Server-Timing indica cómo se obtuvo y los tiempos por etapa del cálculo.
+    """
+    async def compute():
+        result, server_timing = await convert()
+        return result.data, server_timing
+
+    if key is None:
+        data, server_timing = await compute()
+        status = "bypass"
+    else:
+        data, server_timing, status = await results.get_or_compute(key, compute)
+    timing = f'cache;desc="{status}"' + (f", {server_timing}" if server_timing else "")
+    return Response(content=data, media_type="audio/wav", headers={"Server-Timing": timing})
+
 # TTS Testing Endpoint
 @app.post("/api/model/{model_id}/test-tts")
 async def test_tts(
@@ -262,10 +483,13 @@ async def test_tts(
     text: str = Form(...),
     tts_voice: str = Form("en-US-AriaNeural"),
     pitch: int = Form(0),
+    persist: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     """
     Genera audio TTS y luego aplica RVC.
+    Devuelve el audio WAV convertido, desde la caché si la misma petición ya se hizo; con
+    `persist` los audios se guardan en disco y se devuelven sus URLs en un JSON.
     """
     print(f"DEBUG: test_tts called with text='{text}', tts_voice='{tts_voice}', pitch={pitch}")
     
@@ -273,54 +497,79 @@ async def test_tts(
     if not model:
         raise HTTPException(status_code=404, detail="Modelo no encontrado")
     
-    # 1. Generate TTS
     timestamp = datetime.now().timestamp()
     tts_filename = f"tts_raw_{model_id}_{timestamp}.wav"
     tts_path = AUDIO_DIR / tts_filename
-    
-    communicate = edge_tts.Communicate(text, tts_voice)
-    try:
-        await communicate.save(str(tts_path))
-    except Exception as e:
-        print(f"ERROR in edge_tts: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"Error generando TTS con voz '{tts_voice}': {str(e)}")
-    
-    # 2. Apply RVC
     output_filename = f"rvc_out_{model_id}_{timestamp}.wav"
     output_path = AUDIO_DIR / output_filename
     
     # Ensure paths are absolute strings for RVC
     pth_path = str(Path(model.pth_file).absolute())
     index_path = str(Path(model.index_file).absolute())
-    input_path_str = str(tts_path.absolute())
-    output_path_str = str(output_path.absolute())
+    backend, quantize = model.backend, model.quantize
     
-    try:
-        # Run inference in a separate thread to not block the event loop
-        # Since convert_audio is synchronous and might be heavy
-        await asyncio.to_thread(
-            infer_pipeline.convert_audio,
-            audio_input_path=input_path_str,
-            audio_output_path=output_path_str,
-            model_path=pth_path,
-            index_path=index_path,
-            sid=0,
-            pitch=pitch
-        )
-    except Exception as e:
-        # Cleanup on error
-        if tts_path.exists():
-            os.remove(tts_path)
-        raise HTTPException(status_code=500, detail=f"Error en inferencia RVC: {str(e)}")
+    async def convert():
+        # 1. Generate TTS in memory
+        tts_start = time.perf_counter()
+        try:
+            tts_audio = await synthesize_tts(text, tts_voice)
+        except Exception as e:
+            print(f"ERROR in edge_tts: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Error generando TTS con voz '{tts_voice}': {str(e)}")
+        tts_time = time.perf_counter() - tts_start
+        
+        # 2. Apply RVC, reading and writing files only when asked to keep them
+        if persist:
+            tts_path.write_bytes(tts_audio)
+        try:
+            # Run inference in a worker to not block the event loop
+            result = await convert_test(
+                (pth_path, index_path, backend, quantize),
+                dict(
+                    audio_input_path=str(tts_path.absolute()) if persist else tts_audio,
+                    audio_output_path=str(output_path.absolute()) if persist else None,
+                    model_path=pth_path,
+                    index_path=index_path,
+                    sid=0,
+                    pitch=pitch,
+                    backend=backend,
+                    quantize=quantize,
+                    seed=SEED
+                )
+            )
+        except Exception as e:
+            # Cleanup on error
+            if tts_path.exists():
+                os.remove(tts_path)
+            raise HTTPException(status_code=500, detail=f"Error en inferencia RVC: {str(e)}")
+        if result is None:
+            raise HTTPException(status_code=500, detail="Error en inferencia RVC")
+        # The TTS is reported as the first stage of the conversion
+        result.timings.add("tts", tts_time)
+        result.timings.stages.move_to_end("tts", last=False)
+        result.elapsed += tts_time
+        return result, result.timings.server_timing(result.elapsed)
 
-    return {
-        "message": "Audio generado exitosamente",
-        "model_name": model.name,
-        "text": text,
-        "tts_voice": tts_voice,
-        "info_file": f"/audio/{output_filename}",
-        "raw_tts_file": f"/audio/{tts_filename}"
-    }
+    if not persist:
+        key = results.key(
+            "tts", await results.file_hash(pth_path), await results.file_hash(index_path),
+            text, tts_voice, pitch, backend, quantize, SEED
+        ) if deterministic(backend) else None
+        return await cached_audio_response(key, convert)
+
+    result, server_timing = await convert()
+    return JSONResponse(
+        {
+            "message": "Audio generado exitosamente",
+            "model_name": model.name,
+            "text": text,
+            "tts_voice": tts_voice,
+            "info_file": f"/audio/{output_filename}",
+            "raw_tts_file": f"/audio/{tts_filename}",
+            "timings": result.timings.as_dict()
+        },
+        headers={"Server-Timing": server_timing}
+    )
 
 # Audio Testing Endpoint (Microphone)
 @app.post("/api/model/{model_id}/test-audio")
@@ -328,23 +577,28 @@ async def test_audio(
     model_id: int,
     audio_file: UploadFile = File(...),
     pitch: int = Form(0),
+    persist: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     """
     Recibe audio grabado y aplica RVC.
+    Devuelve el audio WAV convertido, desde la caché si el mismo audio ya se convirtió con
+    los mismos ajustes; con `persist` los audios se guardan en disco y se devuelven sus URLs
+    en un JSON.
     """
     model = db.query(models.Model).filter(models.Model.id == model_id).first()
     if not model:
         raise HTTPException(status_code=404, detail="Modelo no encontrado")
     
-    # 1. Save uploaded audio
+    # 1. Read uploaded audio, it is decoded from memory unless it has to be kept
     timestamp = datetime.now().timestamp()
     input_filename = f"mic_input_{model_id}_{timestamp}.wav"
     input_path = AUDIO_DIR / input_filename
     
     try:
-        with open(input_path, "wb") as buffer:
-            shutil.copyfileobj(audio_file.file, buffer)
+        input_audio = await audio_file.read()
+        if persist:
+            input_path.write_bytes(input_audio)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error guardando audio: {str(e)}")
     
@@ -355,34 +609,449 @@ async def test_audio(
     # Ensure paths are absolute strings for RVC
     pth_path = str(Path(model.pth_file).absolute())
     index_path = str(Path(model.index_file).absolute())
-    input_path_str = str(input_path.absolute())
-    output_path_str = str(output_path.absolute())
+    backend, quantize = model.backend, model.quantize
+    
+    async def convert():
+        try:
+            # Run inference in a worker
+            result = await convert_test(
+                (pth_path, index_path, backend, quantize),
+                dict(
+                    audio_input_path=str(input_path.absolute()) if persist else input_audio,
+                    audio_output_path=str(output_path.absolute()) if persist else None,
+                    model_path=pth_path,
+                    index_path=index_path,
+                    sid=0,
+                    pitch=pitch,
+                    backend=backend,
+                    quantize=quantize,
+                    seed=SEED
+                )
+            )
+        except Exception as e:
+            # Cleanup on error
+            if input_path.exists():
+                os.remove(input_path)
+            raise HTTPException(status_code=500, detail=f"Error en inferencia RVC: {str(e)}")
+        if result is None:
+            raise HTTPException(status_code=500, detail="Error en inferencia RVC")
+        return result, result.timings.server_timing(result.elapsed)
+
+    if not persist:
+        key = results.key(
+            "audio", hashlib.sha256(input_audio).hexdigest(),
+            await results.file_hash(pth_path), await results.file_hash(index_path),
+            pitch, backend, quantize, SEED
+        ) if deterministic(backend) else None
+        return await cached_audio_response(key, convert)
+
+    result, server_timing = await convert()
+    return JSONResponse(
+        {
+            "message": "Audio procesado exitosamente",
+            "model_name": model.name,
+            "type": "microphone",
+            "info_file": f"/audio/{output_filename}",
+            "raw_input_file": f"/audio/{input_filename}",
+            "timings": result.timings.as_dict()
+        },
+        headers={"Server-Timing": server_timing}
+    )
+
+# Conversion Jobs
+async def run_job(job, progress):
+    """
+    Ejecuta un trabajo de conversión: genera el audio TTS si hace falta y aplica RVC.
+    """
+    params = json.loads(job.params)
+    with SessionLocal() as db:
+        model = db.query(models.Model).filter(models.Model.id == job.model_id).first()
+        if not model:
+            raise ValueError("Modelo no encontrado")
+        pth_path = str(Path(model.pth_file).absolute())
+        index_path = str(Path(model.index_file).absolute())
+        backend, quantize = model.backend, model.quantize
+
+    tts_time = None
+    if job.kind == "tts":
+        tts_filename = f"tts_raw_{job.model_id}_{job.id}.wav"
+        tts_start = time.perf_counter()
+        tts_audio = await synthesize_tts(params["text"], params["tts_voice"])
+        (AUDIO_DIR / tts_filename).write_bytes(tts_audio)
+        tts_time = time.perf_counter() - tts_start
+        job.input_file = tts_filename
+
+    output_filename = f"rvc_job_out_{job.model_id}_{job.id}.wav"
+    result = await inference.call(
+        "convert_audio",
+        progress=progress,
+        audio_input_path=str((AUDIO_DIR / job.input_file).absolute()),
+        audio_output_path=str((AUDIO_DIR / output_filename).absolute()),
+        model_path=pth_path,
+        index_path=index_path,
+        sid=0,
+        pitch=params["pitch"],
+        backend=backend,
+        quantize=quantize,
+        seed=SEED
+    )
+    if result is None:
+        raise RuntimeError("Error en inferencia RVC")
+
+    timings = result.timings.as_dict()
+    if tts_time is not None:
+        timings["stages"] = {"tts": tts_time, **timings["stages"]}
+    return {"output_file": output_filename, "timings": timings}
+
+jobs = JobRunner(run_job, concurrency=settings.job_concurrency or max(settings.workers, 1))
+
+def job_response(job):
+    return schemas.Job(
+        id=job.id,
+        model_id=job.model_id,
+        kind=job.kind,
+        status=job.status,
+        progress=schemas.JobProgress(done=job.progress_done, total=job.progress_total),
+        # The audios of old finished jobs may have been removed by the janitor
+        info_file=f"/audio/{job.output_file}" if job.output_file and (AUDIO_DIR / job.output_file).exists() else None,
+        raw_file=f"/audio/{job.input_file}" if job.input_file and (AUDIO_DIR / job.input_file).exists() else None,
+        error=job.error,
+        timings=json.loads(job.timings) if job.timings else None,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+@app.post("/api/model/{model_id}/jobs", response_model=schemas.Job, status_code=202)
+async def create_job(
+    model_id: int,
+    text: str = Form(None),
+    tts_voice: str = Form("en-US-AriaNeural"),
+    audio_file: UploadFile = File(None),
+    pitch: int = Form(0),
+    db: Session = Depends(get_db)
+):
+    """
+    Encola una conversión y responde en cuanto queda guardada, sin esperar a la inferencia.
+    Con `text` se genera primero el audio TTS; con `audio_file` se convierte el audio subido.
+    El estado se consulta en `GET /api/jobs/{job_id}`.
+    """
+    model = db.query(models.Model).filter(models.Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Modelo no encontrado")
+    if (text is None) == (audio_file is None):
+        raise HTTPException(status_code=400, detail="Indica un texto o un archivo de audio")
+
+    job = models.Job(
+        id=uuid.uuid4().hex,
+        model_id=model_id,
+        kind="tts" if text is not None else "audio",
+        status="queued",
+        params=json.dumps({"text": text, "tts_voice": tts_voice, "pitch": pitch}),
+        created_at=datetime.now()
+    )
+    if audio_file is not None:
+        input_filename = f"job_input_{model_id}_{job.id}.wav"
+        try:
+            with open(AUDIO_DIR / input_filename, "wb") as buffer:
+                shutil.copyfileobj(audio_file.file, buffer)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error guardando audio: {str(e)}")
+        job.input_file = input_filename
+
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    jobs.submit(job.id)
+    return JSONResponse(
+        job_response(job).model_dump(mode="json"),
+        status_code=202,
+        headers={"Location": f"/api/jobs/{job.id}"}
+    )
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.Job)
+async def get_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Estado de un trabajo de conversión: queued, running, done o failed, el progreso en
+    segmentos convertidos y, al terminar, el audio generado y los tiempos por etapa.
+    """
+    job = db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job_response(job)
+
+# Re-render Sessions
+@app.post("/api/model/{model_id}/session", status_code=201)
+async def create_session(
+    model_id: int,
+    audio_file: UploadFile = File(...),
+    f0_method: str = Form("rmvpe"),
+    db: Session = Depends(get_db)
+):
+    """
+    Analiza un audio con el modelo (F0, características del embedder y vecinos del índice)
+    y abre una sesión para volver a convertirlo con otros ajustes sin repetir el análisis.
+    """
+    model = db.query(models.Model).filter(models.Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Modelo no encontrado")
+    
+    # 1. Save uploaded audio
+    timestamp = datetime.now().timestamp()
+    input_filename = f"session_input_{model_id}_{timestamp}.wav"
+    input_path = AUDIO_DIR / input_filename
     
     try:
-        # Run inference in a separate thread
-        await asyncio.to_thread(
-            infer_pipeline.convert_audio,
-            audio_input_path=input_path_str,
-            audio_output_path=output_path_str,
-            model_path=pth_path,
-            index_path=index_path,
+        with open(input_path, "wb") as buffer:
+            shutil.copyfileobj(audio_file.file, buffer)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error guardando audio: {str(e)}")
+    
+    # 2. Analyse it in a worker, which keeps the session
+    session_id = uuid.uuid4().hex
+    try:
+        session = await inference.call(
+            "create_session",
+            session_id,
+            route=f"session:{session_id}",
+            model_path=str(Path(model.pth_file).absolute()),
+            audio_input_path=str(input_path.absolute()),
+            index_path=str(Path(model.index_file).absolute()),
             sid=0,
-            pitch=pitch
+            f0_method=f0_method,
+            backend=model.backend,
+            quantize=model.quantize
         )
     except Exception as e:
-        # Cleanup on error
+        inference.release(f"session:{session_id}")
         if input_path.exists():
             os.remove(input_path)
-        raise HTTPException(status_code=500, detail=f"Error en inferencia RVC: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error analizando el audio: {str(e)}")
+    session_inputs[session_id] = input_filename
 
     return {
-        "message": "Audio procesado exitosamente",
+        "session_id": session_id,
         "model_name": model.name,
-        "type": "microphone",
-        "info_file": f"/audio/{output_filename}",
+        "duration": session["duration"],
+        "expires_in": session["expires_in"],
         "raw_input_file": f"/audio/{input_filename}"
     }
 
+@app.post("/api/session/{session_id}/render")
+async def render_session(
+    session_id: str,
+    pitch: int = Form(0),
+    index_rate: float = Form(0.75),
+    protect: float = Form(0.5),
+    volume_envelope: float = Form(1.0)
+):
+    """
+    Convierte el audio de una sesión con los ajustes indicados. Solo se repiten el ajuste
+    de tono, la mezcla con el índice y la síntesis.
+    """
+    output_filename = f"rvc_session_{session_id}_{datetime.now().timestamp()}.wav"
+    output_path = AUDIO_DIR / output_filename
+    
+    try:
+        rendered = await inference.call(
+            "render_session",
+            session_id,
+            str(output_path.absolute()),
+            route=f"session:{session_id}",
+            pitch=pitch,
+            index_rate=index_rate,
+            protect=protect,
+            volume_envelope=volume_envelope
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en inferencia RVC: {str(e)}")
+    if rendered is None:
+        forget_session(session_id)
+        raise HTTPException(status_code=404, detail="Sesión no encontrada o caducada")
+
+    timer = rendered["timings"]
+    return JSONResponse(
+        {
+            "message": "Audio generado exitosamente",
+            "session_id": session_id,
+            "renders": rendered["renders"],
+            "info_file": f"/audio/{output_filename}",
+            "timings": timer.as_dict()
+        },
+        headers={"Server-Timing": timer.server_timing(rendered["elapsed"])}
+    )
+
+@app.delete("/api/session/{session_id}", status_code=204)
+async def close_session(session_id: str):
+    closed = await inference.call("close_session", session_id, route=f"session:{session_id}")
+    forget_session(session_id)
+    if not closed:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada o caducada")
+    return None
+
+# Numeric fields of the live stream configuration with their type and default value
+STREAM_FIELDS = {
+    "sample_rate": (int, 16000),
+    "pitch": (int, 0),
+    "index_rate": (float, 0.75),
+    "protect": (float, 0.5),
+    "block_ms": (int, 160),
+    "crossfade_ms": (int, 40),
+    "lookahead_ms": (int, 40)
+}
+
+def parse_stream_config(text):
+    """
+    Valida el mensaje de configuración de la conversión en tiempo real.
+
+    Devuelve los campos convertidos a su tipo o lanza ValueError con el motivo.
+    """
+    try:
+        message = json.loads(text)
+    except ValueError:
+        raise ValueError("el mensaje no es JSON válido")
+    if not isinstance(message, dict):
+        raise ValueError("la configuración debe ser un objeto JSON")
+    config = {}
+    for name, (cast, default) in STREAM_FIELDS.items():
+        value = message.get(name, default)
+        # bool is an int for Python, but never a valid value here
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{name} debe ser numérico")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"{name} debe ser numérico")
+        if not math.isfinite(number):
+            raise ValueError(f"{name} debe ser numérico")
+        config[name] = cast(number)
+    if config["sample_rate"] <= 0:
+        raise ValueError("sample_rate debe ser positivo")
+    if config["block_ms"] <= 0:
+        raise ValueError("block_ms debe ser positivo")
+    if config["crossfade_ms"] < 0 or config["lookahead_ms"] < 0:
+        raise ValueError("crossfade_ms y lookahead_ms no pueden ser negativos")
+    f0_method = message.get("f0_method", "rmvpe")
+    if not isinstance(f0_method, str):
+        raise ValueError("f0_method debe ser un texto")
+    config["f0_method"] = f0_method
+    return config
+
+# Live Conversion Endpoint (Microphone streaming)
+@app.websocket("/api/model/{model_id}/live")
+async def live_audio(websocket: WebSocket, model_id: int):
+    """
+    Conversión en tiempo real por WebSocket.
+
+    El cliente envía primero un mensaje de texto JSON con la configuración
+    (sample_rate, pitch, f0_method, block_ms, crossfade_ms, lookahead_ms, index_rate, protect)
+    y después bloques binarios de PCM float32 mono. El servidor devuelve el audio convertido
+    como PCM float32 a la misma frecuencia y, tras cada bloque, un mensaje JSON con la latencia.
+    Los mensajes de texto {"type": "flush"} y {"type": "reset"} vacían o reinician el stream.
+    """
+    await websocket.accept()
+    # The socket can stay open for hours, it must not hold a database connection
+    with SessionLocal() as db:
+        model = db.query(models.Model).filter(models.Model.id == model_id).first()
+        if model:
+            pth_file, index_file = model.pth_file, model.index_file
+            backend, quantize = model.backend, model.quantize
+    if not model:
+        await websocket.send_json({"type": "error", "detail": "Modelo no encontrado"})
+        await websocket.close(code=1008)
+        return
+
+    try:
+        message = await websocket.receive_text()
+    except (KeyError, WebSocketDisconnect):
+        await websocket.close(code=1003)
+        return
+    try:
+        stream_config = parse_stream_config(message)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": f"Configuración inválida: {str(e)}"})
+        await websocket.close(code=1003)
+        return
+
+    # The stream lives in one worker, every block of it goes to the same one
+    stream_id = uuid.uuid4().hex
+    route = f"stream:{stream_id}"
+    sample_rate = stream_config["sample_rate"]
+    try:
+        stream = await inference.call(
+            "open_stream",
+            stream_id,
+            route=route,
+            model_path=str(Path(pth_file).absolute()),
+            index_path=str(Path(index_file).absolute()),
+            sid=0,
+            pitch=stream_config["pitch"],
+            f0_method=stream_config["f0_method"],
+            index_rate=stream_config["index_rate"],
+            protect=stream_config["protect"],
+            block_ms=stream_config["block_ms"],
+            crossfade_ms=stream_config["crossfade_ms"],
+            lookahead_ms=stream_config["lookahead_ms"],
+            input_sr=sample_rate,
+            output_sr=sample_rate,
+            backend=backend,
+            quantize=quantize
+        )
+    except Exception as e:
+        inference.release(route)
+        await websocket.send_json({"type": "error", "detail": f"Error cargando el modelo: {str(e)}"})
+        await websocket.close(code=1011)
+        return
+
+    await websocket.send_json({
+        "type": "ready",
+        "sample_rate": sample_rate,
+        "algorithmic_latency_ms": stream["algorithmic_latency"] * 1000
+    })
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            received_at = time.perf_counter()
+            # A bad frame is reported to the client without closing the stream
+            try:
+                if message.get("bytes") is not None:
+                    data = message["bytes"]
+                    if len(data) % 4:
+                        raise ValueError("El bloque debe ser PCM float32, su tamaño ha de ser múltiplo de 4 bytes")
+                    audio = np.frombuffer(data, dtype="<f4")
+                    output, stats = await inference.call("process_stream", stream_id, audio, route=route)
+                else:
+                    command = json.loads(message.get("text") or "{}").get("type")
+                    if command == "flush":
+                        output, stats = await inference.call("flush_stream", stream_id, route=route)
+                    elif command == "reset":
+                        await inference.call("reset_stream", stream_id, route=route)
+                        continue
+                    else:
+                        continue
+            except Exception as e:
+                await websocket.send_json({"type": "error", "detail": f"Error procesando el bloque: {str(e)}"})
+                continue
+            if len(output):
+                await websocket.send_bytes(output.astype("<f4").tobytes())
+            await websocket.send_json({
+                "type": "stats",
+                "frame_latency_ms": (time.perf_counter() - received_at) * 1000,
+                **stats
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Unpins the model in the worker
+        try:
+            await inference.call("close_stream", stream_id, route=route)
+        except Exception as e:
+            print(f"Error cerrando el stream {stream_id}: {str(e)}")
+        inference.release(route)
+
 # Frontend
 @app.get("/")
 async def home(request: Request, page: int = 1, search: str = None, db: Session = Depends(get_db)):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
 from datetime import datetime
 from simple_app.database import Base
 
@@ -14,3 +14,23 @@ class Model(Base):
     technology = Column(String(50), nullable=False, default="RVMPE")
     epochs = Column(Integer, nullable=False)
     language = Column(String(50), nullable=False)
+    backend = Column(String(20), nullable=False, default="torch", server_default="torch")
+    quantize = Column(Boolean, nullable=False, default=False, server_default="0")
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)
+    model_id = Column(Integer, nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # "tts" or "audio"
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    params = Column(Text, nullable=False)  # JSON with the conversion settings
+    input_file = Column(String(500))
+    output_file = Column(String(500))
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    timings = Column(Text)  # JSON, see StageTimer.as_dict
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
@@ -0,0 +1,161 @@
+import os
+import json
+import asyncio
+import hashlib
+
+class ResultCache:
+    """
+    Caché en disco de audios convertidos, direccionada por contenido: la clave es el hash
+    del modelo y del índice, el de la entrada (audio subido o texto y voz TTS) y todos los
+    ajustes de la conversión, así que una petición repetida devuelve el mismo archivo sin
+    volver a ejecutar el TTS ni RVC.
+
+    Las peticiones idénticas que llegan mientras una se está calculando esperan a esa
+    misma conversión en lugar de lanzar la suya (single-flight).
+
+    Los resultados se guardan en `directory` como `result_<clave>.wav`. Cuando superan
+    `max_bytes` se borran los usados hace más tiempo (por fecha de modificación, que se
+    actualiza en cada acierto).
+
+    Args:
+        directory (Path): Carpeta de los resultados (la de los audios generados).
+        max_bytes (int): Presupuesto en disco. 0 desactiva el almacenamiento, pero no la
+            espera compartida de las peticiones simultáneas.
+    """
+
+    PREFIX = "result_"
+
+    def __init__(self, directory, max_bytes=0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Inference settings that change the audio, part of every key (see `key`)
+        self.fingerprint = None
+        self.inflight = {}
+        # (path, mtime, size) -> SHA-256 of the file content
+        self.file_hashes = {}
+        self.bytes = sum(os.path.getsize(path) for path in self.files())
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def key(self, *parts):
+        """
+        Clave de un resultado a partir de los valores que lo determinan. Incluye
+        `fingerprint`, la configuración de inferencia (precisión, compilación, segmentación...),
+        para no devolver resultados calculados con otra.
+        """
+        return hashlib.sha256(json.dumps([self.fingerprint, *parts], sort_keys=True).encode()).hexdigest()
+
+    async def file_hash(self, path):
+        """
+        Hash del contenido de un archivo (modelo o índice), recalculado solo si el archivo
+        ha cambiado.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        file_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if file_key not in self.file_hashes:
+            self.file_hashes[file_key] = await asyncio.to_thread(self._hash_file, path)
+        return self.file_hashes[file_key]
+
+    @staticmethod
+    def _hash_file(path, chunk_size=1 << 20):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return self.directory / f"{self.PREFIX}{key}.wav"
+
+    def files(self):
+        return [entry.path for entry in os.scandir(self.directory) if entry.name.startswith(self.PREFIX) and entry.is_file()]
+
+    async def get_or_compute(self, key, compute):
+        """
+        Devuelve el audio de `key` desde el disco, o lo calcula con `compute`.
+
+        Args:
+            key (str): Clave del resultado, ver `key`.
+            compute: Corrutina sin argumentos que devuelve `(audio codificado, Server-Timing)`.
+
+        Returns:
+            tuple: El audio, el Server-Timing del cálculo (None si viene del disco) y
+            cómo se obtuvo: "hit", "miss" o "coalesced".
+        """
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            data = None
+        if data is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return data, None, "hit"
+
+        task = self.inflight.get(key)
+        if task is None:
+            self.misses += 1
+            status = "miss"
+            task = asyncio.create_task(self._compute(key, compute))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            status = "coalesced"
+        # A client disconnecting cancels its own wait, not the conversion the others share
+        data, server_timing = await asyncio.shield(task)
+        return data, server_timing, status
+
+    async def _compute(self, key, compute):
+        data, server_timing = await compute()
+        if self.max_bytes > 0 and len(data) <= self.max_bytes:
+            path = self.path(key)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            await asyncio.to_thread(tmp_path.write_bytes, data)
+            os.replace(tmp_path, path)
+            self.bytes += len(data)
+            if self.bytes > self.max_bytes:
+                await asyncio.to_thread(self.evict)
+        return data, server_timing
+
+    def evict(self):
+        """
+        Borra los resultados usados hace más tiempo hasta quedar dentro del presupuesto.
+        """
+        entries = []
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        self.bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "in_flight": len(self.inflight),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes
+        }
@@ -9,6 +9,8 @@ class ModelBase(BaseModel):
     technology: str = "RVMPE"
     epochs: int
     language: str
+    backend: str = "torch"
+    quantize: bool = False
 
 class ModelCreate(ModelBase):
     pass
@@ -20,6 +22,8 @@ class ModelUpdate(BaseModel):
     technology: Optional[str] = None
     epochs: Optional[int] = None
     language: Optional[str] = None
+    backend: Optional[str] = None
+    quantize: Optional[bool] = None
 
 class Model(ModelBase):
     id: int
@@ -35,3 +39,21 @@ class PaginatedModels(BaseModel):
     page: int
     per_page: int
     pages: int
+
+class JobProgress(BaseModel):
+    done: int
+    total: int
+
+class Job(BaseModel):
+    id: str
+    model_id: int
+    kind: str
+    status: str
+    progress: JobProgress
+    info_file: Optional[str] = None
+    raw_file: Optional[str] = None
+    error: Optional[str] = None
+    timings: Optional[dict] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,35 @@
+import os
+
+class Settings:
+    """
+    Variables de entorno de la API web.
+
+    Se leen aquí y no en `rvc.configs.config.Config`, que importa torch: el proceso de la
+    API solo reparte el trabajo y no debe cargar torch ni faiss, que viven en los workers.
+    """
+
+    def __init__(self):
+        # inference worker processes of the web app (0 = run inference in the API process, one request at a time)
+        self.workers = int(os.environ.get("RVC_WORKERS", 1))
+        # torch/OpenMP/FAISS threads of each worker (0 = split the CPUs between the workers)
+        self.worker_threads = int(os.environ.get("RVC_WORKER_THREADS", 0))
+        # pin each worker to its own CPUs
+        self.worker_affinity = os.environ.get("RVC_WORKER_AFFINITY", "0") == "1"
+        # milliseconds a test request waits for others of the same model to convert them together (0 = disabled)
+        self.batch_window_ms = float(os.environ.get("RVC_BATCH_WINDOW_MS", 0))
+        # requests converted together at most
+        self.batch_max = int(os.environ.get("RVC_BATCH_MAX", 8))
+        # conversion jobs run at the same time (0 = one per inference worker)
+        self.job_concurrency = int(os.environ.get("RVC_JOB_CONCURRENCY", 0))
+        # seed of the synthesizer noise for the web app conversions, so they are reproducible (-1 = unseeded)
+        self.seed = int(os.environ.get("RVC_SEED", 0))
+        # disk budget in MB for converted test results kept in audio_outputs (0 = no result cache)
+        self.result_cache_bytes = int(os.environ.get("RVC_RESULT_CACHE_MB", 512)) * 1024**2
+        # disk budget in MB for the other audios in audio_outputs, least recently used go first (0 = no limit)
+        self.outputs_bytes = int(os.environ.get("RVC_OUTPUTS_MB", 2048)) * 1024**2
+        # seconds without being accessed after which an audio in audio_outputs is removed (0 = kept)
+        self.outputs_ttl = int(os.environ.get("RVC_OUTPUTS_TTL", 86400))
+        # seconds between two clean-ups of audio_outputs and of orphaned uploads (0 = disabled)
+        self.janitor_interval = int(os.environ.get("RVC_JANITOR_INTERVAL", 600))
+
+settings = Settings()
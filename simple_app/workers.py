@@ -0,0 +1,457 @@
+import os
+import time
+import pickle
+import asyncio
+import threading
+import itertools
+import multiprocessing
+from collections import Counter
+
+# Environment variables read by the BLAS/OpenMP runtimes when torch and faiss are imported
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "RVC_ONNX_THREADS")
+
+class InferenceService:
+    """
+    Estado de inferencia de un proceso: el `VoiceConverter`, las sesiones de re-renderizado
+    y los streams en tiempo real abiertos en él.
+
+    Los métodos públicos son las operaciones que la API puede pedir a un worker; reciben y
+    devuelven objetos serializables con pickle.
+    """
+
+    def __init__(self):
+        from rvc.infer.infer import VoiceConverter
+        from rvc.infer.session import SessionManager
+        from rvc.lib.predictors.f0 import preload_predictors
+
+        self.converter = VoiceConverter()
+        config = self.converter.config
+        self.sessions = SessionManager(
+            ttl=config.session_ttl,
+            max_sessions=config.session_max,
+            max_bytes=config.session_bytes
+        )
+        self.streams = {}
+        self.pinned_models = Counter()
+        # Load the configured F0 predictors before serving the first request
+        if config.preload_f0_methods:
+            preload_predictors(config.preload_f0_methods, config.device)
+
+    def convert_audio(self, **kwargs):
+        return self.converter.convert_audio(**kwargs)
+
+    def convert_audio_many(self, requests, batch_size=None):
+        return self.converter.convert_audio_many(requests, batch_size=batch_size)
+
+    def invalidate_model(self, pth_file):
+        self.converter.invalidate_model(pth_file)
+        self.sessions.remove_model(pth_file)
+
+    def invalidate_index(self, index_file):
+        from rvc.infer.index_cache import index_cache
+
+        index_cache.invalidate(index_file)
+
+    def config_fingerprint(self):
+        return self.converter.config.fingerprint()
+
+    def cache_stats(self):
+        return {**self.converter.cache_stats(), "sessions": self.sessions.stats()}
+
+    def create_session(self, session_id, **kwargs):
+        session = self.sessions.create(self.converter, session_id=session_id, **kwargs)
+        return {"session_id": session.session_id, "duration": session.duration, "expires_in": self.sessions.ttl}
+
+    def render_session(self, session_id, output_path, **kwargs):
+        """
+        Convierte el audio de una sesión y lo escribe en `output_path`.
+        Devuelve None si la sesión no existe o ha caducado.
+        """
+        import soundfile as sf
+        from rvc.lib.timing import StageTimer
+
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        timer = StageTimer()
+        audio = session.render(timer=timer, **kwargs)
+        with timer.stage("encode"):
+            sf.write(output_path, audio, session.tgt_sr, format="WAV")
+        # Measured here, the timer's own clock would also count the trip back to the API
+        return {"renders": session.renders, "timings": timer, "elapsed": timer.elapsed}
+
+    def close_session(self, session_id):
+        return self.sessions.remove(session_id)
+
+    def expire_sessions(self):
+        """
+        Cierra las sesiones caducadas y devuelve los ids de las que siguen abiertas.
+        """
+        self.sessions.expire()
+        return [session.session_id for session in self.sessions.cache.values()]
+
+    def open_stream(self, stream_id, **kwargs):
+        from rvc.infer.streaming import StreamingVoiceConverter
+
+        stream = StreamingVoiceConverter(self.converter, **kwargs)
+        # Keep the model loaded for other requests while the stream is open
+        model_key = self.converter.model_key(kwargs["model_path"], stream.backend, stream.quantize)
+        if model_key is not None:
+            self.converter.model_cache.pin(model_key)
+            self.pinned_models[model_key] += 1
+        self.streams[stream_id] = (stream, model_key)
+        return {"algorithmic_latency": stream.algorithmic_latency}
+
+    def process_stream(self, stream_id, audio):
+        stream, _ = self.streams[stream_id]
+        return stream.process(audio), stream.stats()
+
+    def flush_stream(self, stream_id):
+        stream, _ = self.streams[stream_id]
+        return stream.flush(), stream.stats()
+
+    def reset_stream(self, stream_id):
+        stream, _ = self.streams[stream_id]
+        stream.reset()
+
+    def close_stream(self, stream_id):
+        _, model_key = self.streams.pop(stream_id, (None, None))
+        if model_key is None:
+            return
+        self.pinned_models[model_key] -= 1
+        if self.pinned_models[model_key] <= 0:
+            del self.pinned_models[model_key]
+            self.converter.model_cache.unpin(model_key)
+
+def worker_main(index, requests, results, threads, cpus):
+    """
+    Bucle de un proceso worker: ejecuta las peticiones de su cola sobre su propio
+    `InferenceService` y publica el resultado (o la excepción) en la cola compartida.
+    """
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    try:
+        import faiss
+
+        faiss.omp_set_num_threads(threads)
+    except ImportError:
+        pass
+
+    try:
+        service = InferenceService()
+    except Exception as error:
+        print(f"Worker {index} could not start: {error}")
+        raise
+    print(f"Inference worker {index} ready (pid {os.getpid()}, {threads} threads, cpus {cpus or 'any'})")
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        job_id, method, args, kwargs, report = request
+        if report:
+            # Progress updates travel on the results queue, ahead of the final result
+            kwargs["progress"] = lambda *value, job_id=job_id: results.put((job_id, None, value))
+        try:
+            value = getattr(service, method)(*args, **kwargs)
+            results.put((job_id, True, value))
+        except Exception as error:
+            # Unpickling an exception imports its module, and the API must not import torch
+            if type(error).__module__ != "builtins":
+                error = RuntimeError(str(error))
+            try:
+                pickle.dumps(error)
+            except Exception:
+                error = RuntimeError(str(error))
+            results.put((job_id, False, error))
+
+class WorkerError(RuntimeError):
+    """
+    El proceso worker que atendía la petición terminó antes de responder, o no hay ningún
+    worker disponible para atenderla.
+    """
+
+class WorkerPool:
+    """
+    Reparte las operaciones de inferencia entre procesos worker, cada uno con su propio
+    `VoiceConverter`, para no compartir el estado del modelo cargado entre peticiones
+    concurrentes ni competir por el GIL.
+
+    Cada worker tiene su cola de peticiones y un presupuesto fijo de hilos (torch, OpenMP
+    y FAISS); opcionalmente se fija a su propio grupo de CPUs. Las peticiones van al worker
+    con menos trabajos pendientes, salvo las que llevan una ruta (`route`): las sesiones y
+    los streams viven en un worker concreto y sus peticiones siempre vuelven a él.
+
+    Un worker que termina inesperadamente se reinicia, cada vez con más espera si vuelve a
+    fallar poco después de arrancar. Tras `MAX_FAILURES` fallos seguidos se da por perdido:
+    no se reinicia más y sus peticiones fallan con `WorkerError`.
+
+    Con `workers=0` no se crean procesos y las operaciones se ejecutan en un hilo del propio
+    proceso de la API, de una en una como en un worker: comparten el modelo cargado y la
+    semilla global del ruido, así que no pueden solaparse.
+
+    Args:
+        workers (int): Número de procesos worker. 0 ejecuta la inferencia en el proceso de la API.
+        threads (int, optional): Hilos de cada worker. 0 reparte las CPUs disponibles entre los workers.
+        affinity (bool, optional): Si se fija cada worker a sus propias CPUs.
+    """
+
+    # Seconds before restarting a crashed worker, doubled after each quick failure
+    RESTART_DELAY = 1.0
+    MAX_RESTART_DELAY = 60.0
+    # A worker that runs this many seconds before exiting did not fail quickly
+    STABLE_AFTER = 60.0
+    # Quick failures in a row after which a worker is no longer restarted
+    MAX_FAILURES = 5
+
+    def __init__(self, workers=0, threads=0, affinity=False):
+        self.workers = workers
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.threads = threads or max(1, len(cpus) // max(workers, 1))
+        self.cpu_sets = [
+            [cpus[(i * self.threads + k) % len(cpus)] for k in range(self.threads)] if affinity else None
+            for i in range(workers)
+        ]
+        self.service = None
+        self.processes = []
+        self.requests = []
+        self.pending = {}
+        self.listeners = {}
+        self.routes = {}
+        self.restarts = 0
+        self.started = [0.0] * workers
+        self.failures = [0] * workers
+        self.next_restart = [None] * workers
+        self.given_up = set()
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._service_lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+        self._results = None
+        self._reader = None
+        self._watchdog = None
+
+    async def start(self):
+        if self.workers == 0:
+            self.service = await asyncio.to_thread(InferenceService)
+            return
+        self._results = self._context.Queue()
+        for index in range(self.workers):
+            self.processes.append(None)
+            self.requests.append(None)
+            self._spawn(index)
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+        self._watchdog = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self.workers == 0:
+            return
+        self._watchdog.cancel()
+        for requests in self.requests:
+            requests.put(None)
+        for process in self.processes:
+            await asyncio.to_thread(process.join, 10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._fail_pending(lambda worker: True, WorkerError("El pool de inferencia se ha detenido"))
+
+    def _spawn(self, index):
+        requests = self._context.Queue()
+        process = self._context.Process(
+            target=worker_main,
+            args=(index, requests, self._results, self.threads, self.cpu_sets[index]),
+            name=f"rvc-worker-{index}",
+            daemon=True
+        )
+        # Spawned children copy the environment when they start, before importing torch
+        saved = {name: os.environ.get(name) for name in THREAD_VARIABLES}
+        for name in THREAD_VARIABLES:
+            if name != "RVC_ONNX_THREADS" or saved[name] is None:
+                os.environ[name] = str(self.threads)
+        try:
+            process.start()
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        self.processes[index] = process
+        self.requests[index] = requests
+        self.started[index] = time.monotonic()
+
+    def _read_results(self):
+        while True:
+            try:
+                result = self._results.get()
+            except (EOFError, OSError):
+                break
+            if result is None:
+                break
+            job_id, ok, value = result
+            if ok is None:
+                listener = self.listeners.get(job_id)
+                if listener is not None:
+                    listener[0].call_soon_threadsafe(listener[1], *value)
+                continue
+            with self._lock:
+                entry = self.pending.pop(job_id, None)
+            if entry is None:
+                continue
+            future, _ = entry
+            future.get_loop().call_soon_threadsafe(self._resolve, future, ok, value)
+
+    @staticmethod
+    def _resolve(future, ok, value):
+        if future.done():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _fail_pending(self, match, error):
+        with self._lock:
+            failed = [job_id for job_id, (_, worker) in self.pending.items() if match(worker)]
+            futures = [self.pending.pop(job_id)[0] for job_id in failed]
+        for future in futures:
+            future.get_loop().call_soon_threadsafe(self._resolve, future, False, error)
+
+    async def _watch(self):
+        # Restart crashed workers and fail the requests they were serving
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for index, process in enumerate(self.processes):
+                if index in self.given_up:
+                    continue
+                if self.next_restart[index] is not None:
+                    if now >= self.next_restart[index]:
+                        self.next_restart[index] = None
+                        self.restarts += 1
+                        self._spawn(index)
+                    continue
+                if process.is_alive():
+                    if now - self.started[index] >= self.STABLE_AFTER:
+                        self.failures[index] = 0
+                    continue
+                self._fail_pending(lambda worker: worker == index, WorkerError(f"El worker de inferencia {index} terminó inesperadamente"))
+                if now - self.started[index] < self.STABLE_AFTER:
+                    self.failures[index] += 1
+                else:
+                    self.failures[index] = 1
+                if self.failures[index] >= self.MAX_FAILURES:
+                    # Its routes are kept so that the sessions and streams it held fail with WorkerError
+                    print(f"Inference worker {index} exited with code {process.exitcode} {self.failures[index]} times in a row, not restarting it")
+                    self.given_up.add(index)
+                    continue
+                delay = min(self.RESTART_DELAY * 2 ** (self.failures[index] - 1), self.MAX_RESTART_DELAY)
+                print(f"Inference worker {index} exited with code {process.exitcode}, restarting it in {delay:.0f} s")
+                self.routes = {route: worker for route, worker in self.routes.items() if worker != index}
+                self.next_restart[index] = now + delay
+
+    def _available(self, index):
+        return index not in self.given_up and self.next_restart[index] is None and self.processes[index].is_alive()
+
+    def _pick(self, route=None):
+        if route is not None and route in self.routes:
+            worker = self.routes[route]
+            if not self._available(worker):
+                raise WorkerError(f"El worker de inferencia {worker} no está disponible")
+            return worker
+        available = [index for index in range(self.workers) if self._available(index)]
+        if not available:
+            raise WorkerError("No hay ningún worker de inferencia disponible")
+        with self._lock:
+            load = Counter(worker for _, worker in self.pending.values())
+        worker = min(available, key=lambda index: load[index])
+        if route is not None:
+            self.routes[route] = worker
+        return worker
+
+    async def call(self, method, *args, route=None, progress=None, **kwargs):
+        """
+        Ejecuta `method` del `InferenceService` de un worker y devuelve su resultado.
+
+        Args:
+            method (str): Nombre del método.
+            route (str, optional): Clave de una sesión o stream; la primera petición con una
+                clave elige worker y las siguientes van siempre al mismo.
+            progress (callable, optional): Se pasa a `method` como `progress` y se llama en el
+                bucle de eventos con los argumentos de cada aviso de progreso.
+        """
+        if self.workers == 0:
+            if progress is not None:
+                loop = asyncio.get_running_loop()
+                kwargs["progress"] = lambda *value: loop.call_soon_threadsafe(progress, *value)
+            return await asyncio.to_thread(self._run_locally, method, args, kwargs)
+        worker = self._pick(route)
+        return await self._submit(worker, method, args, kwargs, progress)
+
+    def _run_locally(self, method, args, kwargs):
+        # One operation at a time, like the request loop of a worker process
+        with self._service_lock:
+            return getattr(self.service, method)(*args, **kwargs)
+
+    async def broadcast(self, method, *args, **kwargs):
+        """
+        Ejecuta `method` en todos los workers disponibles (p. ej. invalidar un modelo
+        borrado) y devuelve la lista de resultados. Los que se están reiniciando arrancan
+        sin estado y no lo necesitan.
+        """
+        if self.workers == 0:
+            return [await self.call(method, *args, **kwargs)]
+        workers = [index for index in range(self.workers) if self._available(index)]
+        return await asyncio.gather(*(self._submit(worker, method, args, kwargs) for worker in workers))
+
+    async def _submit(self, worker, method, args, kwargs, progress=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = next(self._job_ids)
+        with self._lock:
+            self.pending[job_id] = (future, worker)
+        if progress is not None:
+            self.listeners[job_id] = (loop, progress)
+        self.requests[worker].put((job_id, method, args, kwargs, progress is not None))
+        try:
+            return await future
+        finally:
+            self.listeners.pop(job_id, None)
+
+    def release(self, route):
+        """
+        Olvida el worker asignado a una sesión o stream cerrado.
+        """
+        self.routes.pop(route, None)
+
+    def retain(self, prefix, keys):
+        """
+        Olvida las rutas con `prefix` cuya clave no está en `keys` (p. ej. sesiones caducadas).
+        """
+        self.routes = {
+            route: worker for route, worker in self.routes.items()
+            if not route.startswith(prefix) or route[len(prefix):] in keys
+        }
+
+    def stats(self):
+        with self._lock:
+            load = Counter(worker for _, worker in self.pending.values())
+        return {
+            "workers": self.workers,
+            "threads": self.threads,
+            "restarts": self.restarts,
+            "restarting": [index for index in range(self.workers) if self.next_restart[index] is not None],
+            "given_up": sorted(self.given_up),
+            "pending": [load[index] for index in range(self.workers)],
+            "routes": len(self.routes)
+        }
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+
+def test_api_does_not_import_torch(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # the app creates its database and folders in the working directory
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, simple_app.main; "
+            "print(sorted(m for m in ('torch', 'faiss') if m in sys.modules))",
+        ],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": root},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from rvc.infer.pipeline import Autotune
+from rvc.lib.predictors.RMVPE import N_CLASS, RMVPE0Predictor
+
+
+def reference_autotune(autotune, f0, strength):
+    """
+    The per-frame loop `Autotune.autotune_f0` replaced.
+    """
+    autotuned_f0 = np.zeros_like(f0)
+    for i, freq in enumerate(f0):
+        closest_note = min(autotune.note_dict, key=lambda x: abs(x - freq))
+        autotuned_f0[i] = freq + (closest_note - freq) * strength
+    return autotuned_f0
+
+
+def reference_local_average_cents(cents_mapping, salience, thred=0.05):
+    """
+    The per-frame slicing `RMVPE0Predictor.to_local_average_cents` replaced.
+    """
+    center = np.argmax(salience, axis=1)
+    salience = np.pad(salience, ((0, 0), (4, 4)))
+    center += 4
+    todo_salience = []
+    todo_cents_mapping = []
+    starts = center - 4
+    ends = center + 5
+    for idx in range(salience.shape[0]):
+        todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
+        todo_cents_mapping.append(cents_mapping[starts[idx] : ends[idx]])
+    todo_salience = np.array(todo_salience)
+    todo_cents_mapping = np.array(todo_cents_mapping)
+    product_sum = np.sum(todo_salience * todo_cents_mapping, 1)
+    weight_sum = np.sum(todo_salience, 1)
+    devided = product_sum / weight_sum
+    maxx = np.max(salience, axis=1)
+    devided[maxx <= thred] = 0
+    return devided
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("strength", [1.0, 0.5])
+def test_autotune_matches_the_loop(dtype, strength):
+    autotune = Autotune()
+    rng = np.random.default_rng(0)
+    f0 = rng.uniform(0, 1200, 5000).astype(dtype)
+    f0[::7] = 0
+    # exact notes and midpoints between neighbouring notes, where ties are decided
+    notes = np.array(autotune.note_dict)
+    f0[1:11] = notes[:10]
+    f0[11:21] = (notes[:10] + notes[1:11]) / 2
+    expected = reference_autotune(autotune, f0, strength)
+    result = autotune.autotune_f0(f0, strength)
+    assert result.dtype == expected.dtype
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_local_average_cents_matches_the_loop():
+    predictor = object.__new__(RMVPE0Predictor)
+    cents_mapping = 20 * np.arange(N_CLASS) + 1997.3794084376191
+    predictor.cents_mapping = np.pad(cents_mapping, (4, 4))
+    rng = np.random.default_rng(0)
+    salience = rng.random((3000, N_CLASS)).astype(np.float32) ** 8
+    # peaks at both edges and frames below the threshold
+    salience[0, 0] = salience[1, -1] = 1.0
+    salience[2:10] *= 0.01
+    expected = reference_local_average_cents(predictor.cents_mapping, salience)
+    np.testing.assert_array_equal(predictor.to_local_average_cents(salience), expected)
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from simple_app.batching import BatchScheduler
+
+
+class Recorder:
+    def __init__(self, delay=0.0, error=None):
+        self.batches = []
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self, requests):
+        self.batches.append([request["n"] for request in requests])
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [request["n"] * 10 for request in requests]
+
+
+def test_window_flush():
+    run = Recorder()
+    scheduler = BatchScheduler(run, window_ms=50, max_batch=8)
+
+    async def main():
+        first = asyncio.create_task(scheduler.submit("a", {"n": 1}))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(scheduler.submit("a", {"n": 2}))
+        other = asyncio.create_task(scheduler.submit("b", {"n": 3}))
+        await asyncio.sleep(0)
+        # nothing runs before the window closes
+        assert run.batches == []
+        return await asyncio.gather(first, second, other)
+
+    assert asyncio.run(main()) == [10, 20, 30]
+    assert run.batches == [[1, 2], [3]]
+    assert scheduler.stats()["largest_batch"] == 2
+    assert scheduler.stats()["open"] == 0
+
+
+def test_max_batch_flush():
+    run = Recorder()
+    # the window is far longer than the test, only a full batch can run
+    scheduler = BatchScheduler(run, window_ms=60000, max_batch=3)
+
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(*(scheduler.submit("a", {"n": n}) for n in range(3))), 5
+        )
+
+    assert asyncio.run(main()) == [0, 10, 20]
+    assert run.batches == [[0, 1, 2]]
+
+
+def test_results_keep_order():
+    run = Recorder(delay=0.01)
+    scheduler = BatchScheduler(run, window_ms=20, max_batch=4)
+
+    async def main():
+        return await asyncio.gather(
+            *(scheduler.submit("a", {"n": n}) for n in range(10))
+        )
+
+    assert asyncio.run(main()) == [n * 10 for n in range(10)]
+    assert run.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert scheduler.stats()["batches"] == 3
+    assert scheduler.stats()["requests"] == 10
+
+
+def test_error_fails_whole_batch():
+    run = Recorder(error=RuntimeError("boom"))
+    scheduler = BatchScheduler(run, window_ms=20, max_batch=8)
+
+    async def main():
+        return await asyncio.gather(
+            *(scheduler.submit("a", {"n": n}) for n in range(3)),
+            return_exceptions=True,
+        )
+
+    errors = asyncio.run(main())
+    assert len(run.batches) == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert [str(error) for error in errors] == ["boom"] * 3
+
+
+def test_cancelled_waiter_does_not_break_batch():
+    run = Recorder(delay=0.05)
+    scheduler = BatchScheduler(run, window_ms=20, max_batch=8)
+
+    async def main():
+        tasks = [asyncio.create_task(scheduler.submit("a", {"n": n})) for n in range(3)]
+        # cancelled while the batch is running
+        await asyncio.sleep(0.04)
+        tasks[1].cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tasks[1]
+        return await tasks[0], await tasks[2]
+
+    assert asyncio.run(main()) == (0, 20)
+    assert run.batches == [[0, 1, 2]]
+
+
+def test_disabled_runs_each_request():
+    run = Recorder()
+    scheduler = BatchScheduler(run, window_ms=0)
+
+    async def main():
+        return await asyncio.gather(
+            *(scheduler.submit("a", {"n": n}) for n in range(2))
+        )
+
+    assert asyncio.run(main()) == [0, 10]
+    assert run.batches == [[0], [1]]
+
+
+def test_waiter_cancelled_inside_window():
+    run = Recorder()
+    scheduler = BatchScheduler(run, window_ms=30, max_batch=8)
+
+    async def main():
+        tasks = [asyncio.create_task(scheduler.submit("a", {"n": n})) for n in range(2)]
+        await asyncio.sleep(0)
+        tasks[0].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    cancelled, result = asyncio.run(main())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert result == 10
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from rvc.configs.config import Config
+from rvc.infer.pipeline import Pipeline
+
+
+def reference_cut_points(vc, audio):
+    """
+    The per-sample moving-sum loop `Pipeline._find_cut_points` replaced.
+    """
+    audio_pad = np.pad(audio, (vc.window // 2, vc.window // 2), mode="reflect")
+    opt_ts = []
+    if audio_pad.shape[0] > vc.t_max:
+        audio_sum = np.zeros_like(audio)
+        for i in range(vc.window):
+            audio_sum += audio_pad[i : i - vc.window]
+        for t in range(vc.t_center, audio.shape[0], vc.t_center):
+            window = np.abs(audio_sum[t - vc.t_query : t + vc.t_query])
+            opt_ts.append(t - vc.t_query + np.where(window == window.min())[0][0])
+    return opt_ts
+
+
+@pytest.fixture(scope="module")
+def vc():
+    return Pipeline(40000, Config())
+
+
+def signals(seconds):
+    rng = np.random.default_rng(0)
+    n = int(seconds * 16000)
+    t = np.arange(n) / 16000
+    noise = rng.standard_normal(n)
+    tone = 0.5 * np.sin(2 * np.pi * 220 * t)
+    silence = np.zeros(n)
+    silence[n // 3 : n // 2] = rng.standard_normal(n // 2 - n // 3)
+    quantized = np.round(noise * 0.3 * 32767) / 32767
+    return {"noise": noise, "tone": tone, "silence": silence, "int16": quantized}
+
+
+@pytest.mark.parametrize("name", ["noise", "tone", "silence", "int16"])
+def test_cut_points_match_the_moving_sum_loop(vc, name):
+    audio = signals(vc.x_max + 3 * vc.x_center)[name]
+    expected = reference_cut_points(vc, audio)
+    assert expected, "the input should be long enough to be cut"
+    assert [int(t) for t in vc._find_cut_points(audio)] == [int(t) for t in expected]
+
+
+def test_short_input_is_not_cut(vc):
+    assert vc._find_cut_points(np.zeros(16000)) == []
@@ -0,0 +1,96 @@
+import os
+import time
+
+from simple_app.janitor import Janitor
+
+
+def write(directory, name, size=10, age=0):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def names(directory):
+    return sorted(path.name for path in directory.iterdir())
+
+
+def janitor(tmp_path, referenced=(), **kwargs):
+    audio_dir, upload_dir = tmp_path / "audio", tmp_path / "uploads"
+    audio_dir.mkdir(exist_ok=True)
+    upload_dir.mkdir(exist_ok=True)
+    return Janitor(audio_dir, upload_dir, lambda: referenced, **kwargs)
+
+
+def test_expired_outputs_are_removed(tmp_path):
+    cleaner = janitor(tmp_path, ttl=3600)
+    write(cleaner.audio_dir, "old.wav", age=7200)
+    write(cleaner.audio_dir, "recent.wav", age=1800)
+    cleaner.run()
+    assert names(cleaner.audio_dir) == ["recent.wav"]
+    assert cleaner.stats()["expired"] == 1
+    assert cleaner.stats()["files"] == 1
+
+
+def test_budget_removes_least_recently_used_first(tmp_path):
+    cleaner = janitor(tmp_path, max_bytes=25)
+    for name, age in (("c.wav", 1000), ("a.wav", 3000), ("b.wav", 2000)):
+        write(cleaner.audio_dir, name, age=age)
+    cleaner.run()
+    assert names(cleaner.audio_dir) == ["b.wav", "c.wav"]
+    write(cleaner.audio_dir, "d.wav", age=500)
+    cleaner.run()
+    assert names(cleaner.audio_dir) == ["c.wav", "d.wav"]
+    assert cleaner.stats()["evicted"] == 2
+    assert cleaner.stats()["bytes"] == 20
+    assert cleaner.stats()["freed_bytes"] == 20
+
+
+def test_recent_files_are_kept(tmp_path):
+    cleaner = janitor(tmp_path, max_bytes=5, ttl=1)
+    write(cleaner.audio_dir, "writing.wav", age=Janitor.GRACE - 60)
+    write(cleaner.audio_dir, "done.wav", age=Janitor.GRACE + 60)
+    write(cleaner.upload_dir, "uploading.pth", age=Janitor.GRACE - 60)
+    cleaner.run()
+    assert names(cleaner.audio_dir) == ["writing.wav"]
+    assert names(cleaner.upload_dir) == ["uploading.pth"]
+
+
+def test_excluded_prefixes_are_kept(tmp_path):
+    cleaner = janitor(tmp_path, max_bytes=5, ttl=3600, exclude=("result_",))
+    write(cleaner.audio_dir, "result_abc.wav", age=7200)
+    write(cleaner.audio_dir, "job.wav", age=7200)
+    cleaner.run()
+    assert names(cleaner.audio_dir) == ["result_abc.wav"]
+    # excluded files do not count against the budget either
+    assert cleaner.stats()["files"] == 0
+
+
+def test_referenced_files_are_kept(tmp_path):
+    audio_dir, upload_dir = tmp_path / "audio", tmp_path / "uploads"
+    referenced = [str(audio_dir / "session.wav"), str(upload_dir / "model.pth")]
+    cleaner = janitor(tmp_path, referenced, max_bytes=5, ttl=3600)
+    write(audio_dir, "session.wav", age=7200)
+    write(audio_dir, "old.wav", age=7200)
+    write(upload_dir, "model.pth", age=7200)
+    cleaner.run()
+    assert names(audio_dir) == ["session.wav"]
+    assert names(upload_dir) == ["model.pth"]
+
+
+def test_orphaned_uploads_are_removed(tmp_path):
+    upload_dir = tmp_path / "uploads"
+    cleaner = janitor(tmp_path, [str(upload_dir / "model.pth")])
+    write(upload_dir, "model.pth", age=7200)
+    write(upload_dir, "model.index", age=7200)
+    cleaner.run()
+    assert names(upload_dir) == ["model.pth"]
+    assert cleaner.stats()["orphaned_uploads"] == 1
+
+
+def test_no_limits_keeps_outputs(tmp_path):
+    cleaner = janitor(tmp_path)
+    write(cleaner.audio_dir, "old.wav", age=10**6)
+    cleaner.run()
+    assert names(cleaner.audio_dir) == ["old.wav"]
@@ -0,0 +1,51 @@
+import numpy as np
+import soundfile as sf
+
+from rvc.infer.infer import VoiceConverter
+
+
+def segments():
+    rng = np.random.default_rng(0)
+    quiet = 0.3 * rng.standard_normal(40000)
+    loud = 0.5 * rng.standard_normal(40000)
+    loud[20000] = 2.0
+    return np.concatenate([quiet, loud]).astype(np.float32)
+
+
+def test_single_gain(tmp_path):
+    samples = segments()
+    path = str(tmp_path / "out.wav")
+    VoiceConverter.write_long_output(
+        samples, path, 40000, float(np.abs(samples).max()), block_size=30000
+    )
+    output, sample_rate = sf.read(path)
+    assert sample_rate == 40000
+    assert len(output) == len(samples)
+    assert np.abs(output).max() <= 0.99
+    # the quiet half is scaled by the same gain as the half holding the peak
+    np.testing.assert_allclose(output, samples * 0.99 / 2.0, atol=2 / 32768)
+
+
+def test_no_gain_below_peak(tmp_path):
+    samples = segments() / 4
+    path = str(tmp_path / "out.wav")
+    VoiceConverter.write_long_output(samples, path, 40000, float(np.abs(samples).max()))
+    output, _ = sf.read(path)
+    np.testing.assert_allclose(output, samples, atol=1 / 32768)
+
+
+def test_cleaning_keeps_length(tmp_path):
+    samples = segments() / 4
+    path = str(tmp_path / "out.wav")
+    VoiceConverter.write_long_output(
+        samples,
+        path,
+        40000,
+        float(np.abs(samples).max()),
+        clean_audio=True,
+        block_size=25000,
+        padding=5000,
+    )
+    output, _ = sf.read(path)
+    assert len(output) == len(samples)
+    assert np.abs(output).max() < np.abs(samples).max()
@@ -0,0 +1,135 @@
+import asyncio
+import os
+
+import pytest
+
+from simple_app.results import ResultCache
+
+
+class Conversion:
+    def __init__(self, data=b"audio", error=None):
+        self.calls = 0
+        self.data = data
+        self.error = error
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.data, "rvc;dur=1"
+
+
+def test_concurrent_requests_share_one_conversion(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1024)
+    convert = Conversion()
+
+    async def main():
+        convert.release = asyncio.Event()
+        waiters = [
+            asyncio.create_task(cache.get_or_compute("k", convert)) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        convert.release.set()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(main())
+    assert convert.calls == 1
+    assert [status for _, _, status in results] == ["miss", "coalesced", "coalesced"]
+    assert all(data == b"audio" for data, _, _ in results)
+    assert cache.path("k").read_bytes() == b"audio"
+    # the next request is served from disk
+    data, timing, status = asyncio.run(cache.get_or_compute("k", convert))
+    assert (data, timing, status) == (b"audio", None, "hit")
+    assert convert.calls == 1
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_keeps_the_conversion(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1024)
+    convert = Conversion()
+
+    async def main():
+        convert.release = asyncio.Event()
+        first = asyncio.create_task(cache.get_or_compute("k", convert))
+        second = asyncio.create_task(cache.get_or_compute("k", convert))
+        await asyncio.sleep(0)
+        # the client that started the conversion disconnects
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        convert.release.set()
+        return await second
+
+    data, _, status = asyncio.run(main())
+    assert (data, status) == (b"audio", "coalesced")
+    assert convert.calls == 1
+    assert cache.path("k").exists()
+
+
+def test_error_reaches_every_waiter(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1024)
+    convert = Conversion(error=RuntimeError("boom"))
+
+    async def main():
+        convert.release = asyncio.Event()
+        waiters = [
+            asyncio.create_task(cache.get_or_compute("k", convert)) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        convert.release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert convert.calls == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert not cache.path("k").exists()
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=25)
+
+    async def store(key):
+        convert = Conversion(data=key.encode() * 10)
+        convert.release = asyncio.Event()
+        convert.release.set()
+        return await cache.get_or_compute(key, convert)
+
+    asyncio.run(store("a"))
+    asyncio.run(store("b"))
+    os.utime(cache.path("a"), (1000, 1000))
+    os.utime(cache.path("b"), (2000, 2000))
+    # a hit marks the result as used
+    assert asyncio.run(store("a"))[2] == "hit"
+    asyncio.run(store("c"))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "result_a.wav",
+        "result_c.wav",
+    ]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 20
+
+
+def test_results_larger_than_the_budget_are_not_stored(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=4)
+    convert = Conversion()
+
+    async def main():
+        convert.release = asyncio.Event()
+        convert.release.set()
+        return await cache.get_or_compute("k", convert)
+
+    assert asyncio.run(main())[0] == b"audio"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_key_includes_fingerprint(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.fingerprint = {"precision": "fp32"}
+    key = cache.key("model", {"pitch": 0})
+    assert cache.key("model", {"pitch": 0}) == key
+    assert cache.key("model", {"pitch": 1}) != key
+    cache.fingerprint = {"precision": "fp16"}
+    assert cache.key("model", {"pitch": 0}) != key
@@ -0,0 +1,170 @@
+import copy
+
+import numpy as np
+import pytest
+import torch
+
+from rvc.configs.config import Config
+from rvc.infer.benchmark import build_embedder, build_synthesizer
+from rvc.infer.compiled import CompiledSynthesizer
+from rvc.infer.pipeline import Pipeline
+from rvc.lib.algorithm.commons import row_noise
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config()
+
+
+@pytest.fixture(scope="module")
+def embedder(config):
+    torch.manual_seed(0)
+    return build_embedder(2, config)
+
+
+@pytest.fixture(scope="module")
+def synthesizers(config):
+    torch.manual_seed(0)
+    return {
+        use_f0: build_synthesizer(40000, "HiFi-GAN", use_f0, config)
+        for use_f0 in (True, False)
+    }
+
+
+@pytest.fixture
+def no_noise(monkeypatch):
+    # batched and per-segment passes draw their noise in different shapes
+    monkeypatch.setattr(torch, "randn_like", torch.zeros_like)
+    monkeypatch.setattr(
+        torch, "rand", lambda *size, **kwargs: torch.zeros(*size, **kwargs)
+    )
+
+
+def segments(vc):
+    rng = np.random.default_rng(0)
+    audios, pitches, pitchfs = [], [], []
+    for seconds in (2.1, 2.6):
+        n = int(seconds * vc.sample_rate) // vc.window * vc.window
+        audio = rng.standard_normal(n).astype(np.float32) * 0.1
+        frames = n // vc.window
+        pitchf = 150 * 2 ** np.sin(np.arange(frames) / 40)
+        pitchf[(np.arange(frames) % 50) >= 40] = 0
+        pitch = np.clip(np.rint(12 * np.log2(np.maximum(pitchf, 1) / 10)), 1, 255)
+        audios.append(audio)
+        pitches.append(torch.tensor(pitch).unsqueeze(0).long())
+        pitchfs.append(torch.tensor(pitchf).unsqueeze(0).float())
+    return audios, pitches, pitchfs
+
+
+@pytest.mark.parametrize("use_f0,protect", [(True, 0.5), (True, 0.33), (False, 0.5)])
+def test_batched_segments_match_per_segment_conversion(
+    config, embedder, synthesizers, no_noise, use_f0, protect
+):
+    net_g = synthesizers[use_f0]
+    vc = Pipeline(40000, config)
+    sid = torch.tensor(0, device=vc.device).unsqueeze(0).long()
+    audios, pitches, pitchfs = segments(vc)
+    if not use_f0:
+        pitches = pitchfs = None
+
+    batched = vc.voice_conversion_batch(
+        embedder, net_g, sid, audios, pitches, pitchfs, None, None, 0.0, "v2", protect
+    )
+    for i, audio in enumerate(audios):
+        single = vc.voice_conversion(
+            embedder,
+            net_g,
+            sid,
+            audio,
+            pitches[i] if use_f0 else None,
+            pitchfs[i] if use_f0 else None,
+            None,
+            None,
+            0.0,
+            "v2",
+            protect,
+        )
+        assert batched[i].shape == single.shape
+        # the pipeline keeps the segment without its t_pad margins
+        trim = slice(vc.t_pad_tgt, -vc.t_pad_tgt)
+        np.testing.assert_allclose(batched[i][trim], single[trim], atol=1e-5)
+
+
+@pytest.mark.parametrize("vocoder", ["HiFi-GAN", "MRF HiFi-GAN", "RefineGAN"])
+def test_row_noise_does_not_depend_on_the_batch(config, embedder, vocoder):
+    torch.manual_seed(0)
+    net_g = build_synthesizer(40000, vocoder, True, config)
+    vc = Pipeline(40000, config)
+    sid = torch.tensor(0, device=vc.device).unsqueeze(0).long()
+    audios, pitches, pitchfs = segments(vc)
+    seeds = [11, 12]
+
+    with row_noise(seeds):
+        batched = vc.voice_conversion_batch(
+            embedder, net_g, sid, audios, pitches, pitchfs, None, None, 0.0, "v2", 0.5
+        )
+    trim = slice(vc.t_pad_tgt, -vc.t_pad_tgt)
+    for i, audio in enumerate(audios):
+        with row_noise(seeds[i : i + 1]):
+            single = vc.voice_conversion(
+                embedder,
+                net_g,
+                sid,
+                audio,
+                pitches[i],
+                pitchfs[i],
+                None,
+                None,
+                0.0,
+                "v2",
+                0.5,
+            )
+        np.testing.assert_allclose(batched[i][trim], single[trim], atol=1e-5)
+    # a different seed gives different noise
+    with row_noise([13]):
+        other = vc.voice_conversion(
+            embedder,
+            net_g,
+            sid,
+            audios[0],
+            pitches[0],
+            pitchfs[0],
+            None,
+            None,
+            0.0,
+            "v2",
+            0.5,
+        )
+    assert not np.allclose(other[trim], batched[0][trim], atol=1e-6)
+
+
+def test_row_noise_with_compiled_synthesizer(config, embedder, synthesizers):
+    net_g = CompiledSynthesizer(
+        copy.deepcopy(synthesizers[True]), None, mode="trace", bucket_frames=100
+    )
+    vc = Pipeline(40000, config)
+    sid = torch.tensor(0, device=vc.device).unsqueeze(0).long()
+    audios, pitches, pitchfs = segments(vc)
+    trim = slice(vc.t_pad_tgt, -vc.t_pad_tgt)
+
+    # the first batch builds the graphs, which must not change its noise
+    with row_noise([21, 22]):
+        batched = vc.voice_conversion_batch(
+            embedder, net_g, sid, audios, pitches, pitchfs, None, None, 0.0, "v2", 0.5
+        )
+    for i, audio in enumerate(audios):
+        with row_noise([21 + i]):
+            single = vc.voice_conversion(
+                embedder,
+                net_g,
+                sid,
+                audio,
+                pitches[i],
+                pitchfs[i],
+                None,
+                None,
+                0.0,
+                "v2",
+                0.5,
+            )
+        np.testing.assert_allclose(batched[i][trim], single[trim], atol=1e-5)